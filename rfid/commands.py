@@ -0,0 +1,42 @@
+import click
+import frappe
+from frappe.commands import get_site, pass_context
+
+
+@click.command("rfid-stream")
+@click.option("--reader", "readers", multiple=True, help="Only consume the given RFID Reader (repeatable).")
+@pass_context
+def rfid_stream(context, readers):
+	"""Consume the HTTP event stream of every enabled RFID Reader."""
+	from rfid.rfid.services.stream import run_stream_consumers
+
+	site = get_site(context)
+	frappe.init(site=site)
+	frappe.connect()
+	frappe.set_user("Administrator")
+
+	try:
+		run_stream_consumers(list(readers) or None)
+	finally:
+		frappe.destroy()
+
+
+@click.command("rfid-mqtt")
+@click.option("--reader", "readers", multiple=True, help="Only subscribe to the given RFID Reader (repeatable).")
+@pass_context
+def rfid_mqtt(context, readers):
+	"""Subscribe to the MQTT tag reports of every enabled RFID Reader."""
+	from rfid.rfid.services.mqtt import run_mqtt_ingest
+
+	site = get_site(context)
+	frappe.init(site=site)
+	frappe.connect()
+	frappe.set_user("Administrator")
+
+	try:
+		run_mqtt_ingest(list(readers) or None)
+	finally:
+		frappe.destroy()
+
+
+commands = [rfid_stream, rfid_mqtt]
@@ -138,10 +138,17 @@ doc_events = {
 		"before_save": "rfid.rfid.doctype.item.item.before_save"
 	},
     "Stock Entry": {
+		"after_insert": "rfid.rfid.doctype.stock_entry.stock_entry.after_insert",
 		"on_submit": "rfid.rfid.doctype.stock_entry.stock_entry.on_submit"
 	},
     "Asset": {
-		"before_save": "rfid.rfid.doctype.asset.asset.before_save"
+		"before_save": "rfid.rfid.doctype.asset.asset.before_save",
+		"on_update": "rfid.rfid.doctype.asset.asset.on_update",
+		"on_trash": "rfid.rfid.doctype.asset.asset.on_trash"
+	},
+    "Serial No": {
+		"before_save": "rfid.rfid.doctype.serial_no.serial_no.before_save",
+		"after_insert": "rfid.rfid.doctype.serial_no.serial_no.after_insert"
 	},
 }
 
@@ -166,6 +173,29 @@ doc_events = {
 #	],
 # }
 
+scheduler_events = {
+	"cron": {
+		"* * * * *": [
+			"rfid.rfid.services.ingest_queue.sweep_queues",
+			"rfid.rfid.services.live.sweep_live_frames",
+			"rfid.rfid.services.presence.sweep_presence",
+			"rfid.rfid.services.webhook.sweep_deliveries",
+			"rfid.rfid.services.raddec_window.sweep_raddec_window"
+		],
+	},
+	"hourly_long": [
+		"rfid.rfid.services.retention.rollup_tag_events"
+	],
+	"daily": [
+		"rfid.rfid.services.counters.sync_gauges",
+		"rfid.rfid.services.webhook.purge_deliveries"
+	],
+	"daily_long": [
+		"rfid.rfid.services.bloom.rebuild_filter",
+		"rfid.rfid.services.retention.archive_tag_events"
+	],
+}
+
 # Testing
 # -------
 
@@ -9,6 +9,8 @@ def after_install():
 
 def after_migrate():
 	_ensure_workspace()
+	# Counters are seeded from the database in the background.
+	frappe.enqueue("rfid.rfid.services.counters.rebuild_counters", queue="long", job_id="rfid_rebuild_counters", deduplicate=True)
 
 
 def _ensure_workspace():
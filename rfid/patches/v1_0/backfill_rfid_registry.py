@@ -0,0 +1,5 @@
+from rfid.rfid.services.registry import backfill_registry
+
+
+def execute():
+	backfill_registry()
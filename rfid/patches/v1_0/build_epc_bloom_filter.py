@@ -0,0 +1,5 @@
+from rfid.rfid.services.bloom import rebuild_filter
+
+
+def execute():
+	rebuild_filter()
@@ -3,15 +3,27 @@ from __future__ import annotations
 import json
 import itertools
 import hashlib
-from datetime import datetime
-from typing import Any, Dict, Iterable, List, Optional
+from typing import Any, Dict, List, Optional
 
 import frappe
 import secrets
 from frappe import _
-from frappe.utils import get_datetime, get_link_to_form, now_datetime
-
-from rfid.rfid.services import build_raddec, dispatch_raddec_event
+from frappe.utils import get_datetime, get_link_to_form
+from werkzeug.wrappers import Response
+
+from rfid.rfid.services.bloom import get_filter_stats
+from rfid.rfid.services import counters
+from rfid.rfid.services.feed import RADDEC_FIELDS, get_raddec_page as raddec_page, stream_raddec_feed
+from rfid.rfid.services.idempotency import get_request_key, get_stored_response, store_response
+from rfid.rfid.services.ingest import process_impinj_payload
+from rfid.rfid.services.ingest_queue import enqueue_payload, get_queue_stats, is_queued_mode
+from rfid.rfid.services.location import get_tag_locations as tag_locations
+from rfid.rfid.services.parser import loads
+from rfid.rfid.services.raddec import build_raddecs
+from rfid.rfid.services.raw_payload import load_raw_node
+from rfid.rfid.services.registry import get_epcs_for
+from rfid.rfid.services.resolver import get_cache_stats
+from rfid.rfid.services.webhook import replay_deliveries
 
 @frappe.whitelist()
 def create_print_rfid_se(doc):
@@ -49,17 +61,24 @@ def create_print_rfid_sn(Serial_no_list):
     doc = json.loads(Serial_no_list)
     
     if doc:
+        registered = {
+            'Asset': get_epcs_for('Asset', [item.get('name') for item in doc if 'asset_name' in list(item.keys())]),
+            'Serial No': get_epcs_for('Serial No', [item.get('name') for item in doc if 'asset_name' not in list(item.keys())]),
+        }
         created_numbers = []
         for item in doc:
             rfid_doc = frappe.new_doc('RFID Print Queue')
             created_numbers.append(item.get('name'))
+            registry_entry = registered['Asset' if 'asset_name' in list(item.keys()) else 'Serial No'].get(item.get('name'))
             if 'asset_name' in list(item.keys()):
-                rfid_doc.item_code = frappe.db.get_value('Asset',item.get('name'),'item_code')
+                rfid_doc.item_code = registry_entry.get('item_code') if registry_entry else frappe.db.get_value('Asset',item.get('name'),'item_code')
             else:
                 rfid_doc.item_code = item.get('item_code')
             rfid_doc.qty = 1
             rfid_doc.status = 'Pending'
-            if 'asset_name' in list(item.keys()):
+            if registry_entry:
+                rfid_data = registry_entry.get('epc')
+            elif 'asset_name' in list(item.keys()):
                 rfid_data = frappe.db.get_value('Asset',item.get('name'),'custom_rfid')
             else:
                 rfid_data = frappe.db.get_value('Serial No',item.get('name'),'custom_barcode')
@@ -121,280 +140,207 @@ def get_raddec_events(limit: int = 100, since: Optional[str] = None) -> List[Dic
     rows = frappe.get_all(
         "RFID Tag Event",
         filters=filters,
-        fields=["name", "raddec", "read_time"],
+        fields=list(RADDEC_FIELDS),
         order_by="read_time desc",
         limit=limit,
     )
 
-    results: List[Dict[str, Any]] = []
-    for row in rows:
-        raddec_data = row.get("raddec")
-        if not raddec_data:
-            continue
+    # raddec is rendered from the typed columns rather than stored per row.
+    return list(build_raddecs(rows, with_docname=True))
 
-        try:
-            raddec_json = json.loads(raddec_data)
-        except json.JSONDecodeError:
-            continue
-
-        read_time = row.get("read_time")
-        if read_time and "timestamp" not in raddec_json:
-            raddec_json["timestamp"] = int(read_time.timestamp() * 1000)
-
-        raddec_json.setdefault("_docname", row.get("name"))
-        results.append(raddec_json)
-
-    return results
-
-
-def _iter_impinj_nodes(payload: Any) -> Iterable[Dict[str, Any]]:
-    """Yield potential event dictionaries out of a nested payload structure."""
-
-    if isinstance(payload, list):
-        for element in payload:
-            yield from _iter_impinj_nodes(element)
-        return
-
-    if not isinstance(payload, dict):
-        return
-
-    # Common keys containing collections of events.
-    for key in (
-        "notifications",
-        "Notification",
-        "events",
-        "items",
-        "records",
-        "tagReport",
-        "tagReportData",
-        "tag_reads",
-        "tags",
-    ):
-        value = payload.get(key)
-        if isinstance(value, list):
-            for element in value:
-                yield from _iter_impinj_nodes(element)
-            return
-
-    for key in ("data", "eventData"):
-        value = payload.get(key)
-        if isinstance(value, (dict, list)):
-            yield from _iter_impinj_nodes(value)
-            return
-
-    yield payload
-
-
-def _extract_epc(data: Dict[str, Any]) -> Optional[str]:
-    candidates = [
-        data.get("epc"),
-        data.get("epcHex"),
-        data.get("epcStr"),
-        data.get("tag"),
-        data.get("id"),
-    ]
-
-    epc_data = data.get("epcData") or data.get("epc_data")
-    if isinstance(epc_data, dict):
-        candidates.extend([
-            epc_data.get("epc"),
-            epc_data.get("epcHex"),
-            epc_data.get("epcStr"),
-        ])
-
-    for value in candidates:
-        if isinstance(value, str) and value.strip():
-            return value.strip().upper()
-
-    return None
-
-
-def _extract_timestamp(entry: Dict[str, Any], body: Dict[str, Any]) -> Optional[datetime]:
-    for container in (body, entry):
-        for key in (
-            "timestamp",
-            "readTime",
-            "eventTime",
-            "firstSeenTimestamp",
-            "lastSeenTimestamp",
-            "modified",
-            "observedAt",
-        ):
-            value = container.get(key)
-            if isinstance(value, str) and value.strip():
-                try:
-                    return get_datetime(value)
-                except Exception:
-                    continue
-
-    return None
-
-
-def _extract_rssi(body: Dict[str, Any]) -> Optional[float]:
-    for key in ("peakRssiCdbm", "rssi", "peakRssi", "rssiDbm"):
-        value = body.get(key)
-        if value is None:
-            continue
-        try:
-            numeric = float(value)
-        except (TypeError, ValueError):
-            continue
 
-        # peakRssiCdbm is expressed in centi-dBm.
-        if key == "peakRssiCdbm":
-            numeric = numeric / 100.0
-        return numeric
+@frappe.whitelist()
+def get_raddec_page(
+    cursor: Optional[str] = None,
+    since: Optional[str] = None,
+    limit: int = 100,
+    wait: float = 0,
+) -> Dict[str, Any]:
+    """Return the next page of raddec records after `cursor`, oldest first.
+
+    Pass the returned `cursor` to the next call; with `wait` (seconds, up to
+    25) an empty page is held open until new events arrive.
+    """
 
-    return None
+    frappe.has_permission("RFID Tag Event", "read", throw=True)
+    return raddec_page(cursor=cursor, since=since, limit=limit, wait=wait)
 
 
-def _extract_reader(entry: Dict[str, Any], body: Dict[str, Any]) -> Optional[str]:
-    for container in (body, entry):
-        value = container.get("reader")
-        if isinstance(value, dict):
-            for key in ("name", "hostname", "id"):
-                candidate = value.get(key)
-                if isinstance(candidate, str) and candidate.strip():
-                    return candidate.strip()
-        if isinstance(value, str) and value.strip():
-            return value.strip()
+@frappe.whitelist()
+def get_raddec_feed(since: Optional[str] = None, until: Optional[str] = None) -> Response:
+    """Stream raddec records between `since` and `until`, oldest first, as NDJSON."""
+
+    frappe.has_permission("RFID Tag Event", "read", throw=True)
+    return Response(
+        stream_raddec_feed(since, until),
+        mimetype="application/x-ndjson",
+        direct_passthrough=True,
+    )
 
-    return None
 
+@frappe.whitelist()
+def get_tag_location(epc: str) -> Optional[Dict[str, Any]]:
+    """Return where `epc` was read last, or None if it has not been read."""
 
-def _compute_event_name(rfid_value: str, read_time: datetime) -> str:
-    key = f"{rfid_value.upper()}-{read_time.isoformat()}"
-    return frappe.generate_hash(key, 16)
+    frappe.has_permission("RFID Tag Location", "read", throw=True)
+    return tag_locations([epc]).get((epc or "").strip().upper())
 
 
-def _get_serial_info(rfid_value: str, cache: Dict[str, Optional[Dict[str, str]]]) -> Optional[Dict[str, str]]:
-    if rfid_value in cache:
-        return cache[rfid_value]
+@frappe.whitelist()
+def get_tag_locations(epcs: Any) -> Dict[str, Dict[str, Any]]:
+    """Return the last known location of each EPC, keyed by EPC.
 
-    serial_info = frappe.db.get_value(
-        "Serial No",
-        {"custom_barcode": rfid_value},
-        ["name", "item_code"],
-        as_dict=True,
-    )
-    cache[rfid_value] = serial_info
-    if serial_info:
-        return serial_info
-
-    # fallback to Asset custom RFID
-    asset_info = frappe.db.get_value(
-        "Asset",
-        {"custom_rfid": rfid_value},
-        ["name", "item_code"],
-        as_dict=True,
-    )
-    cache[rfid_value] = asset_info
-    return asset_info
+    `epcs` is a list, a JSON array or a comma-separated string. EPCs that have
+    never been read are left out of the result.
+    """
 
+    frappe.has_permission("RFID Tag Location", "read", throw=True)
+    if isinstance(epcs, str):
+        epcs = json.loads(epcs) if epcs.lstrip().startswith("[") else epcs.split(",")
+    return tag_locations(epcs)
 
-@frappe.whitelist(allow_guest=True)
-def ingest_impinj_events() -> Dict[str, Any]:
-    """
-    Accept tag read notifications coming from Impinj R700.
 
-    The reader should authenticate using an API key/secret pair so that
-    `frappe.session.user` is not Guest.
-    """
+@frappe.whitelist()
+def get_pending_print_count(filters: Any = None) -> Dict[str, Any]:
+    """Number card: RFID Print Queue entries waiting to be printed."""
 
-    if frappe.session.user == "Guest":
-        frappe.throw(_("Authentication required."), frappe.AuthenticationError)
+    frappe.has_permission("RFID Print Queue", "read", throw=True)
+    return _card_value(counters.get_gauge(counters.PENDING_PRINTS))
 
-    payload = frappe.request.get_json(silent=True)
-    if not payload:
-        frappe.throw(_("Request body must contain valid JSON payload."))
 
-    serial_cache: Dict[str, Optional[Dict[str, str]]] = {}
-    processed: List[str] = []
-    duplicates: List[str] = []
-    ignored: List[str] = []
+@frappe.whitelist()
+def get_printed_today(filters: Any = None) -> Dict[str, Any]:
+    """Number card: RFID Print Queue entries completed today."""
+
+    frappe.has_permission("RFID Print Queue", "read", throw=True)
+    return _card_value(counters.get_daily(counters.PRINTS_COMPLETED))
+
 
-    for node in _iter_impinj_nodes(payload):
-        body = node
+@frappe.whitelist()
+def get_serials_created_today(filters: Any = None) -> Dict[str, Any]:
+    """Number card: Serial Nos created today."""
 
-        if isinstance(node, dict):
-            data_section = node.get("data")
-            if isinstance(data_section, dict):
-                body = data_section
+    frappe.has_permission("Serial No", "read", throw=True)
+    return _card_value(counters.get_daily(counters.SERIALS_CREATED))
 
-        if not isinstance(body, dict):
-            continue
 
-        epc = _extract_epc(body)
-        if not epc:
-            continue
+@frappe.whitelist()
+def get_tagged_asset_count(filters: Any = None) -> Dict[str, Any]:
+    """Number card: Assets carrying an RFID tag."""
 
-        read_time = _extract_timestamp(node if isinstance(node, dict) else {}, body)
-        if not read_time:
-            read_time = now_datetime()
+    frappe.has_permission("Asset", "read", throw=True)
+    return _card_value(counters.get_gauge(counters.TAGGED_ASSETS))
 
-        event_name = _compute_event_name(epc, read_time)
-        if frappe.db.exists("RFID Tag Event", event_name):
-            duplicates.append(epc)
-            continue
 
-        reader_name = _extract_reader(node if isinstance(node, dict) else {}, body)
-        antenna_port = body.get("antennaPort") or body.get("antenna") or body.get("antenna_port")
-        try:
-            antenna_port = int(antenna_port) if antenna_port is not None else None
-        except (TypeError, ValueError):
-            antenna_port = None
-
-        rssi = _extract_rssi(body)
-
-        serial_info = _get_serial_info(epc, serial_cache)
-
-        base_event = {
-            "doctype": "RFID Tag Event",
-            "name": event_name,
-            "rfid": epc,
-            "reader": reader_name,
-            "antenna_port": antenna_port,
-            "read_time": read_time,
-            "rssi": rssi,
-            "raw_payload": frappe.as_json(node),
-        }
+@frappe.whitelist()
+def get_stock_entries_7d(filters: Any = None) -> Dict[str, Any]:
+    """Number card: Stock Entries created today and in the six days before."""
+
+    frappe.has_permission("Stock Entry", "read", throw=True)
+    return _card_value(counters.get_daily(counters.STOCK_ENTRIES, days=7))
+
+
+@frappe.whitelist()
+def get_tag_reads_last_hour(filters: Any = None) -> Dict[str, Any]:
+    """Number card: tag reads ingested in the last 60 minutes."""
 
-        raddec_payload = build_raddec(base_event)
-        if raddec_payload:
-            base_event["raddec"] = frappe.as_json(raddec_payload)
+    frappe.has_permission("RFID Tag Event", "read", throw=True)
+    return _card_value(counters.get_reads_last_hour())
 
-        doc = frappe.get_doc(base_event)
 
-        if serial_info:
-            doc.serial_no = serial_info.get("name")
-            doc.item_code = serial_info.get("item_code")
+@frappe.whitelist()
+def get_unique_tags_today(filters: Any = None) -> Dict[str, Any]:
+    """Number card: distinct EPCs read today (HyperLogLog estimate, within about 1%)."""
+
+    frappe.has_permission("RFID Tag Event", "read", throw=True)
+    return _card_value(counters.get_unique_tags_today())
+
+
+def _card_value(value: int) -> Dict[str, Any]:
+    return {"value": value, "fieldtype": "Int"}
+
+
+@frappe.whitelist()
+def get_epc_cache_stats() -> Dict[str, Any]:
+    """Return hit/miss counters of the shared EPC resolution cache and foreign-tag filter."""
+
+    frappe.only_for("System Manager")
+    stats = get_cache_stats()
+    stats["foreign_filter"] = get_filter_stats()
+    return stats
+
+
+@frappe.whitelist()
+def get_ingest_queue_stats() -> Dict[str, Any]:
+    """Return depth and lag of the queued-ingest intake and partition lists."""
+
+    frappe.only_for("System Manager")
+    return get_queue_stats()
+
+
+@frappe.whitelist()
+def replay_webhook_deliveries(names: Any = None, webhook: Optional[str] = None) -> Dict[str, Any]:
+    """Queue dead-lettered RFID Webhook Delivery rows for delivery again.
+
+    `names` (a list or JSON array) limits the replay to those rows, `webhook`
+    to one endpoint; without either every dead row is replayed.
+    """
+
+    frappe.only_for("System Manager")
+    if isinstance(names, str):
+        names = json.loads(names)
+    return {"replayed": replay_deliveries(names, webhook)}
+
+
+@frappe.whitelist()
+def get_raw_payload(event: str) -> Any:
+    """Return the raw read stored for an RFID Tag Event, whichever way it was stored."""
+
+    frappe.has_permission("RFID Tag Event", "read", event, throw=True)
+    return load_raw_node(event)
+
+
+@frappe.whitelist(allow_guest=True)
+def ingest_impinj_events() -> Dict[str, Any]:
+    """
+    Accept tag read notifications coming from Impinj R700.
+
+    The reader should authenticate using an API key/secret pair so that
+    `frappe.session.user` is not Guest.
+    """
+
+    if frappe.session.user == "Guest":
+        frappe.throw(_("Authentication required."), frappe.AuthenticationError)
+
+    body = frappe.request.get_data()
+    if not body:
+        frappe.throw(_("Request body must contain valid JSON payload."))
 
+    queued = is_queued_mode()
+    payload = None
+    if not queued:
         try:
-            doc.insert(ignore_permissions=True)
-            processed.append(doc.name)
-
-            if raddec_payload:
-                dispatch_raddec_event(
-                    raddec_payload,
-                    {
-                        "docname": doc.name,
-                        "reader": reader_name,
-                        "rfid": epc,
-                        "source": "impinj",
-                    },
-                )
-        except Exception:
-            frappe.log_error(frappe.get_traceback(), "RFID Impinj ingest failure")
-            ignored.append(epc)
-
-    if processed:
-        frappe.db.commit()
-
-    return {
-        "processed": len(processed),
-        "duplicates": len(duplicates),
-        "errors": len(ignored),
-        "processed_names": processed,
-        "duplicate_tags": duplicates,
-        "error_tags": ignored,
-    }
+            payload = loads(body)
+        except ValueError:
+            payload = None
+        if not payload:
+            frappe.throw(_("Request body must contain valid JSON payload."))
+
+    # A retried request is answered with the response stored for the original.
+    request_key = get_request_key(body, payload)
+    stored = get_stored_response(request_key)
+    if stored:
+        status_code, response = stored
+        frappe.local.response.http_status_code = status_code
+        return {**response, "replayed": True}
+
+    if queued:
+        # Queued mode: store the body as-is and let the drain jobs parse it.
+        response = enqueue_payload(body)
+        frappe.local.response.http_status_code = 202
+        store_response(request_key, 202, response)
+        return response
+
+    response = process_impinj_payload(payload, raw_body=body)
+    store_response(request_key, 200, response)
+    return response
@@ -1,8 +1,20 @@
 import frappe
 from rfid.rfid.api import generate_unique_hex
+from rfid.rfid.services.counters import TAGGED_ASSETS, increment
+from rfid.rfid.services.registry import sync_doc_epc
 
 def before_save(doc,method=None):
     item_barcode = frappe.db.get_value('Item',doc.item_code,'custom_barcode')
     if item_barcode:
         doc.custom_rfid =  generate_unique_hex(12)
-        
\ No newline at end of file
+    sync_doc_epc(doc, 'custom_rfid')
+
+def on_update(doc,method=None):
+    before = doc.get_doc_before_save()
+    tagged = bool(doc.custom_rfid) - bool(before and before.custom_rfid)
+    if tagged:
+        increment(TAGGED_ASSETS, tagged)
+
+def on_trash(doc,method=None):
+    if doc.custom_rfid:
+        increment(TAGGED_ASSETS, -1)
@@ -1,6 +1,7 @@
 import frappe
 # import itertools
 from rfid.rfid.api import generate_unique_hex
+from rfid.rfid.services.registry import sync_doc_epc
 
 def before_save(doc,method=None):
     # ascii_list = list(itertools.chain(*map(lambda x: map(ord, x), doc.item_code)))
@@ -9,4 +10,5 @@ def before_save(doc,method=None):
     doc.custom_barcode = generate_unique_hex(6)
     if doc.serial_no_series == None:
         doc.serial_no_series = doc.item_code + '.######'
+    sync_doc_epc(doc, 'custom_barcode')
         
\ No newline at end of file
@@ -0,0 +1 @@
+from .rfid_payload_batch import RFIDPayloadBatch
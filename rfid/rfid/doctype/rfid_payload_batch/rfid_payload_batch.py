@@ -0,0 +1,9 @@
+from __future__ import annotations
+
+from frappe.model.document import Document
+
+
+class RFIDPayloadBatch(Document):
+	"""Compressed raw body of one ingest batch, referenced by its tag events."""
+
+	pass
@@ -5,5 +5,21 @@ import frappe
 import itertools
 from frappe.model.document import Document
 
+from rfid.rfid.services.counters import PENDING_PRINTS, PRINTS_COMPLETED, increment, increment_daily
+
 class RFIDPrintQueue(Document):
-	pass
\ No newline at end of file
+	def on_update(self):
+		before = self.get_doc_before_save()
+		previous = before.status if before else None
+		if previous == self.status:
+			return
+
+		pending = (self.status == "Pending") - (previous == "Pending")
+		if pending:
+			increment(PENDING_PRINTS, pending)
+		if self.status == "Completed":
+			increment_daily(PRINTS_COMPLETED)
+
+	def on_trash(self):
+		if self.status == "Pending":
+			increment(PENDING_PRINTS, -1)
\ No newline at end of file
@@ -0,0 +1 @@
+from .rfid_reader import RFIDReader
@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+import frappe
+from frappe import _
+from frappe.model.document import Document
+
+DEFAULT_STREAM_PATH = "/api/v1/data/stream"
+
+
+class RFIDReader(Document):
+	"""An Impinj reader that pushes or streams tag reads into the site."""
+
+	def get_stream_url(self) -> str:
+		if self.stream_url:
+			return self.stream_url
+		return f"https://{self.host}{DEFAULT_STREAM_PATH}"
+
+	def validate(self):
+		if self.stream_enabled and not (self.stream_url or self.host):
+			frappe.throw(_("Set a Host or Stream URL to consume the event stream."))
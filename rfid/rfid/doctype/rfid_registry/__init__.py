@@ -0,0 +1 @@
+from .rfid_registry import RFIDRegistry
@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+import frappe
+from frappe.model.document import Document
+
+
+class RFIDRegistry(Document):
+	"""Maps each issued EPC to the Serial No, Asset or Item that owns it."""
+
+	def autoname(self):
+		# Names are upper-cased so lookups don't depend on how the EPC was written.
+		self.name = (self.epc or "").upper()
+
+
+def on_doctype_update():
+	frappe.db.add_index("RFID Registry", ["reference_doctype", "reference_name"])
@@ -0,0 +1 @@
+from .rfid_settings import RFIDSettings
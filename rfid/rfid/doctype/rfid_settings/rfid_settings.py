@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import cast
+
+SETTINGS_DOCTYPE = "RFID Settings"
+SETTINGS_CACHE_KEY = "rfid_settings"
+
+
+class RFIDSettings(Document):
+	"""Site-wide switches for the RFID ingest and delivery pipeline."""
+
+	def on_update(self):
+		frappe.cache().delete_value(SETTINGS_CACHE_KEY)
+
+
+def get_settings() -> frappe._dict:
+	"""Return RFID Settings values, falling back to field defaults for unsaved fields."""
+
+	return frappe.cache().get_value(SETTINGS_CACHE_KEY, generator=_load_settings)
+
+
+def _load_settings() -> frappe._dict:
+	values = frappe._dict(frappe.db.get_singles_dict(SETTINGS_DOCTYPE, cast=True))
+
+	for df in frappe.get_meta(SETTINGS_DOCTYPE).fields:
+		if df.fieldname not in values and df.default is not None:
+			values[df.fieldname] = cast(df.fieldtype, df.default)
+
+	return values
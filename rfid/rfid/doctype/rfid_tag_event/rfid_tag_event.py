@@ -1,6 +1,10 @@
+import hashlib
+
 import frappe
 from frappe.model.document import Document
-from frappe.utils import now_datetime
+from frappe.utils import get_datetime, now_datetime
+
+EVENT_NAME_LENGTH = 20
 
 
 class RFIDTagEvent(Document):
@@ -14,5 +18,21 @@ class RFIDTagEvent(Document):
 		if not self.read_time:
 			self.read_time = now_datetime()
 
-		key = f"{(self.rfid or '').upper()}-{self.read_time.isoformat()}"
-		self.name = frappe.generate_hash(key, 16)
+		self.name = make_event_name(self.rfid or "", get_datetime(self.read_time), self.reader, self.antenna_port)
+
+
+def make_event_name(rfid_value, read_time, reader=None, antenna_port=None):
+	"""Derive a stable event name from the read itself.
+
+	The same read re-sent by a reader, or ingested by another worker, always
+	maps to the same name, so the primary key rejects the copy.
+	"""
+
+	antenna = "" if antenna_port is None else str(antenna_port)
+	key = f"{rfid_value.upper()}|{reader or ''}|{antenna}|{read_time.isoformat()}"
+	return hashlib.blake2b(key.encode("utf-8"), digest_size=EVENT_NAME_LENGTH // 2).hexdigest()
+
+
+def on_doctype_update():
+	# Keyset pagination of the raddec feed orders and seeks on (read_time, name).
+	frappe.db.add_index("RFID Tag Event", ["read_time", "name"])
@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+import frappe
+from frappe.model.document import Document
+
+
+class RFIDTagLocation(Document):
+	"""Where each EPC was read last; maintained by ingest, one row per tag."""
+
+	def autoname(self):
+		self.name = (self.epc or "").upper()
+
+
+def on_doctype_update():
+	frappe.db.add_index("RFID Tag Location", ["reader", "last_seen"])
+	frappe.db.add_index("RFID Tag Location", ["reference_doctype", "reference_name"])
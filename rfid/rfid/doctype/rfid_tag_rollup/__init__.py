@@ -0,0 +1 @@
+from .rfid_tag_rollup import RFIDTagRollup
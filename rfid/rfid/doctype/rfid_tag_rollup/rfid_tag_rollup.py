@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+import hashlib
+
+import frappe
+from frappe.model.document import Document
+
+ROLLUP_NAME_LENGTH = 20
+
+
+class RFIDTagRollup(Document):
+	"""Hourly summary of the reads of one EPC on one reader antenna."""
+
+	pass
+
+
+def make_rollup_name(hour, rfid_value, reader=None, antenna_port=None):
+	"""Name a rollup after its hour and key so re-running an hour replaces it."""
+
+	antenna = "" if antenna_port is None else str(antenna_port)
+	key = f"{hour.isoformat()}|{rfid_value}|{reader or ''}|{antenna}"
+	return hashlib.blake2b(key.encode("utf-8"), digest_size=ROLLUP_NAME_LENGTH // 2).hexdigest()
+
+
+def on_doctype_update():
+	frappe.db.add_index("RFID Tag Rollup", ["hour"])
+	frappe.db.add_index("RFID Tag Rollup", ["rfid", "hour"])
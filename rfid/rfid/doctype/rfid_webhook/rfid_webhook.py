@@ -1,8 +1,32 @@
 from __future__ import annotations
 
 import frappe
+from frappe import _
 from frappe.model.document import Document
 
+from rfid.rfid.services.encodings import missing_dependency
+from rfid.rfid.services.subscriptions import is_valid_pattern, normalise_pattern, split_values
+from rfid.rfid.services.webhook import invalidate_webhooks
+
 
 class RFIDWebhook(Document):
-	pass
+	def validate(self):
+		invalid = [value for value in split_values(self.filter_epcs) if not is_valid_pattern(normalise_pattern(value))]
+		if invalid:
+			frappe.throw(_("EPC prefixes must be hex digits with ? or x wildcards: {0}").format(", ".join(invalid)))
+
+		antennas = split_values(self.filter_antennas)
+		if any(not value.isdigit() for value in antennas):
+			frappe.throw(_("Antennas must be port numbers, e.g. 1, 2."))
+
+		missing = missing_dependency(self.encoding, self.compression)
+		if missing:
+			frappe.throw(missing)
+
+	def on_update(self):
+		# Workers reloading before the commit would cache the old row again.
+		frappe.db.after_commit.add(invalidate_webhooks)
+
+	def on_trash(self):
+		name = self.name
+		frappe.db.after_commit.add(lambda: invalidate_webhooks(drop_queue=name))
@@ -0,0 +1,15 @@
+from __future__ import annotations
+
+import frappe
+from frappe.model.document import Document
+
+
+class RFIDWebhookDelivery(Document):
+	"""One request body queued for an RFID Webhook, with the outcome of its attempts."""
+
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("RFID Webhook Delivery", ["webhook", "status", "next_attempt"])
+	frappe.db.add_index("RFID Webhook Delivery", ["status", "creation"])
@@ -0,0 +1,32 @@
+frappe.listview_settings['RFID Webhook Delivery'] = {
+    add_fields: ['status', 'attempts'],
+
+    get_indicator(doc) {
+        const colors = {Pending: 'blue', Retrying: 'orange', Delivered: 'green', Dead: 'red'};
+        return [__(doc.status), colors[doc.status] || 'gray', `status,=,${doc.status}`];
+    },
+
+    onload(listview) {
+        const replay = (args) => {
+            frappe.call({
+                method: 'rfid.rfid.api.replay_webhook_deliveries',
+                args,
+                callback(r) {
+                    frappe.show_alert({message: __('{0} deliveries queued again', [r.message.replayed]), indicator: 'green'});
+                    listview.refresh();
+                },
+            });
+        };
+
+        listview.page.add_action_item(__('Replay'), () => {
+            const names = listview.get_checked_items(true);
+            if (names.length) {
+                replay({names});
+            }
+        });
+
+        listview.page.add_menu_item(__('Replay All Dead'), () => {
+            frappe.confirm(__('Queue every dead-lettered delivery again?'), () => replay({}));
+        });
+    },
+};
@@ -0,0 +1,8 @@
+from rfid.rfid.services.counters import SERIALS_CREATED, increment_daily
+from rfid.rfid.services.registry import sync_doc_epc
+
+def before_save(doc,method=None):
+    sync_doc_epc(doc, 'custom_barcode')
+
+def after_insert(doc,method=None):
+    increment_daily(SERIALS_CREATED)
@@ -2,10 +2,15 @@ import frappe
 # import itertools
 # import hashlib
 from rfid.rfid.api import generate_unique_hex
+from rfid.rfid.services.counters import STOCK_ENTRIES, increment_daily
+from rfid.rfid.services.registry import register_epcs
 
 def on_submit(doc,method=None):
-    serials = frappe.db.get_list('Serial No',{'purchase_document_no':doc.name}, pluck='name')
-    for serial in serials:
+    serials = frappe.db.get_list('Serial No',{'purchase_document_no':doc.name}, ['name','item_code','custom_barcode'])
+    registry_entries = []
+    stale_rfids = []
+    for serial_row in serials:
+        serial = serial_row.name
         # input_string = serial
         # # Calculate the SHA-256 hash of the input string
         # sha256_hash = hashlib.sha256(input_string.encode()).hexdigest()
@@ -16,4 +21,10 @@ def on_submit(doc,method=None):
 
         rfid_data = generate_unique_hex(12)
         frappe.db.set_value('Serial No',serial,'custom_barcode',rfid_data)
-    frappe.db.commit()
\ No newline at end of file
+        registry_entries.append((serial, rfid_data, serial_row.item_code))
+        stale_rfids.append(serial_row.custom_barcode)
+    register_epcs('Serial No', registry_entries, stale=stale_rfids)
+    frappe.db.commit()
+
+def after_insert(doc,method=None):
+    increment_daily(STOCK_ENTRIES)
@@ -0,0 +1,153 @@
+// Live view of tag reads pushed by rfid.rfid.services.live as coalesced
+// frames, one per reader and frame window.
+
+const LIVE_EVENT = "rfid_live_frame";
+const TAG_EVENT_DOCTYPE = "RFID Tag Event";
+// Tags not read for this long fade out of the table.
+const STALE_AFTER_MS = 30000;
+
+frappe.pages["rfid-live-monitor"].on_page_load = function (wrapper) {
+    const page = frappe.ui.make_app_page({
+        parent: wrapper,
+        title: __("RFID Live Monitor"),
+        single_column: true,
+    });
+    wrapper.monitor = new RFIDLiveMonitor(page);
+};
+
+frappe.pages["rfid-live-monitor"].on_page_show = function (wrapper) {
+    wrapper.monitor && wrapper.monitor.subscribe();
+};
+
+frappe.pages["rfid-live-monitor"].on_page_hide = function (wrapper) {
+    wrapper.monitor && wrapper.monitor.unsubscribe();
+};
+
+class RFIDLiveMonitor {
+    constructor(page) {
+        this.page = page;
+        this.tags = new Map();
+        this.readers = new Set();
+        this.reads = 0;
+        this.render_pending = false;
+        this.on_frame = (frame) => this.handle_frame(frame);
+
+        this.reader_field = page.add_field({
+            fieldname: "reader",
+            label: __("Reader"),
+            fieldtype: "Autocomplete",
+            options: [],
+            change: () => this.reset(),
+        });
+        this.antenna_field = page.add_field({
+            fieldname: "antenna",
+            label: __("Antenna"),
+            fieldtype: "Int",
+            change: () => this.reset(),
+        });
+        page.set_secondary_action(__("Clear"), () => this.reset());
+
+        this.$summary = $('<div class="text-muted small mb-3"></div>').appendTo(page.main);
+        this.$table = $(`
+            <table class="table table-bordered table-hover">
+                <thead>
+                    <tr>
+                        <th>${__("EPC")}</th>
+                        <th>${__("Reader")}</th>
+                        <th class="text-right">${__("Antenna")}</th>
+                        <th class="text-right">${__("RSSI (dBm)")}</th>
+                        <th class="text-right">${__("Reads")}</th>
+                        <th>${__("Last Seen")}</th>
+                    </tr>
+                </thead>
+                <tbody></tbody>
+            </table>
+        `).appendTo(page.main);
+
+        this.subscribe();
+        this.render();
+        // Keep dropping stale tags while no frames arrive.
+        setInterval(() => this.schedule_render(), 5000);
+    }
+
+    subscribe() {
+        if (this.subscribed) return;
+        this.subscribed = true;
+        frappe.realtime.doctype_subscribe(TAG_EVENT_DOCTYPE);
+        frappe.realtime.on(LIVE_EVENT, this.on_frame);
+    }
+
+    unsubscribe() {
+        if (!this.subscribed) return;
+        this.subscribed = false;
+        frappe.realtime.off(LIVE_EVENT, this.on_frame);
+        frappe.realtime.doctype_unsubscribe(TAG_EVENT_DOCTYPE);
+    }
+
+    reset() {
+        this.tags.clear();
+        this.reads = 0;
+        this.schedule_render();
+    }
+
+    handle_frame(frame) {
+        const reader = frame.reader || "";
+        if (reader && !this.readers.has(reader)) {
+            this.readers.add(reader);
+            this.reader_field.set_data([...this.readers].sort());
+        }
+
+        const wanted_reader = this.reader_field.get_value();
+        if (wanted_reader && wanted_reader !== reader) return;
+        const wanted_antenna = cint(this.antenna_field.get_value());
+
+        for (const tag of frame.tags) {
+            if (wanted_antenna && tag.antenna !== wanted_antenna) continue;
+            const key = `${reader}|${tag.epc}|${tag.antenna}`;
+            const row = this.tags.get(key) || { reader, epc: tag.epc, antenna: tag.antenna, count: 0 };
+            row.count += tag.count;
+            row.last = Math.max(row.last || 0, tag.last);
+            // Staleness follows arrival here, not the reader's clock.
+            row.seen = Date.now();
+            if (tag.rssi !== null) row.rssi = tag.rssi;
+            this.tags.delete(key);
+            this.tags.set(key, row);
+            this.reads += tag.count;
+        }
+        this.schedule_render();
+    }
+
+    schedule_render() {
+        // Frames of several readers arriving together are drawn once.
+        if (this.render_pending) return;
+        this.render_pending = true;
+        requestAnimationFrame(() => {
+            this.render_pending = false;
+            this.render();
+        });
+    }
+
+    render() {
+        const now = Date.now();
+        for (const [key, row] of this.tags) {
+            if (now - row.seen > STALE_AFTER_MS) this.tags.delete(key);
+        }
+
+        const rows = [...this.tags.values()].reverse().map(
+            (row) => `
+                <tr>
+                    <td class="text-monospace">${frappe.utils.escape_html(row.epc)}</td>
+                    <td>${frappe.utils.escape_html(row.reader || __("Unknown"))}</td>
+                    <td class="text-right">${row.antenna ?? ""}</td>
+                    <td class="text-right">${row.rssi == null ? "" : format_number(row.rssi, null, 1)}</td>
+                    <td class="text-right">${row.count}</td>
+                    <td>${new Date(row.last).toLocaleTimeString()}</td>
+                </tr>`
+        );
+
+        this.$table.find("tbody").html(
+            rows.length ? rows.join("") : `<tr><td colspan="6" class="text-muted text-center">${__("Waiting for tag reads…")}</td></tr>`
+        );
+        this.$summary.text(__("{0} tags in view, {1} reads", [this.tags.size, this.reads]));
+    }
+}
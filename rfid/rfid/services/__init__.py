@@ -1,6 +1,6 @@
 """Helper services for RFID integrations."""
 
 from .raddec import build_raddec
-from .webhook import dispatch_raddec_event
+from .webhook import dispatch_raddec_event, dispatch_raddec_events
 
-__all__ = ["build_raddec", "dispatch_raddec_event"]
+__all__ = ["build_raddec", "dispatch_raddec_event", "dispatch_raddec_events"]
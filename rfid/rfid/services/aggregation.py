@@ -0,0 +1,245 @@
+"""Read-window aggregation of repeated tag reads.
+
+A tag sitting in the field is reported many times per second. Reads of the same
+EPC on the same reader and antenna that arrive within the read window of each
+other are folded into one RFID Tag Event carrying first/last seen timestamps,
+read count and peak/mean RSSI. The aggregate stays open in Redis for the length
+of the window so reads arriving in later requests update it instead of adding
+rows.
+
+An ingest holds a lock on the aggregates of its reads from loading them until
+its transaction commits and the updated aggregates are written back, so
+concurrent requests for the same tag do not overwrite each other's counts.
+Reads that arrive late, older than the last read of their aggregate, are
+folded in as well; a read the aggregate has already counted, e.g. from a
+re-sent batch, is skipped.
+"""
+
+from __future__ import annotations
+
+import math
+import pickle
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import frappe
+
+from .timestamps import epoch_ms
+
+REDIS_OPEN_PREFIX = "rfid_open_read"
+REDIS_LOCK_PREFIX = "rfid_open_read_lock"
+DEFAULT_READ_WINDOW = 5.0
+# Milliseconds after which the lock of an ingest that never finished expires.
+LOCK_TIMEOUT_MS = 30000
+# Seconds to wait for aggregates locked by a concurrent ingest; reads whose
+# aggregate is still locked after that start a new one.
+LOCK_WAIT = 0.5
+LOCK_POLL_INTERVAL = 0.02
+# Read times (epoch milliseconds, oldest first) remembered per aggregate to
+# recognise reads it already counted.
+MAX_SEEN_READS = 512
+
+AggregateKey = Tuple[str, str, str]
+
+
+def aggregate_events(
+	events: List[Dict[str, Any]], window: float
+) -> Tuple[List[Dict[str, Any]], Dict[str, Dict[str, Any]], Dict[AggregateKey, Dict[str, Any]], int]:
+	"""Fold ``events`` into read-window aggregates.
+
+	Returns ``(new_events, updates, open_states, folded)``: events that start a
+	new aggregate and must be inserted, column updates for aggregates already
+	stored by an earlier request, the open aggregate state per key, and the
+	number of reads folded away. Reads the aggregate had already counted are
+	marked ``_resent``.
+	"""
+
+	groups: Dict[AggregateKey, List[Dict[str, Any]]] = {}
+	for event in events:
+		groups.setdefault(_aggregate_key(event), []).append(event)
+
+	locked = set(_lock_keys(list(groups)))
+	open_states = _load_open_states(list(locked))
+	new_events: List[Dict[str, Any]] = []
+	new_states: List[Dict[str, Any]] = []
+	updated: Dict[str, Dict[str, Any]] = {}
+	folded = 0
+
+	for key, reads in groups.items():
+		reads.sort(key=lambda event: event["read_time"].timestamp())
+		state = open_states.get(key)
+
+		for read in reads:
+			read_ts = read["read_time"].timestamp()
+
+			if state and epoch_ms(read["read_time"]) in state["seen"]:
+				# Already counted in this aggregate, e.g. a re-sent batch.
+				read["_resent"] = True
+				folded += 1
+				continue
+
+			if state and state["read_time"].timestamp() - window <= read_ts <= state["last_seen"].timestamp() + window:
+				_fold(state, read)
+				folded += 1
+				if not state["is_new"]:
+					updated[state["name"]] = state
+				continue
+
+			state = _open_state(read)
+			new_states.append(state)
+			new_events.append(read)
+
+		# Aggregates another ingest holds are stored, but not kept open.
+		if key in locked:
+			open_states[key] = state
+
+	for event, state in zip(new_events, new_states):
+		event.update(_state_values(state))
+
+	updates: Dict[str, Dict[str, Any]] = {}
+	for name, state in updated.items():
+		values = _state_values(state)
+		updates[name] = {field: value for field, value in values.items() if value is not None}
+
+	return new_events, updates, open_states, folded
+
+
+def save_open_states(open_states: Dict[AggregateKey, Dict[str, Any]], stored: Iterable[str], window: float) -> None:
+	"""Keep aggregates whose row was stored open in Redis for one more read window.
+
+	They are written, and their locks released, once the transaction commits.
+	"""
+
+	stored = set(stored)
+	states = {key: {**state, "is_new": False} for key, state in open_states.items() if state["name"] in stored}
+	if not states:
+		_unlock_keys(open_states)
+		return
+
+	ttl = max(1, math.ceil(window))
+
+	def write() -> None:
+		cache = frappe.cache()
+		pipe = cache.pipeline()
+		for key, state in states.items():
+			pipe.set(_redis_key(cache, key), pickle.dumps(state), ex=ttl)
+		for key in open_states:
+			pipe.delete(_lock_key(cache, key))
+		pipe.execute()
+
+	frappe.db.after_commit.add(write)
+
+
+def _aggregate_key(event: Dict[str, Any]) -> AggregateKey:
+	antenna = event.get("antenna_port")
+	return (event["rfid"], event.get("reader") or "", "" if antenna is None else str(antenna))
+
+
+def _redis_key(cache, key: AggregateKey) -> str:
+	return cache.make_key(f"{REDIS_OPEN_PREFIX}|{'|'.join(key)}")
+
+
+def _lock_key(cache, key: AggregateKey) -> str:
+	return cache.make_key(f"{REDIS_LOCK_PREFIX}|{'|'.join(key)}")
+
+
+def _lock_keys(keys: List[AggregateKey]) -> List[AggregateKey]:
+	"""Lock the aggregates of ``keys``, waiting a little for those another
+	ingest holds; returns the keys locked."""
+
+	cache = frappe.cache()
+	locked: List[AggregateKey] = []
+	waiting = keys
+	deadline = time.monotonic() + LOCK_WAIT
+	while waiting:
+		pipe = cache.pipeline()
+		for key in waiting:
+			pipe.set(_lock_key(cache, key), 1, nx=True, px=LOCK_TIMEOUT_MS)
+		acquired = pipe.execute()
+		locked.extend(key for key, ok in zip(waiting, acquired) if ok)
+		waiting = [key for key, ok in zip(waiting, acquired) if not ok]
+		if not waiting or time.monotonic() >= deadline:
+			break
+		time.sleep(LOCK_POLL_INTERVAL)
+
+	if locked:
+		frappe.db.after_rollback.add(lambda: _unlock_keys(locked))
+	return locked
+
+
+def _unlock_keys(keys: Iterable[AggregateKey]) -> None:
+	keys = list(keys)
+	if not keys:
+		return
+
+	cache = frappe.cache()
+	cache.delete(*(_lock_key(cache, key) for key in keys))
+
+
+def _load_open_states(keys: List[AggregateKey]) -> Dict[AggregateKey, Dict[str, Any]]:
+	if not keys:
+		return {}
+
+	cache = frappe.cache()
+	raw_states = cache.mget([_redis_key(cache, key) for key in keys])
+	states = {key: pickle.loads(raw) for key, raw in zip(keys, raw_states) if raw is not None}
+	for state in states.values():
+		state.setdefault("seen", {epoch_ms(state["last_seen"]): None})
+	return states
+
+
+def _open_state(event: Dict[str, Any]) -> Dict[str, Any]:
+	rssi = event.get("rssi")
+	return {
+		"name": event["name"],
+		"is_new": True,
+		"rfid": event["rfid"],
+		"reader": event.get("reader"),
+		"antenna_port": event.get("antenna_port"),
+		"read_time": event["read_time"],
+		"last_seen": event["read_time"],
+		"read_count": 1,
+		"peak_rssi": rssi,
+		"rssi_sum": rssi or 0.0,
+		"rssi_reads": 0 if rssi is None else 1,
+		"seen": {epoch_ms(event["read_time"]): None},
+	}
+
+
+def _fold(state: Dict[str, Any], event: Dict[str, Any]) -> None:
+	# The folded read lives on as the aggregate row.
+	event["_aggregate"] = state["name"]
+	# Late reads widen the aggregate backwards instead of moving its end.
+	if event["read_time"] > state["last_seen"]:
+		state["last_seen"] = event["read_time"]
+	elif event["read_time"] < state["read_time"]:
+		state["read_time"] = event["read_time"]
+	state["read_count"] += 1
+	seen = state["seen"]
+	seen[epoch_ms(event["read_time"])] = None
+	if len(seen) > MAX_SEEN_READS:
+		del seen[next(iter(seen))]
+
+	rssi = event.get("rssi")
+	if rssi is not None:
+		state["rssi_sum"] += rssi
+		state["rssi_reads"] += 1
+		if state["peak_rssi"] is None or rssi > state["peak_rssi"]:
+			state["peak_rssi"] = rssi
+
+
+def _state_values(state: Dict[str, Any]) -> Dict[str, Any]:
+	mean_rssi: Optional[float] = None
+	if state["rssi_reads"]:
+		mean_rssi = state["rssi_sum"] / state["rssi_reads"]
+
+	values = {
+		"first_seen": state["read_time"],
+		"last_seen": state["last_seen"],
+		"read_count": state["read_count"],
+		"rssi": state["peak_rssi"],
+		"peak_rssi": state["peak_rssi"],
+		"mean_rssi": mean_rssi,
+	}
+
+	return values
@@ -0,0 +1,64 @@
+"""Micro-batching helper shared by the long-running ingest consumers."""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from typing import Any, Callable, List, Optional
+
+# Upper bound on how long a blocked get may delay noticing ``stop``.
+POLL_INTERVAL = 0.5
+
+
+class MicroBatcher:
+	"""Drain ``source`` and hand items to ``flush`` once ``max_items`` are
+	collected or the oldest item has waited ``max_latency`` seconds."""
+
+	def __init__(
+		self,
+		source: "queue.Queue[Any]",
+		flush: Callable[[List[Any]], None],
+		max_items: int,
+		max_latency: float,
+	):
+		self.source = source
+		self.flush = flush
+		self.max_items = max(1, max_items)
+		self.max_latency = max(0.0, max_latency)
+
+	def run(self, stop: threading.Event) -> None:
+		"""Batch until ``stop`` is set, then flush whatever is still buffered."""
+
+		batch: List[Any] = []
+		deadline: Optional[float] = None
+
+		while not stop.is_set():
+			timeout = POLL_INTERVAL
+			if deadline is not None:
+				timeout = min(timeout, max(0.0, deadline - time.monotonic()))
+			try:
+				item = self.source.get(timeout=timeout)
+			except queue.Empty:
+				pass
+			else:
+				if not batch:
+					deadline = time.monotonic() + self.max_latency
+				batch.append(item)
+
+			if batch and (len(batch) >= self.max_items or time.monotonic() >= deadline):
+				self._flush(batch)
+				batch, deadline = [], None
+
+		while True:
+			try:
+				batch.append(self.source.get_nowait())
+			except queue.Empty:
+				break
+
+		if batch:
+			self._flush(batch)
+
+	def _flush(self, batch: List[Any]) -> None:
+		for start in range(0, len(batch), self.max_items):
+			self.flush(batch[start : start + self.max_items])
@@ -0,0 +1,251 @@
+"""Bloom filter of issued EPCs used to skip resolution of foreign tags.
+
+Most reads at a portal come from tags we never issued. The filter answers
+"definitely not ours" without touching Redis hashes or the database; only EPCs
+that may be ours go on to the resolver. The bit array lives in Redis so every
+worker shares it, and each worker keeps a local copy that is reloaded when the
+shared version changes.
+
+A rebuild reads the registry while EPCs keep being registered. EPCs added
+while it runs are also collected in a Redis set, which the rebuild folds into
+the new filter in the same transaction that swaps it in.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import frappe
+from frappe.utils import cint, flt
+
+from rfid.rfid.doctype.rfid_settings.rfid_settings import get_settings
+
+REDIS_BITS_KEY = "rfid_epc_bloom"
+REDIS_META_KEY = "rfid_epc_bloom_meta"
+REDIS_VERSION_KEY = "rfid_epc_bloom_version"
+REDIS_STATS_KEY = "rfid_epc_bloom_stats"
+REDIS_REBUILDING_KEY = "rfid_epc_bloom_rebuilding"
+REDIS_PENDING_KEY = "rfid_epc_bloom_pending"
+# Seconds after which a rebuild that never finished stops collecting EPCs.
+REBUILD_TIMEOUT = 60 * 60
+DEFAULT_FALSE_POSITIVE_RATE = 0.01
+MIN_CAPACITY = 10000
+# Rebuilt filters leave room for this many times the current EPC count.
+CAPACITY_HEADROOM = 2
+REBUILD_CHUNK_SIZE = 50000
+
+
+class BloomFilter:
+	"""Fixed-size Bloom filter with Redis-compatible (MSB first) bit ordering."""
+
+	def __init__(self, size_bits: int, hashes: int, data: Optional[bytes] = None):
+		self.size_bits = size_bits
+		self.hashes = hashes
+		self.bits = bytearray(data) if data is not None else bytearray((size_bits + 7) // 8)
+
+	@classmethod
+	def for_capacity(cls, capacity: int, false_positive_rate: float) -> "BloomFilter":
+		capacity = max(capacity, 1)
+		size_bits = math.ceil(-capacity * math.log(false_positive_rate) / (math.log(2) ** 2))
+		hashes = max(1, round(size_bits / capacity * math.log(2)))
+		return cls(size_bits, hashes)
+
+	def positions(self, value: str) -> List[int]:
+		digest = hashlib.blake2b(value.encode("utf-8"), digest_size=16).digest()
+		h1 = int.from_bytes(digest[:8], "big")
+		h2 = int.from_bytes(digest[8:], "big") | 1
+		return [(h1 + i * h2) % self.size_bits for i in range(self.hashes)]
+
+	def add(self, value: str) -> None:
+		for pos in self.positions(value):
+			self.bits[pos >> 3] |= 0x80 >> (pos & 7)
+
+	def __contains__(self, value: str) -> bool:
+		bits = self.bits
+		for pos in self.positions(value):
+			if not bits[pos >> 3] & (0x80 >> (pos & 7)):
+				return False
+		return True
+
+
+# One local copy per site, tagged with the shared version it was loaded from.
+_local_filters: Dict[str, Tuple[int, Optional[BloomFilter]]] = {}
+
+
+def split_known(epcs: Iterable[str]) -> Tuple[Set[str], Set[str]]:
+	"""Split EPCs into ``(maybe_known, foreign)``.
+
+	When the filter is disabled or has not been built yet every EPC is
+	reported as maybe known.
+	"""
+
+	epcs = set(epcs)
+	bloom = _get_local_filter() if get_settings().skip_foreign_epcs else None
+	if bloom is None:
+		return epcs, set()
+
+	maybe_known = {epc for epc in epcs if epc in bloom}
+	foreign = epcs - maybe_known
+	_record_stats(checked=len(epcs), rejected=len(foreign))
+	return maybe_known, foreign
+
+
+def record_false_positives(count: int) -> None:
+	"""Count EPCs that passed the filter but turned out not to be registered."""
+
+	if count:
+		_record_stats(false_positives=count)
+
+
+def add_epcs(epcs: Iterable[Optional[str]]) -> None:
+	"""Add newly assigned EPCs to the shared filter."""
+
+	keys = {epc.upper() for epc in epcs if epc}
+	if not keys:
+		return
+
+	cache = frappe.cache()
+	meta_key = cache.make_key(REDIS_META_KEY)
+	rebuilding_key = cache.make_key(REDIS_REBUILDING_KEY)
+	bits_key = cache.make_key(REDIS_BITS_KEY)
+
+	def add(pipe) -> bool:
+		meta = pipe.hgetall(meta_key)
+		rebuilding = pipe.exists(rebuilding_key)
+		pipe.multi()
+		if rebuilding:
+			pending_key = cache.make_key(REDIS_PENDING_KEY)
+			pipe.sadd(pending_key, *keys)
+			pipe.expire(pending_key, REBUILD_TIMEOUT)
+		if not meta:
+			# Nothing built yet; the next rebuild picks these up from the registry.
+			return False
+
+		bloom = BloomFilter(cint(meta[b"size_bits"]), cint(meta[b"hashes"]))
+		for epc in keys:
+			for pos in bloom.positions(epc):
+				pipe.setbit(bits_key, pos, 1)
+		pipe.hincrby(meta_key, "count", len(keys))
+		pipe.incr(cache.make_key(REDIS_VERSION_KEY))
+		return cint(meta[b"count"]) + len(keys) > cint(meta[b"capacity"])
+
+	# Retried when another add, or a rebuild starting or swapping its filter in,
+	# changes the watched keys meanwhile.
+	if cache.transaction(add, meta_key, rebuilding_key, value_from_callable=True):
+		frappe.enqueue(
+			"rfid.rfid.services.bloom.rebuild_filter",
+			queue="long",
+			job_id="rfid_epc_bloom_rebuild",
+			deduplicate=True,
+		)
+
+
+def rebuild_filter() -> Dict[str, Any]:
+	"""Rebuild the shared filter from every EPC in the RFID Registry."""
+
+	from .registry import REGISTRY_DOCTYPE
+
+	cache = frappe.cache()
+	# From here on add_epcs also collects new EPCs for the swap below.
+	cache.set(cache.make_key(REDIS_REBUILDING_KEY), 1, ex=REBUILD_TIMEOUT)
+
+	count = frappe.db.count(REGISTRY_DOCTYPE)
+	capacity = max(MIN_CAPACITY, count * CAPACITY_HEADROOM)
+	rate = flt(get_settings().bloom_false_positive_rate) or DEFAULT_FALSE_POSITIVE_RATE
+	bloom = BloomFilter.for_capacity(capacity, rate)
+
+	start = 0
+	while True:
+		names = frappe.get_all(
+			REGISTRY_DOCTYPE,
+			pluck="name",
+			order_by="name asc",
+			start=start,
+			page_length=REBUILD_CHUNK_SIZE,
+		)
+		if not names:
+			break
+		for name in names:
+			bloom.add(name)
+		start += REBUILD_CHUNK_SIZE
+
+	pending_key = cache.make_key(REDIS_PENDING_KEY)
+	rebuilding_key = cache.make_key(REDIS_REBUILDING_KEY)
+
+	def swap(pipe) -> int:
+		pending = pipe.smembers(pending_key)
+		for epc in pending:
+			bloom.add(epc.decode())
+		pipe.multi()
+		pipe.set(cache.make_key(REDIS_BITS_KEY), bytes(bloom.bits))
+		pipe.delete(cache.make_key(REDIS_META_KEY))
+		pipe.hset(
+			cache.make_key(REDIS_META_KEY),
+			mapping={"size_bits": bloom.size_bits, "hashes": bloom.hashes, "capacity": capacity, "count": count + len(pending)},
+		)
+		pipe.incr(cache.make_key(REDIS_VERSION_KEY))
+		pipe.delete(pending_key, rebuilding_key)
+		return len(pending)
+
+	# Swapped in together with the EPCs added since the scan began; retried
+	# when more are added before the swap.
+	count += cache.transaction(swap, pending_key, value_from_callable=True)
+
+	return {"count": count, "capacity": capacity, "size_bits": bloom.size_bits, "hashes": bloom.hashes}
+
+
+def get_filter_stats() -> Dict[str, Any]:
+	"""Return filter sizing plus hit and false-positive rates across all workers."""
+
+	cache = frappe.cache()
+	pipe = cache.pipeline()
+	pipe.hgetall(cache.make_key(REDIS_META_KEY))
+	pipe.hgetall(cache.make_key(REDIS_STATS_KEY))
+	meta, stats = ({key.decode(): cint(value) for key, value in values.items()} for values in pipe.execute())
+
+	checked = stats.get("checked", 0)
+	rejected = stats.get("rejected", 0)
+	false_positives = stats.get("false_positives", 0)
+	foreign_seen = rejected + false_positives
+
+	return {
+		**meta,
+		"checked": checked,
+		"rejected": rejected,
+		"false_positives": false_positives,
+		"hit_rate": round(rejected / checked, 4) if checked else None,
+		"false_positive_rate": round(false_positives / foreign_seen, 4) if foreign_seen else None,
+	}
+
+
+def _get_local_filter() -> Optional[BloomFilter]:
+	site = frappe.local.site
+	cache = frappe.cache()
+	version = cint(cache.get(cache.make_key(REDIS_VERSION_KEY)))
+
+	cached = _local_filters.get(site)
+	if cached and cached[0] == version:
+		return cached[1]
+
+	pipe = cache.pipeline()
+	pipe.hgetall(cache.make_key(REDIS_META_KEY))
+	pipe.get(cache.make_key(REDIS_BITS_KEY))
+	meta, data = pipe.execute()
+
+	bloom = None
+	if meta and data:
+		bloom = BloomFilter(cint(meta[b"size_bits"]), cint(meta[b"hashes"]), data)
+
+	_local_filters[site] = (version, bloom)
+	return bloom
+
+
+def _record_stats(**counts: int) -> None:
+	cache = frappe.cache()
+	pipe = cache.pipeline()
+	for field, value in counts.items():
+		if value:
+			pipe.hincrby(cache.make_key(REDIS_STATS_KEY), field, value)
+	pipe.execute()
@@ -0,0 +1,213 @@
+"""Precomputed counters behind the RFID workspace number cards.
+
+Cards read Redis instead of running COUNT queries. Doc hooks and ingest keep
+the counters current, doc hooks only once their transaction commits:
+
+- gauges (pending print jobs, tagged assets) move by +1/-1 as documents
+  change state;
+- daily counters keep one key per day, so "today" and "last 7 days" are the
+  sum of one or seven keys and roll over by themselves;
+- tag reads are counted per minute, and the last hour is the sum of sixty
+  keys; unique tags per day are a HyperLogLog.
+
+Bucket keys expire once no window needs them. Gauges and recent buckets are
+rebuilt from the database after migrate, when Redis has lost them, and
+gauges and daily buckets once a day to absorb writes that bypass doc hooks,
+such as Serial Nos created in bulk.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional
+
+import frappe
+from frappe.utils import cint, get_datetime, now_datetime
+
+REDIS_PREFIX = "rfid_counter"
+REDIS_SEEDED_KEY = "rfid_counters_seeded"
+
+PENDING_PRINTS = "pending_prints"
+TAGGED_ASSETS = "tagged_assets"
+SERIALS_CREATED = "serials_created"
+STOCK_ENTRIES = "stock_entries"
+PRINTS_COMPLETED = "prints_completed"
+TAG_READS = "tag_reads"
+UNIQUE_TAGS = "unique_tags"
+
+DAILY_COUNTERS = {
+	SERIALS_CREATED: ("Serial No", "creation", None),
+	STOCK_ENTRIES: ("Stock Entry", "creation", None),
+	PRINTS_COMPLETED: ("RFID Print Queue", "modified", [["status", "=", "Completed"]]),
+}
+# Daily buckets outlive the longest window (7 days) by one day.
+DAILY_TTL = 8 * 86400
+MINUTE_TTL = 2 * 3600
+UNIQUE_TTL = 2 * 86400
+HOUR_MINUTES = 60
+REBUILD_DAYS = 7
+REBUILD_CHUNK_SIZE = 50000
+
+
+def increment(counter: str, amount: int = 1) -> None:
+	"""Add ``amount`` to a gauge once the current transaction commits."""
+
+	def write() -> None:
+		cache = frappe.cache()
+		cache.incrby(_key(cache, counter), amount)
+
+	frappe.db.after_commit.add(write)
+
+
+def increment_daily(counter: str, amount: int = 1, day: Optional[datetime] = None) -> None:
+	"""Add ``amount`` to today's (or ``day``'s) bucket of a daily counter once
+	the current transaction commits."""
+
+	bucket = _day(day or now_datetime())
+
+	def write() -> None:
+		cache = frappe.cache()
+		key = _key(cache, counter, bucket)
+		pipe = cache.pipeline()
+		pipe.incrby(key, amount)
+		pipe.expire(key, DAILY_TTL)
+		pipe.execute()
+
+	frappe.db.after_commit.add(write)
+
+
+def record_reads(epcs: List[str]) -> None:
+	"""Count ingested reads in the current minute and their tags in today's set."""
+
+	if not epcs:
+		return
+
+	now = now_datetime()
+	cache = frappe.cache()
+	minute_key = _key(cache, TAG_READS, _minute(now))
+	unique_key = _key(cache, UNIQUE_TAGS, _day(now))
+	pipe = cache.pipeline()
+	pipe.incrby(minute_key, len(epcs))
+	pipe.expire(minute_key, MINUTE_TTL)
+	pipe.pfadd(unique_key, *set(epcs))
+	pipe.expire(unique_key, UNIQUE_TTL)
+	pipe.execute()
+
+
+def get_gauge(counter: str) -> int:
+	cache = frappe.cache()
+	_ensure_seeded(cache)
+	return cint(cache.get(_key(cache, counter)))
+
+
+def get_daily(counter: str, days: int = 1) -> int:
+	"""Return the counter summed over today and the ``days - 1`` days before it."""
+
+	cache = frappe.cache()
+	_ensure_seeded(cache)
+	today = now_datetime()
+	keys = [_key(cache, counter, _day(today - timedelta(days=offset))) for offset in range(days)]
+	return sum(cint(value) for value in cache.mget(keys))
+
+
+def get_reads_last_hour() -> int:
+	cache = frappe.cache()
+	_ensure_seeded(cache)
+	now = now_datetime()
+	keys = [_key(cache, TAG_READS, _minute(now - timedelta(minutes=offset))) for offset in range(HOUR_MINUTES)]
+	return sum(cint(value) for value in cache.mget(keys))
+
+
+def get_unique_tags_today() -> int:
+	cache = frappe.cache()
+	_ensure_seeded(cache)
+	return cint(cache.pfcount(_key(cache, UNIQUE_TAGS, _day(now_datetime()))))
+
+
+def sync_gauges() -> None:
+	"""Scheduled daily: recount the gauges and the daily buckets of the last
+	``REBUILD_DAYS`` days from the database."""
+
+	cache = frappe.cache()
+	pipe = cache.pipeline()
+	pipe.set(_key(cache, PENDING_PRINTS), frappe.db.count("RFID Print Queue", {"status": "Pending"}))
+	pipe.set(_key(cache, TAGGED_ASSETS), frappe.db.count("Asset", {"custom_rfid": ("is", "set")}))
+
+	today = now_datetime().replace(hour=0, minute=0, second=0, microsecond=0)
+	for counter, (doctype, field, filters) in DAILY_COUNTERS.items():
+		for offset in range(REBUILD_DAYS):
+			day = today - timedelta(days=offset)
+			window = [[doctype, field, ">=", day], [doctype, field, "<", day + timedelta(days=1)]]
+			count = frappe.db.count(doctype, window + [[doctype, *item] for item in (filters or [])])
+			pipe.set(_key(cache, counter, _day(day)), count, ex=DAILY_TTL)
+	pipe.execute()
+
+
+def rebuild_counters() -> None:
+	"""Recompute every counter and the buckets of its window from the database."""
+
+	from .ingest import TAG_EVENT_DOCTYPE
+
+	cache = frappe.cache()
+	sync_gauges()
+
+	now = now_datetime()
+	today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+	pipe = cache.pipeline()
+	minute = now.replace(second=0, microsecond=0)
+	for offset in range(HOUR_MINUTES):
+		start = minute - timedelta(minutes=offset)
+		window = [["read_time", ">=", start], ["read_time", "<", start + timedelta(minutes=1)]]
+		count = frappe.db.count(TAG_EVENT_DOCTYPE, window)
+		pipe.set(_key(cache, TAG_READS, _minute(start)), count, ex=MINUTE_TTL)
+	pipe.execute()
+
+	unique_key = _key(cache, UNIQUE_TAGS, _day(now))
+	cache.delete(unique_key)
+	for epcs in _distinct_tags_since(TAG_EVENT_DOCTYPE, today):
+		cache.pfadd(unique_key, *epcs)
+	cache.expire(unique_key, UNIQUE_TTL)
+
+	cache.set(cache.make_key(REDIS_SEEDED_KEY), 1)
+
+
+def _ensure_seeded(cache) -> None:
+	# A flushed Redis loses the gauges; rebuild them in the background. Read
+	# raw: the wrapper's exists would prefix the made key a second time.
+	if cache.get(cache.make_key(REDIS_SEEDED_KEY)) is None:
+		frappe.enqueue(
+			"rfid.rfid.services.counters.rebuild_counters",
+			queue="long",
+			job_id="rfid_rebuild_counters",
+			deduplicate=True,
+		)
+
+
+def _distinct_tags_since(doctype: str, since: datetime) -> Iterable[List[str]]:
+	last = ""
+	while True:
+		epcs = frappe.get_all(
+			doctype,
+			filters={"read_time": (">=", since), "rfid": (">", last)},
+			fields=["rfid"],
+			group_by="rfid",
+			order_by="rfid asc",
+			limit=REBUILD_CHUNK_SIZE,
+			pluck="rfid",
+		)
+		if not epcs:
+			return
+		yield epcs
+		last = epcs[-1]
+
+
+def _key(cache, counter: str, bucket: Optional[str] = None) -> str:
+	return cache.make_key(f"{REDIS_PREFIX}|{counter}|{bucket}" if bucket else f"{REDIS_PREFIX}|{counter}")
+
+
+def _day(value: datetime) -> str:
+	return get_datetime(value).strftime("%Y%m%d")
+
+
+def _minute(value: datetime) -> str:
+	return get_datetime(value).strftime("%Y%m%d%H%M")
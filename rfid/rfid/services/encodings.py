@@ -0,0 +1,117 @@
+"""Wire encodings of webhook request bodies.
+
+Events reach this module already serialised as compact JSON, one
+``{"event", "data", "meta"}`` object each. An endpoint's encoding turns one
+event or a batch of them into a request body:
+
+- ``JSON``: the event object, or ``{"event": "rfid.batch", "count", "data"}``
+  with the events spliced in without decoding them again;
+- ``NDJSON``: one event object per line, with no envelope;
+- ``MessagePack`` / ``CBOR``: the same structure as ``JSON`` in binary form,
+  when ``msgpack`` / ``cbor2`` is installed.
+
+The body can then be compressed with gzip or, when ``zstandard`` is
+installed, zstd. Bodies are stored in RFID Webhook Delivery as text: JSON
+and NDJSON as they are, binary or compressed bodies as base64.
+"""
+
+from __future__ import annotations
+
+import base64
+import gzip
+from typing import List, Optional, Tuple
+
+from frappe import _
+
+from .parser import loads
+
+try:
+	import msgpack
+except ImportError:  # pragma: no cover - optional encoding
+	msgpack = None
+
+try:
+	import cbor2
+except ImportError:  # pragma: no cover - optional encoding
+	cbor2 = None
+
+try:
+	import zstandard
+except ImportError:  # pragma: no cover - optional compression
+	zstandard = None
+
+BATCH_EVENT = "rfid.batch"
+JSON = "JSON"
+NDJSON = "NDJSON"
+MESSAGEPACK = "MessagePack"
+CBOR = "CBOR"
+NO_COMPRESSION = "None"
+GZIP = "gzip"
+ZSTD = "zstd"
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+CONTENT_TYPES = {
+	JSON: "application/json",
+	NDJSON: "application/x-ndjson",
+	MESSAGEPACK: "application/msgpack",
+	CBOR: "application/cbor",
+}
+TEXT_TYPES = {CONTENT_TYPES[JSON], CONTENT_TYPES[NDJSON]}
+
+# (stored payload, content type, content encoding)
+EncodedBody = Tuple[str, str, Optional[str]]
+
+
+def encode_body(items: List[bytes], encoding: str = JSON, compression: str = NO_COMPRESSION, batch: bool = False) -> EncodedBody:
+	"""Encode JSON event ``items`` as one request body ready to be stored.
+
+	Without ``batch`` only the first item is encoded, as a single event.
+	"""
+
+	body = _serialise(items if batch else items[:1], encoding or JSON, batch)
+	content_type = CONTENT_TYPES.get(encoding, CONTENT_TYPES[JSON])
+	content_encoding = None
+	if compression == GZIP:
+		body, content_encoding = gzip.compress(body, GZIP_LEVEL), GZIP
+	elif compression == ZSTD:
+		body, content_encoding = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body), ZSTD
+
+	if content_encoding or content_type not in TEXT_TYPES:
+		return base64.b64encode(body).decode("ascii"), content_type, content_encoding
+	return body.decode("utf-8"), content_type, content_encoding
+
+
+def load_body(payload: str, content_type: Optional[str], content_encoding: Optional[str]) -> bytes:
+	"""Return the bytes to send for a stored payload."""
+
+	if content_encoding or (content_type and content_type not in TEXT_TYPES):
+		return base64.b64decode(payload)
+	return payload.encode("utf-8")
+
+
+def missing_dependency(encoding: Optional[str], compression: Optional[str]) -> Optional[str]:
+	"""Return a message naming the package an encoding needs, if it is not installed."""
+
+	for needed, module, package in (
+		(encoding == MESSAGEPACK, msgpack, "msgpack"),
+		(encoding == CBOR, cbor2, "cbor2"),
+		(compression == ZSTD, zstandard, "zstandard"),
+	):
+		if needed and module is None:
+			return _("Install {0} to use this encoding: bench pip install {0}").format(package)
+	return None
+
+
+def _serialise(items: List[bytes], encoding: str, batch: bool) -> bytes:
+	if encoding == NDJSON:
+		return b"\n".join(items) + b"\n"
+
+	if encoding in (MESSAGEPACK, CBOR):
+		events = [loads(item) for item in items]
+		value = {"event": BATCH_EVENT, "count": len(events), "data": events} if batch else events[0]
+		return msgpack.packb(value) if encoding == MESSAGEPACK else cbor2.dumps(value)
+
+	if not batch:
+		return items[0]
+	return b'{"event":"' + BATCH_EVENT.encode() + b'","count":' + str(len(items)).encode() + b',"data":[' + b",".join(items) + b"]}"
@@ -0,0 +1,175 @@
+"""Raddec feed rendered from stored RFID Tag Event columns.
+
+Pages are addressed with an opaque keyset cursor over ``(read_time, name)``,
+backed by the composite index on RFID Tag Event, so paging costs the same at
+any depth and reads sharing a timestamp are neither repeated nor skipped. A
+page request may long-poll: when nothing newer than the cursor exists it
+waits on a Redis channel that ingest publishes to after each commit.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt, get_datetime
+
+from .ingest import TAG_EVENT_DOCTYPE
+from .parser import dumps
+from .raddec import build_raddecs
+
+RADDEC_FIELDS = ("name", "rfid", "reader", "antenna_port", "rssi", "read_time", "read_count")
+FEED_CHUNK_SIZE = 1000
+REDIS_FEED_CHANNEL = "rfid_feed"
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+# Stay below the usual 30 s proxy read timeout.
+MAX_WAIT = 25
+
+Cursor = Tuple[datetime, str]
+
+
+def get_raddec_page(
+	cursor: Optional[str] = None,
+	since: Optional[str] = None,
+	limit: int = DEFAULT_PAGE_SIZE,
+	wait: float = 0,
+) -> Dict[str, Any]:
+	"""Return up to ``limit`` raddecs after ``cursor`` (or from ``since``), oldest first.
+
+	With ``wait`` the call blocks for up to that many seconds until new events
+	are committed when the page would otherwise be empty.
+	"""
+
+	position = decode_cursor(cursor) if cursor else ((get_datetime(since), "") if since else None)
+	limit = min(max(cint(limit) or DEFAULT_PAGE_SIZE, 1), MAX_PAGE_SIZE)
+	wait = min(max(flt(wait), 0), MAX_WAIT)
+
+	rows = _page_rows(position, limit)
+	if not rows and wait:
+		rows = _wait_for_rows(position, limit, wait)
+
+	if rows:
+		position = (rows[-1].read_time, rows[-1].name)
+
+	return {
+		"events": list(build_raddecs(rows, with_docname=True)),
+		"cursor": encode_cursor(position) if position else None,
+	}
+
+
+def notify_feed(count: int) -> None:
+	"""Wake long-polling feed readers after new events were committed."""
+
+	if count:
+		cache = frappe.cache()
+		cache.publish(cache.make_key(REDIS_FEED_CHANNEL), count)
+
+
+def encode_cursor(position: Cursor) -> str:
+	read_time, name = position
+	raw = json.dumps([get_datetime(read_time).isoformat(), name], separators=(",", ":"))
+	return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Cursor:
+	try:
+		raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+		read_time, name = json.loads(raw)
+		return datetime.fromisoformat(read_time), str(name)
+	except Exception:
+		frappe.throw(_("Invalid feed cursor."), frappe.ValidationError)
+
+
+def _page_rows(position: Optional[Cursor], limit: int) -> List[Dict[str, Any]]:
+	table = frappe.qb.DocType(TAG_EVENT_DOCTYPE)
+	query = (
+		frappe.qb.from_(table)
+		.select(*RADDEC_FIELDS)
+		.orderby(table.read_time)
+		.orderby(table.name)
+		.limit(limit)
+	)
+	if position:
+		read_time, name = position
+		# The leading range on read_time keeps the (read_time, name) index usable.
+		query = query.where(table.read_time >= read_time).where(
+			(table.read_time > read_time) | (table.name > name)
+		)
+	return query.run(as_dict=True)
+
+
+def _wait_for_rows(position: Optional[Cursor], limit: int, wait: float) -> List[Dict[str, Any]]:
+	cache = frappe.cache()
+	pubsub = cache.pubsub(ignore_subscribe_messages=True)
+	pubsub.subscribe(cache.make_key(REDIS_FEED_CHANNEL))
+	deadline = time.monotonic() + wait
+
+	try:
+		# Subscribed first, so a commit between the query and the wait is not missed.
+		frappe.db.rollback()
+		rows = _page_rows(position, limit)
+		while not rows:
+			remaining = deadline - time.monotonic()
+			if remaining <= 0:
+				break
+			if pubsub.get_message(timeout=remaining) is None:
+				continue
+			# End the transaction so the next query sees the new snapshot.
+			frappe.db.rollback()
+			rows = _page_rows(position, limit)
+		return rows
+	finally:
+		pubsub.close()
+
+
+def stream_raddec_feed(since: Optional[str] = None, until: Optional[str] = None) -> Iterator[bytes]:
+	"""Yield newline-delimited raddec JSON for events in ``[since, until)``, oldest first.
+
+	Rows are read through an unbuffered cursor and rendered a chunk at a time,
+	so memory does not grow with the size of the result. Frappe tears the
+	request down before a streamed body is sent, so the generator opens its own
+	site connection.
+	"""
+
+	site, sites_path, user = frappe.local.site, frappe.local.sites_path, frappe.session.user
+	since = get_datetime(since) if since else None
+	until = get_datetime(until) if until else None
+
+	def generate() -> Iterator[bytes]:
+		frappe.init(site=site, sites_path=sites_path)
+		frappe.connect()
+		frappe.set_user(user)
+		try:
+			with frappe.db.unbuffered_cursor():
+				chunk: List[Dict[str, Any]] = []
+				for row in _feed_query(since, until).run(as_dict=True, as_iterator=True):
+					chunk.append(row)
+					if len(chunk) >= FEED_CHUNK_SIZE:
+						yield _render(chunk)
+						chunk = []
+				if chunk:
+					yield _render(chunk)
+		finally:
+			frappe.destroy()
+
+	return generate()
+
+
+def _feed_query(since, until):
+	table = frappe.qb.DocType(TAG_EVENT_DOCTYPE)
+	query = frappe.qb.from_(table).select(*RADDEC_FIELDS).orderby(table.read_time).orderby(table.name)
+	if since:
+		query = query.where(table.read_time >= since)
+	if until:
+		query = query.where(table.read_time < until)
+	return query
+
+
+def _render(rows: List[Dict[str, Any]]) -> bytes:
+	return b"".join(dumps(raddec) + b"\n" for raddec in build_raddecs(rows, with_docname=True))
@@ -0,0 +1,72 @@
+"""Request-level idempotency for the ingest endpoint.
+
+Readers retry whole POSTs when a response is slow. Each request is keyed by
+its ``Idempotency-Key`` header and the response is stored in Redis for the
+replay window from RFID Settings. A retry within the window is answered from
+Redis without touching the database.
+
+Without the header a request is keyed by a hash of its body, but only when
+every read in it carries its own timestamp. Otherwise two genuine reports can
+share a body, e.g. reads stamped on arrival or a periodic heartbeat, and the
+second must not be taken for a retry of the first. Responses reporting reads that could
+not be stored are not kept, so a retry gets another chance to store them.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import pickle
+from typing import Any, Dict, Optional, Tuple
+
+import frappe
+from frappe.utils import cint
+
+from rfid.rfid.doctype.rfid_settings.rfid_settings import get_settings
+
+from .ingest import reads_are_timestamped
+from .parser import loads
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REDIS_RESPONSE_PREFIX = "rfid_ingest_response"
+
+
+def get_request_key(body: bytes, payload: Any = None) -> Optional[str]:
+	"""Return the Redis key identifying this request, or ``None`` when it is
+	not replayed. ``payload`` is the decoded body, when already parsed."""
+
+	if cint(get_settings().idempotency_ttl) <= 0:
+		return None
+
+	key = (frappe.get_request_header(IDEMPOTENCY_HEADER) or "").strip()
+	if not key:
+		if payload is None:
+			try:
+				payload = loads(body)
+			except ValueError:
+				return None
+		if not reads_are_timestamped(payload):
+			return None
+		key = hashlib.sha256(body).hexdigest()
+
+	# Keys are scoped per API user so readers cannot collide with each other.
+	return frappe.cache().make_key(f"{REDIS_RESPONSE_PREFIX}|{frappe.session.user}|{key}")
+
+
+def get_stored_response(request_key: Optional[str]) -> Optional[Tuple[int, Dict[str, Any]]]:
+	"""Return ``(status_code, response)`` stored for an earlier identical request."""
+
+	if not request_key:
+		return None
+
+	raw = frappe.cache().get(request_key)
+	return pickle.loads(raw) if raw else None
+
+
+def store_response(request_key: Optional[str], status_code: int, response: Dict[str, Any]) -> None:
+	"""Keep a response for replay unless some of its reads failed."""
+
+	if not request_key or response.get("errors"):
+		return
+
+	ttl = cint(get_settings().idempotency_ttl)
+	frappe.cache().set(request_key, pickle.dumps((status_code, response)), ex=ttl)
@@ -0,0 +1,534 @@
+"""Ingest pipeline turning Impinj reader payloads into RFID Tag Event rows."""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import frappe
+from frappe.utils import cint, cstr, flt, now_datetime
+
+from rfid.rfid.doctype.rfid_settings.rfid_settings import get_settings
+from rfid.rfid.doctype.rfid_tag_event.rfid_tag_event import make_event_name
+
+from .aggregation import DEFAULT_READ_WINDOW, aggregate_events, save_open_states
+from .parser import parse_reads
+from .location import update_tag_locations
+from .raddec import build_raddecs
+from .raw_payload import prepare_raw_refs, save_raw_batch
+from .resolver import resolve_epcs
+from .timestamps import normalise_timestamp, system_zone
+from .webhook import dispatch_raddec_events
+
+TAG_EVENT_DOCTYPE = "RFID Tag Event"
+TAG_EVENT_FIELDS = (
+	"rfid",
+	"serial_no",
+	"item_code",
+	"reader",
+	"antenna_port",
+	"read_time",
+	"rssi",
+	"raw_payload",
+	"raw_batch",
+	"raw_index",
+	"first_seen",
+	"last_seen",
+	"read_count",
+	"peak_rssi",
+	"mean_rssi",
+)
+BULK_SAVEPOINT = "rfid_bulk_ingest"
+
+
+def process_impinj_payload(
+	payload: Any,
+	source: str = "impinj",
+	layout_key: Optional[str] = None,
+	raw_body: Optional[bytes] = None,
+) -> Dict[str, Any]:
+	"""Parse, resolve and persist every tag read found in an Impinj payload.
+
+	``layout_key`` identifies the sender whose payload layout is remembered by
+	the fast-path parser; it defaults to the source and session user.
+	``raw_body`` is the request body ``payload`` was decoded from, kept as-is
+	when raw payloads are stored per batch.
+	"""
+
+	duplicates: List[str] = []
+	batch_duplicates = 0
+	candidates: Dict[str, Dict[str, Any]] = {}
+
+	for event in _iter_events(payload, layout_key or f"{source}|{frappe.session.user}"):
+		if not event:
+			continue
+
+		if event["name"] in candidates:
+			batch_duplicates += 1
+			duplicates.append(event["rfid"])
+			continue
+
+		candidates[event["name"]] = event
+
+	existing = _get_existing_event_names(list(candidates))
+	db_duplicates = len(existing)
+	duplicates.extend(event["rfid"] for name, event in candidates.items() if name in existing)
+	events = [event for name, event in candidates.items() if name not in existing]
+
+	settings = get_settings()
+	# Every new read, before aggregation folds some into open rows.
+	live_reads = events
+	updates: Dict[str, Dict[str, Any]] = {}
+	folded = 0
+	if settings.aggregate_reads:
+		read_window = flt(settings.read_window) or DEFAULT_READ_WINDOW
+		events, updates, open_states, folded = aggregate_events(events, read_window)
+		# Re-sent reads are neither stored nor counted, shown or located again.
+		live_reads = [event for event in live_reads if not event.get("_resent")]
+
+	# Folded reads are resolved too; they still move the tag's last location.
+	serial_infos = resolve_epcs(event["rfid"] for event in live_reads)
+	for event in events:
+		serial_info = serial_infos.get(event["rfid"])
+		if serial_info:
+			if serial_info.get("doctype") == "Serial No":
+				event["serial_no"] = serial_info.get("name")
+			event["item_code"] = serial_info.get("item_code")
+
+	raw_batch = prepare_raw_refs(events, settings)
+
+	if settings.bulk_insert:
+		inserted, ignored, raced = _insert_bulk(events)
+	else:
+		inserted, ignored, raced = _insert_each(events)
+
+	# Rows stored by a concurrent request between the lookup and the insert.
+	db_duplicates += len(raced)
+	duplicates.extend(raced)
+
+	if updates:
+		frappe.db.bulk_update(TAG_EVENT_DOCTYPE, updates)
+
+	save_raw_batch(raw_batch, payload, raw_body, source, settings, len(inserted), len(ignored))
+
+	if inserted or updates:
+		update_tag_locations(live_reads, serial_infos)
+
+	if settings.aggregate_reads:
+		save_open_states(open_states, [*(event["name"] for event in inserted), *updates], read_window)
+
+	# raddec is rendered from the stored columns, not kept on the row. With
+	# presence tracking, webhooks get zone transitions instead of reads, and
+	# with a raddec window one combined raddec per tag after the commit.
+	inserted_by_name = {event["name"]: event for event in inserted}
+	per_read_webhooks = not settings.presence_tracking and not flt(settings.raddec_window)
+	webhook_events = []
+	for raddec_payload in build_raddecs(inserted if per_read_webhooks else [], with_docname=True):
+		event = inserted_by_name[raddec_payload.pop("_docname")]
+		webhook_events.append(
+			(
+				raddec_payload,
+				{
+					"docname": event["name"],
+					"reader": event.get("reader"),
+					"antenna_port": event.get("antenna_port"),
+					"rfid": event["rfid"],
+					"item_code": event.get("item_code"),
+					"source": source,
+				},
+			)
+		)
+	dispatch_raddec_events(webhook_events)
+
+	processed = [event["name"] for event in inserted]
+	if processed or updates:
+		frappe.db.commit()
+
+	if processed:
+		from .feed import notify_feed
+
+		notify_feed(len(processed))
+
+	if processed or updates:
+		from .counters import record_reads
+		from .live import publish_live_reads
+
+		record_reads([event["rfid"] for event in live_reads])
+		publish_live_reads(live_reads)
+
+		if settings.presence_tracking:
+			from .presence import update_presence
+
+			update_presence(live_reads, source)
+		elif flt(settings.raddec_window):
+			from .raddec_window import queue_raddec_reads
+
+			queue_raddec_reads(live_reads)
+
+	return {
+		"processed": len(processed),
+		"duplicates": len(duplicates),
+		"batch_duplicates": batch_duplicates,
+		"db_duplicates": db_duplicates,
+		"aggregated": folded,
+		"updated": len(updates),
+		"errors": len(ignored),
+		"processed_names": processed,
+		"duplicate_tags": duplicates,
+		"error_tags": ignored,
+	}
+
+
+def iter_tag_reads(payload: Any, received_at: Optional[str] = None) -> Iterable[Tuple[Optional[str], Any]]:
+	"""Yield ``(epc, node)`` for every read in ``payload`` without resolving it.
+
+	Reads without a timestamp of their own are stamped with ``received_at`` so
+	that processing them later does not record the processing time instead.
+	"""
+
+	for node in _iter_impinj_nodes(payload):
+		body = _node_body(node)
+		if body is None:
+			yield None, node
+			continue
+
+		if received_at and not _extract_timestamp(node, body):
+			node["observedAt"] = received_at
+		yield _extract_epc(body), node
+
+
+def reads_are_timestamped(payload: Any) -> bool:
+	"""Return whether ``payload`` holds tag reads that all carry a timestamp of
+	their own, so an identical body can only repeat the same reads."""
+
+	found = False
+	for node in _iter_impinj_nodes(payload):
+		body = _node_body(node)
+		if body is None or not _extract_epc(body):
+			continue
+		if not _extract_timestamp(node, body):
+			return False
+		found = True
+	return found
+
+
+def unwrap_inventory_event(event: Dict[str, Any]) -> Dict[str, Any]:
+	"""Flatten an IoT Device Interface envelope so the shared extractors can read it.
+
+	Envelopes wrap the read in ``tagInventoryEvent`` next to the envelope
+	``timestamp`` and ``hostname``; ``epc`` there is base64, so ``epcHex`` wins.
+	Anything else is returned unchanged.
+	"""
+
+	inner = event.get("tagInventoryEvent")
+	if not isinstance(inner, dict):
+		return event
+
+	node = dict(inner)
+	if node.get("epcHex"):
+		node["epc"] = node["epcHex"]
+	node.setdefault("timestamp", event.get("timestamp"))
+	if event.get("hostname"):
+		node.setdefault("reader", event["hostname"])
+	return node
+
+
+def _iter_events(payload: Any, layout_key: str) -> Iterable[Optional[Dict[str, Any]]]:
+	# Events carry the position of their read in the payload, which is how
+	# reads are found again in a stored raw payload batch.
+	reads = parse_reads(payload, layout_key)
+	if reads is None:
+		for index, node in enumerate(_iter_impinj_nodes(payload)):
+			event = _build_event(node)
+			if event:
+				event["_raw_index"] = index
+			yield event
+		return
+
+	zone = system_zone()
+	for index, (node, epc, timestamp, rssi, antenna_port, reader) in enumerate(reads):
+		read_time = normalise_timestamp(timestamp, zone) or now_datetime()
+		event = _make_event(node, epc, read_time, reader, antenna_port, rssi)
+		event["_raw_index"] = index
+		yield event
+
+
+def _build_event(node: Any) -> Optional[Dict[str, Any]]:
+	body = _node_body(node)
+	if body is None:
+		return None
+
+	epc = _extract_epc(body)
+	if not epc:
+		return None
+
+	entry = node if isinstance(node, dict) else {}
+
+	read_time = _extract_timestamp(entry, body)
+	if not read_time:
+		read_time = now_datetime()
+
+	antenna_port = body.get("antennaPort") or body.get("antenna") or body.get("antenna_port")
+	try:
+		antenna_port = int(antenna_port) if antenna_port is not None else None
+	except (TypeError, ValueError):
+		antenna_port = None
+
+	return _make_event(node, epc, read_time, _extract_reader(entry, body), antenna_port, _extract_rssi(body))
+
+
+def _make_event(
+	node: Any,
+	epc: str,
+	read_time: datetime,
+	reader: Optional[str],
+	antenna_port: Optional[int],
+	rssi: Optional[float],
+) -> Dict[str, Any]:
+	return {
+		"name": make_event_name(epc, read_time, reader, antenna_port),
+		"rfid": epc,
+		"reader": reader,
+		"antenna_port": antenna_port,
+		"read_time": read_time,
+		"rssi": rssi,
+		"_node": node,
+	}
+
+
+def _node_body(node: Any) -> Optional[Dict[str, Any]]:
+	body = node
+
+	if isinstance(node, dict):
+		data_section = node.get("data")
+		if isinstance(data_section, dict):
+			body = data_section
+		else:
+			body = unwrap_inventory_event(node)
+
+	return body if isinstance(body, dict) else None
+
+
+def _insert_each(events: List[Dict[str, Any]]) -> tuple[List[Dict[str, Any]], List[str], List[str]]:
+	inserted: List[Dict[str, Any]] = []
+	ignored: List[str] = []
+	raced: List[str] = []
+
+	for event in events:
+		doc = frappe.get_doc(
+			{
+				"doctype": TAG_EVENT_DOCTYPE,
+				"name": event["name"],
+				**{field: event.get(field) for field in TAG_EVENT_FIELDS},
+			}
+		)
+
+		try:
+			doc.insert(ignore_permissions=True)
+		except frappe.DuplicateEntryError:
+			raced.append(event["rfid"])
+			continue
+		except Exception:
+			frappe.log_error(frappe.get_traceback(), "RFID Impinj ingest failure")
+			ignored.append(event["rfid"])
+			continue
+
+		event["name"] = doc.name
+		inserted.append(event)
+
+	return inserted, ignored, raced
+
+
+def _insert_bulk(events: List[Dict[str, Any]]) -> tuple[List[Dict[str, Any]], List[str], List[str]]:
+	"""Validate the batch once and write it with multi-row inserts.
+
+	If the multi-row insert itself fails the batch is rolled back to a savepoint
+	and replayed document by document, so the offending rows are reported
+	individually instead of losing the whole batch.
+	"""
+
+	valid, ignored = _validate_batch(events)
+	if not valid:
+		return valid, ignored, []
+
+	now = now_datetime()
+	user = frappe.session.user
+	fields = ["name", "owner", "creation", "modified", "modified_by", "docstatus", "idx", *TAG_EVENT_FIELDS]
+	values = [
+		(event["name"], user, now, now, user, 0, 0, *(event.get(field) for field in TAG_EVENT_FIELDS))
+		for event in valid
+	]
+
+	frappe.db.savepoint(BULK_SAVEPOINT)
+	try:
+		frappe.db.bulk_insert(TAG_EVENT_DOCTYPE, fields, values)
+	except Exception:
+		frappe.db.rollback(save_point=BULK_SAVEPOINT)
+		frappe.log_error(frappe.get_traceback(), "RFID Impinj bulk ingest fallback")
+		inserted, failed, raced = _insert_each(valid)
+		return inserted, ignored + failed, raced
+
+	return valid, ignored, []
+
+
+def _validate_batch(events: List[Dict[str, Any]]) -> tuple[List[Dict[str, Any]], List[str]]:
+	"""Apply the mandatory and length checks a document insert would run, once per batch."""
+
+	meta = frappe.get_meta(TAG_EVENT_DOCTYPE)
+	mandatory = [df.fieldname for df in meta.get("fields", {"reqd": 1})]
+	length_limits = {
+		df.fieldname: df.length or frappe.db.VARCHAR_LEN
+		for df in meta.get("fields", {"fieldtype": ("in", ("Data", "Link"))})
+	}
+	# Numeric columns are NOT NULL; coerce them the way Document.get_valid_dict does.
+	int_fields = [df.fieldname for df in meta.get("fields", {"fieldtype": ("in", ("Int", "Check"))})]
+	float_fields = [df.fieldname for df in meta.get("fields", {"fieldtype": ("in", ("Float", "Currency", "Percent"))})]
+
+	valid: List[Dict[str, Any]] = []
+	ignored: List[str] = []
+
+	for event in events:
+		missing = [field for field in mandatory if event.get(field) in (None, "")]
+		too_long = [
+			field
+			for field, limit in length_limits.items()
+			if event.get(field) and len(cstr(event.get(field))) > limit
+		]
+
+		if missing or too_long:
+			frappe.log_error(
+				f"Missing: {missing}, too long: {too_long}\n\n{frappe.as_json(event.get('_node'))}",
+				"RFID Impinj ingest failure",
+			)
+			ignored.append(event["rfid"])
+			continue
+
+		for field in int_fields:
+			event[field] = cint(event.get(field))
+		for field in float_fields:
+			event[field] = flt(event.get(field))
+
+		valid.append(event)
+
+	return valid, ignored
+
+
+def _iter_impinj_nodes(payload: Any) -> Iterable[Dict[str, Any]]:
+	"""Yield potential event dictionaries out of a nested payload structure."""
+
+	if isinstance(payload, list):
+		for element in payload:
+			yield from _iter_impinj_nodes(element)
+		return
+
+	if not isinstance(payload, dict):
+		return
+
+	# Common keys containing collections of events.
+	for key in (
+		"notifications",
+		"Notification",
+		"events",
+		"items",
+		"records",
+		"tagReport",
+		"tagReportData",
+		"tag_reads",
+		"tags",
+	):
+		value = payload.get(key)
+		if isinstance(value, list):
+			for element in value:
+				yield from _iter_impinj_nodes(element)
+			return
+
+	for key in ("data", "eventData"):
+		value = payload.get(key)
+		if isinstance(value, (dict, list)):
+			yield from _iter_impinj_nodes(value)
+			return
+
+	yield payload
+
+
+def _extract_epc(data: Dict[str, Any]) -> Optional[str]:
+	candidates = [
+		data.get("epc"),
+		data.get("epcHex"),
+		data.get("epcStr"),
+		data.get("tag"),
+		data.get("id"),
+	]
+
+	epc_data = data.get("epcData") or data.get("epc_data")
+	if isinstance(epc_data, dict):
+		candidates.extend([
+			epc_data.get("epc"),
+			epc_data.get("epcHex"),
+			epc_data.get("epcStr"),
+		])
+
+	for value in candidates:
+		if isinstance(value, str) and value.strip():
+			return value.strip().upper()
+
+	return None
+
+
+def _extract_timestamp(entry: Dict[str, Any], body: Dict[str, Any]) -> Optional[datetime]:
+	for container in (body, entry):
+		for key in (
+			"timestamp",
+			"readTime",
+			"eventTime",
+			"firstSeenTimestamp",
+			"lastSeenTimestamp",
+			"modified",
+			"observedAt",
+		):
+			read_time = normalise_timestamp(container.get(key))
+			if read_time:
+				return read_time
+
+	return None
+
+
+def _extract_rssi(body: Dict[str, Any]) -> Optional[float]:
+	for key in ("peakRssiCdbm", "rssi", "peakRssi", "rssiDbm"):
+		value = body.get(key)
+		if value is None:
+			continue
+		try:
+			numeric = float(value)
+		except (TypeError, ValueError):
+			continue
+
+		# peakRssiCdbm is expressed in centi-dBm.
+		if key == "peakRssiCdbm":
+			numeric = numeric / 100.0
+		return numeric
+
+	return None
+
+
+def _extract_reader(entry: Dict[str, Any], body: Dict[str, Any]) -> Optional[str]:
+	for container in (body, entry):
+		value = container.get("reader")
+		if isinstance(value, dict):
+			for key in ("name", "hostname", "id"):
+				candidate = value.get(key)
+				if isinstance(candidate, str) and candidate.strip():
+					return candidate.strip()
+		if isinstance(value, str) and value.strip():
+			return value.strip()
+
+	return None
+
+
+def _get_existing_event_names(names: List[str]) -> set[str]:
+	"""Return the subset of ``names`` already stored, using one primary-key lookup."""
+
+	if not names:
+		return set()
+
+	return set(frappe.get_all(TAG_EVENT_DOCTYPE, filters={"name": ("in", names)}, pluck="name"))
@@ -0,0 +1,272 @@
+"""Accept-and-queue ingest mode.
+
+With RFID Settings → Ingest Mode set to "Queued", ``ingest_impinj_events``
+only appends the raw request body to a Redis intake list and answers 202. A
+split job parses queued payloads and fans the reads out over partition lists
+keyed by EPC hash; one drain job per partition then writes them through
+``process_impinj_payload`` in large batches. Runs of each job never overlap
+(see ``jobs``), so every partition has a single consumer and reads of one tag
+keep their arrival order.
+
+Consumers take items onto a processing list (see ``processing``) and release
+them only once they are committed or, for the split job, pushed on to the
+partitions, so a job that is killed mid-batch loses nothing. The scheduled
+sweep puts abandoned items back, then re-enqueues jobs for any list that
+still holds items, covering jobs lost to a restart. Reads may therefore be
+processed twice, which ingest absorbs through its content-derived event names.
+
+Keys are made once with ``make_key`` and every list and set command goes
+through a pipeline, since the cache wrapper's own list and set methods would
+prefix them a second time.
+"""
+
+from __future__ import annotations
+
+import pickle
+import time
+import zlib
+from typing import Any, Dict, Iterable, List, Tuple
+
+import frappe
+from frappe.utils import cint, now_datetime
+
+from rfid.rfid.doctype.rfid_settings.rfid_settings import get_settings
+
+from .ingest import iter_tag_reads, process_impinj_payload
+from .jobs import enqueue_job
+from .parser import loads
+from .processing import ack, recover, take
+
+QUEUED_MODE = "Queued"
+QUEUE_SOURCE = "impinj-queued"
+REDIS_INTAKE_KEY = "rfid_ingest_intake"
+REDIS_PARTITION_PREFIX = "rfid_ingest_partition"
+# Every partition that has ever received reads, so sweeps and stats find
+# lists left behind after the partition count is lowered.
+REDIS_PARTITIONS_KEY = "rfid_ingest_partitions"
+DEFAULT_PARTITIONS = 4
+DEFAULT_BATCH_SIZE = 1000
+SPLIT_CHUNK_SIZE = 200
+MAX_ATTEMPTS = 3
+# A drain job hands over to the next one after this many seconds.
+DRAIN_TIME_BUDGET = 240
+
+# (received timestamp, source, failed attempts, payload node)
+QueueItem = Tuple[float, str, int, Any]
+
+
+def is_queued_mode() -> bool:
+	return get_settings().ingest_mode == QUEUED_MODE
+
+
+def enqueue_payload(body: bytes, source: str = QUEUE_SOURCE) -> Dict[str, Any]:
+	"""Append a raw ingest request body to the intake list and kick the split job."""
+
+	cache = frappe.cache()
+	envelope = (time.time(), str(now_datetime()), source, body)
+	pipe = cache.pipeline()
+	pipe.rpush(cache.make_key(REDIS_INTAKE_KEY), pickle.dumps(envelope))
+	depth = pipe.execute()[0]
+	_enqueue_split()
+	return {"queued": True, "intake_depth": depth}
+
+
+def split_intake() -> Dict[str, int]:
+	"""Move queued payloads onto partition lists, one read per item."""
+
+	cache = frappe.cache()
+	partitions = max(1, cint(get_settings().queue_partitions) or DEFAULT_PARTITIONS)
+	payloads = reads = 0
+	touched: set[int] = set()
+
+	while True:
+		envelopes = take(cache, REDIS_INTAKE_KEY, SPLIT_CHUNK_SIZE)
+		if not envelopes:
+			break
+
+		pipe = cache.pipeline()
+		for raw in envelopes:
+			payloads += 1
+			received_ts, received_at, source, body = pickle.loads(raw)
+			try:
+				payload_reads = list(iter_tag_reads(loads(body), received_at))
+			except Exception:
+				frappe.log_error(f"{frappe.safe_decode(body[:1000])}\n\n{frappe.get_traceback()}", "RFID queued payload is unreadable")
+				continue
+
+			for epc, node in payload_reads:
+				if not epc:
+					continue
+				partition = zlib.crc32(epc.encode()) % partitions
+				item = (received_ts, source, 0, node)
+				pipe.rpush(_partition_key(cache, partition), pickle.dumps(item))
+				touched.add(partition)
+				reads += 1
+
+		if touched:
+			pipe.sadd(cache.make_key(REDIS_PARTITIONS_KEY), *touched)
+		# Released in the same transaction that hands the reads on.
+		ack(cache, pipe, REDIS_INTAKE_KEY, envelopes)
+		pipe.execute()
+
+	for partition in sorted(touched):
+		_enqueue_drain(partition)
+
+	return {"payloads": payloads, "reads": reads}
+
+
+def drain_partition(partition: int) -> Dict[str, int]:
+	"""Write queued reads of one partition in batches until it is empty."""
+
+	cache = frappe.cache()
+	name = _partition_name(partition)
+	batch_size = max(1, cint(get_settings().queue_batch_size) or DEFAULT_BATCH_SIZE)
+	deadline = time.monotonic() + DRAIN_TIME_BUDGET
+	totals = {"reads": 0, "processed": 0, "failed": 0}
+
+	while time.monotonic() < deadline:
+		taken = take(cache, name, batch_size)
+		if not taken:
+			break
+		items = [pickle.loads(raw) for raw in taken]
+
+		# Reads from different sources are written separately so webhook
+		# metadata keeps the source the reader used.
+		groups = list(_group_by_source(items))
+		failed = False
+		for index, (source, batch) in enumerate(groups):
+			try:
+				result = process_impinj_payload([item[3] for item in batch], source=source)
+				frappe.db.commit()
+			except Exception:
+				frappe.db.rollback()
+				frappe.log_error(frappe.get_traceback(), "RFID queued ingest failure")
+				frappe.db.commit()
+				pending = [item for _source, rest in groups[index + 1 :] for item in rest]
+				totals["failed"] += _requeue(cache, name, taken, batch, pending)
+				failed = True
+				break
+
+			totals["reads"] += len(batch)
+			totals["processed"] += result["processed"]
+
+		if failed:
+			# Retry on the next sweep instead of hammering a struggling database.
+			break
+
+		pipe = cache.pipeline()
+		ack(cache, pipe, name, taken)
+		pipe.execute()
+	else:
+		# Out of time with reads still queued.
+		_enqueue_drain(partition)
+
+	return totals
+
+
+def sweep_queues() -> None:
+	"""Scheduled: enqueue split and drain jobs for every list that still has items."""
+
+	cache = frappe.cache()
+	partitions = _known_partitions(cache)
+	for name in [REDIS_INTAKE_KEY, *(_partition_name(partition) for partition in partitions)]:
+		recover(cache, name)
+
+	pipe = cache.pipeline()
+	pipe.llen(cache.make_key(REDIS_INTAKE_KEY))
+	for partition in partitions:
+		pipe.llen(_partition_key(cache, partition))
+	intake, *depths = pipe.execute()
+
+	if intake:
+		_enqueue_split()
+
+	for partition, depth in zip(partitions, depths):
+		if depth:
+			_enqueue_drain(partition)
+
+
+def get_queue_stats() -> Dict[str, Any]:
+	"""Return depth and lag (age of the oldest item, in seconds) per queue."""
+
+	cache = frappe.cache()
+	now = time.time()
+	partitions = _known_partitions(cache)
+	keys = [cache.make_key(REDIS_INTAKE_KEY), *(_partition_key(cache, partition) for partition in partitions)]
+
+	pipe = cache.pipeline()
+	for key in keys:
+		pipe.llen(key)
+		pipe.lindex(key, 0)
+	results = pipe.execute()
+
+	queues = []
+	for index, name in enumerate(["intake", *(str(partition) for partition in partitions)]):
+		depth, head = results[2 * index], results[2 * index + 1]
+		lag = round(now - pickle.loads(head)[0], 3) if head else 0.0
+		queues.append({"queue": name, "depth": depth, "lag": lag})
+
+	return {
+		"mode": get_settings().ingest_mode,
+		"intake": queues[0],
+		"partitions": queues[1:],
+		"depth": sum(queue["depth"] for queue in queues[1:]),
+		"lag": max(queue["lag"] for queue in queues),
+	}
+
+
+def _requeue(cache, name: str, taken: List[bytes], failed: List[QueueItem], pending: List[QueueItem]) -> int:
+	"""Put a failed batch and the reads behind it back at the head of the
+	partition and release the items ``taken`` for them. Reads that
+	failed ``MAX_ATTEMPTS`` times are logged and dropped; returns how many were."""
+
+	retry = [(ts, source, attempts + 1, node) for ts, source, attempts, node in failed if attempts + 1 < MAX_ATTEMPTS]
+	dropped = [item[3] for item in failed if item[2] + 1 >= MAX_ATTEMPTS]
+	if dropped:
+		frappe.log_error(frappe.as_json(dropped), "RFID queued reads dropped")
+
+	items = retry + pending
+	pipe = cache.pipeline(transaction=True)
+	if items:
+		# LPUSH reverses its arguments; push newest first to keep the order.
+		pipe.lpush(cache.make_key(name), *(pickle.dumps(item) for item in reversed(items)))
+	ack(cache, pipe, name, taken)
+	pipe.execute()
+	return len(dropped)
+
+
+def _group_by_source(items: List[QueueItem]) -> Iterable[Tuple[str, List[QueueItem]]]:
+	"""Split ``items`` into consecutive runs sharing a source, keeping their order."""
+
+	run: List[QueueItem] = []
+	for item in items:
+		if run and run[-1][1] != item[1]:
+			yield run[-1][1], run
+			run = []
+		run.append(item)
+	if run:
+		yield run[-1][1], run
+
+
+def _known_partitions(cache) -> List[int]:
+	pipe = cache.pipeline()
+	pipe.smembers(cache.make_key(REDIS_PARTITIONS_KEY))
+	return sorted(cint(member) for member in pipe.execute()[0])
+
+
+def _partition_name(partition: int) -> str:
+	return f"{REDIS_PARTITION_PREFIX}|{partition}"
+
+
+def _partition_key(cache, partition: int) -> str:
+	return cache.make_key(_partition_name(partition))
+
+
+def _enqueue_split() -> None:
+	enqueue_job("rfid.rfid.services.ingest_queue.split_intake", "rfid_ingest_split", "short")
+
+
+def _enqueue_drain(partition: int) -> None:
+	enqueue_job(
+		"rfid.rfid.services.ingest_queue.drain_partition", f"rfid_ingest_drain_{partition}", "long", partition=partition
+	)
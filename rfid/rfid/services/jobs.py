@@ -0,0 +1,73 @@
+"""Background jobs that drain a queue, one run at a time.
+
+``frappe.enqueue(deduplicate=True)`` skips a job while one with its id is
+queued or still running. For jobs that drain Redis lists that drops work: a
+run handing over to its successor, and producers kicking the job while a run
+is on its way out, are both ignored until the next scheduled sweep.
+
+``enqueue_job`` lets one more run wait behind a running one under a second
+job id, and every run takes a Redis lock first, so runs never overlap and a
+queued run always starts after the work it was queued for was pushed.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Any
+
+import frappe
+from frappe.utils.background_jobs import get_job_status
+from rq import get_current_job
+from rq.job import JobStatus
+
+REDIS_LOCK_PREFIX = "rfid_job_lock"
+# Job id suffix of the run that waits behind a running one.
+NEXT_RUN_SUFFIX = "_next"
+# Seconds a lock is held when the run has no job timeout; the long queue's default.
+DEFAULT_LOCK_TIMEOUT = 1500
+LOCK_POLL_INTERVAL = 0.1
+
+
+def enqueue_job(method: str, job_id: str, queue: str, after_commit: bool = False, **kwargs: Any) -> None:
+	"""Make sure a run of ``method`` starts after this call (or the current
+	transaction's commit, with ``after_commit``)."""
+
+	if after_commit:
+		frappe.db.after_commit.add(lambda: enqueue_job(method, job_id, queue, **kwargs))
+		return
+
+	for run_id in (job_id, job_id + NEXT_RUN_SUFFIX):
+		status = get_job_status(run_id)
+		if status == JobStatus.QUEUED:
+			return
+		if status != JobStatus.STARTED:
+			frappe.enqueue(
+				"rfid.rfid.services.jobs.run_job",
+				queue=queue,
+				job_id=run_id,
+				deduplicate=True,
+				target=method,
+				lock=job_id,
+				**kwargs,
+			)
+			return
+	# Both ids are running; one of them is still waiting for the other's lock.
+
+
+def run_job(target: str, lock: str, **kwargs: Any) -> Any:
+	"""Run ``target`` once no other run holding ``lock`` is busy."""
+
+	cache = frappe.cache()
+	key = cache.make_key(f"{REDIS_LOCK_PREFIX}|{lock}")
+	token = frappe.generate_hash()
+	job = get_current_job()
+	timeout = job.timeout if job and job.timeout and job.timeout > 0 else DEFAULT_LOCK_TIMEOUT
+	# A run killed without cleaning up holds the lock until its job would have timed out.
+	while not cache.set(key, token, nx=True, ex=timeout):
+		time.sleep(LOCK_POLL_INTERVAL)
+
+	try:
+		return frappe.get_attr(target)(**kwargs)
+	finally:
+		if frappe.safe_decode(cache.get(key)) == token:
+			cache.delete(key)
@@ -0,0 +1,189 @@
+"""Throttled realtime push of tag reads to desk clients.
+
+After each ingest commit the new reads are appended to a Redis list per
+reader. They are published over Frappe realtime as one frame per reader at
+most ``live_frame_rate`` times a second; a frame folds the reads of its window
+into one row per tag and antenna, so a few hundred reads a second still make a
+few small socket messages. Frames go to the RFID Tag Event doctype room, which
+the RFID Live Monitor page joins.
+
+The request whose reads open a window publishes the frame right away. Reads
+arriving while the window is closed wait for a flush job, which publishes them
+when the window reopens and keeps going while readers are busy.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import frappe
+from frappe.realtime import get_doctype_room
+from frappe.utils import cint, flt
+
+from rfid.rfid.doctype.rfid_settings.rfid_settings import get_settings
+
+from .ingest import TAG_EVENT_DOCTYPE
+from .jobs import enqueue_job
+from .parser import dumps, loads
+from .timestamps import epoch_ms
+
+LIVE_EVENT = "rfid_live_frame"
+REDIS_LIVE_PREFIX = "rfid_live"
+REDIS_LIVE_GATE_PREFIX = "rfid_live_gate"
+REDIS_LIVE_READERS_KEY = "rfid_live_readers"
+DEFAULT_FRAME_RATE = 4.0
+DEFAULT_FRAME_SIZE = 200
+# Chunks (one per request and reader) kept while a window is closed.
+MAX_PENDING_CHUNKS = 500
+# A flush job hands over to the next one after this many seconds.
+FLUSH_TIME_BUDGET = 55
+# Idle windows a flush job waits for late reads before it exits.
+FLUSH_LINGER_WINDOWS = 4
+
+# (epc, antenna port, rssi, read time in epoch milliseconds)
+LiveRead = Tuple[str, Optional[int], Optional[float], int]
+
+
+def publish_live_reads(events: Iterable[Dict[str, Any]]) -> None:
+	"""Queue committed reads for the live monitor and publish every reader
+	whose frame window is open."""
+
+	settings = get_settings()
+	interval = _frame_interval(settings)
+	if not interval:
+		return
+
+	chunks: Dict[str, List[LiveRead]] = {}
+	for event in events:
+		chunks.setdefault(event.get("reader") or "", []).append(
+			(event["rfid"], event.get("antenna_port"), event.get("rssi"), epoch_ms(event["read_time"]))
+		)
+	if not chunks:
+		return
+
+	cache = frappe.cache()
+	pipe = cache.pipeline()
+	for reader, reads in chunks.items():
+		key = _list_key(cache, reader)
+		pipe.rpush(key, dumps(reads))
+		pipe.ltrim(key, -MAX_PENDING_CHUNKS, -1)
+	pipe.sadd(cache.make_key(REDIS_LIVE_READERS_KEY), *chunks)
+	pipe.execute()
+
+	frame_size = cint(settings.live_frame_size) or DEFAULT_FRAME_SIZE
+	waiting = False
+	for reader in chunks:
+		if not _flush_reader(cache, reader, interval, frame_size):
+			waiting = True
+
+	if waiting:
+		_enqueue_flush()
+
+
+def flush_live_frames() -> None:
+	"""Publish queued reads as their windows reopen until every reader is idle."""
+
+	settings = get_settings()
+	interval = _frame_interval(settings) or 1 / DEFAULT_FRAME_RATE
+	frame_size = cint(settings.live_frame_size) or DEFAULT_FRAME_SIZE
+	cache = frappe.cache()
+	readers_key = cache.make_key(REDIS_LIVE_READERS_KEY)
+	deadline = time.monotonic() + FLUSH_TIME_BUDGET
+	idle = 0
+
+	while time.monotonic() < deadline and idle < FLUSH_LINGER_WINDOWS:
+		pending = False
+		pipe = cache.pipeline()
+		pipe.smembers(readers_key)
+		for member in pipe.execute()[0]:
+			reader = frappe.safe_decode(member)
+			# Remove first and re-check: a producer adds the reader back
+			# after pushing, so no reads are left without a member.
+			pipe.srem(readers_key, member)
+			pipe.llen(_list_key(cache, reader))
+			if not pipe.execute()[1]:
+				continue
+			pipe.sadd(readers_key, member)
+			pipe.execute()
+			pending = True
+			_flush_reader(cache, reader, interval, frame_size)
+
+		idle = 0 if pending else idle + 1
+		time.sleep(interval)
+
+	if cache.scard(readers_key):
+		_enqueue_flush()
+
+
+def sweep_live_frames() -> None:
+	"""Scheduled: restart the flush job when reads are still waiting."""
+
+	cache = frappe.cache()
+	if cache.scard(cache.make_key(REDIS_LIVE_READERS_KEY)):
+		_enqueue_flush()
+
+
+def build_frame(reader: str, chunks: List[bytes], frame_size: int) -> Dict[str, Any]:
+	"""Fold queued chunks into one row per tag and antenna, newest last.
+
+	Only the ``frame_size`` most recently seen tags are kept; ``dropped``
+	counts the rows left out.
+	"""
+
+	rows: Dict[Tuple[str, Optional[int]], Dict[str, Any]] = {}
+	reads = 0
+	for chunk in chunks:
+		for epc, antenna, rssi, read_ms in loads(chunk):
+			reads += 1
+			key = (epc, antenna)
+			row = rows.pop(key, None)
+			if row is None:
+				row = {"epc": epc, "antenna": antenna, "rssi": rssi, "count": 0, "first": read_ms, "last": read_ms}
+			row["count"] += 1
+			row["first"] = min(row["first"], read_ms)
+			if read_ms >= row["last"]:
+				row["last"] = read_ms
+				if rssi is not None:
+					row["rssi"] = rssi
+			rows[key] = row
+
+	tags = list(rows.values())
+	return {
+		"reader": reader,
+		"sent": int(time.time() * 1000),
+		"reads": reads,
+		"dropped": max(len(tags) - frame_size, 0),
+		"tags": tags[-frame_size:],
+	}
+
+
+def _flush_reader(cache, reader: str, interval: float, frame_size: int) -> bool:
+	"""Publish the reader's queued reads if its window is open; returns whether
+	the window was open."""
+
+	if not cache.set(cache.make_key(f"{REDIS_LIVE_GATE_PREFIX}|{reader}"), 1, nx=True, px=max(int(interval * 1000), 1)):
+		return False
+
+	pipe = cache.pipeline(transaction=True)
+	key = _list_key(cache, reader)
+	pipe.lrange(key, 0, -1)
+	pipe.delete(key)
+	chunks = pipe.execute()[0]
+	if chunks:
+		frappe.publish_realtime(LIVE_EVENT, build_frame(reader, chunks, frame_size), room=get_doctype_room(TAG_EVENT_DOCTYPE))
+	return True
+
+
+def _frame_interval(settings: frappe._dict) -> float:
+	rate = flt(settings.live_frame_rate) if settings.live_frame_rate is not None else DEFAULT_FRAME_RATE
+	return 1 / rate if rate > 0 else 0.0
+
+
+def _list_key(cache, reader: str) -> str:
+	return cache.make_key(f"{REDIS_LIVE_PREFIX}|{reader}")
+
+
+def _enqueue_flush() -> None:
+	# It lingers while readers are busy; keep it off the short workers.
+	enqueue_job("rfid.rfid.services.live.flush_live_frames", "rfid_live_flush", "long")
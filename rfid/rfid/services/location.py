@@ -0,0 +1,117 @@
+"""Last known location of each tag.
+
+RFID Tag Location holds one row per EPC, named by the EPC, with the reader,
+antenna, RSSI and time of its latest read and the record it is registered to.
+Ingest upserts the latest read of every EPC in a request with one multi-row
+statement that only overwrites a row with a newer read, so late or replayed
+reads never move a tag back. Lookups are primary-key queries.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable
+
+import frappe
+from frappe import _
+from frappe.utils import now_datetime
+
+LOCATION_DOCTYPE = "RFID Tag Location"
+LOCATION_FIELDS = (
+	"name",
+	"reader",
+	"antenna_port",
+	"rssi",
+	"last_seen",
+	"last_event",
+	"reference_doctype",
+	"reference_name",
+	"item_code",
+)
+# Columns replaced when a newer read arrives. ``last_seen`` must stay last:
+# MariaDB evaluates the assignments in order and later ones see its new value.
+UPDATE_COLUMNS = (
+	"modified",
+	"reader",
+	"antenna_port",
+	"rssi",
+	"last_event",
+	"reference_doctype",
+	"reference_name",
+	"item_code",
+	"last_seen",
+)
+INSERT_COLUMNS = ("name", "owner", "creation", "modified_by", "docstatus", "idx", "epc", *UPDATE_COLUMNS)
+UPSERT_CHUNK_SIZE = 5000
+MAX_LOOKUP = 10000
+
+
+def update_tag_locations(events: Iterable[Dict[str, Any]], serial_infos: Dict[str, Dict[str, str]]) -> int:
+	"""Record the latest read of every EPC in ``events``; returns how many tags were written."""
+
+	latest: Dict[str, Dict[str, Any]] = {}
+	for event in events:
+		current = latest.get(event["rfid"])
+		if current is None or event["read_time"] >= current["read_time"]:
+			latest[event["rfid"]] = event
+	if not latest:
+		return 0
+
+	now = now_datetime()
+	user = frappe.session.user
+	rows = []
+	# Rows are locked in EPC order so concurrent requests cannot deadlock.
+	for epc in sorted(latest):
+		event = latest[epc]
+		info = serial_infos.get(epc) or {}
+		rows.append(
+			(
+				epc, user, now, user, 0, 0, epc,
+				now,
+				event.get("reader"),
+				event.get("antenna_port"),
+				event.get("rssi"),
+				event.get("_aggregate") or event["name"],
+				info.get("doctype"),
+				info.get("name"),
+				info.get("item_code"),
+				event["read_time"],
+			)
+		)
+
+	for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+		chunk = rows[start : start + UPSERT_CHUNK_SIZE]
+		frappe.db.sql(_upsert_query(len(chunk)), [value for row in chunk for value in row])
+	return len(rows)
+
+
+def get_tag_locations(epcs: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+	"""Return ``{epc: location}`` for every known EPC in ``epcs`` with one primary-key query."""
+
+	keys = list({epc.strip().upper() for epc in epcs if epc and epc.strip()})
+	if not keys:
+		return {}
+	if len(keys) > MAX_LOOKUP:
+		frappe.throw(_("Ask for at most {0} tags per call.").format(MAX_LOOKUP))
+
+	rows = frappe.get_all(LOCATION_DOCTYPE, filters={"name": ("in", keys)}, fields=list(LOCATION_FIELDS))
+	return {row.pop("name"): row for row in rows}
+
+
+def _upsert_query(count: int) -> str:
+	placeholders = ", ".join(["(" + ", ".join(["%s"] * len(INSERT_COLUMNS)) + ")"] * count)
+	columns = ", ".join(f"`{column}`" for column in INSERT_COLUMNS)
+	query = f"insert into `tab{LOCATION_DOCTYPE}` ({columns}) values {placeholders}"
+
+	if frappe.db.db_type == "postgres":
+		updates = ", ".join(f"`{column}` = excluded.`{column}`" for column in UPDATE_COLUMNS)
+		return (
+			f"{query} on conflict (`name`) do update set {updates}"
+			f" where `tab{LOCATION_DOCTYPE}`.`last_seen` is null"
+			f" or `tab{LOCATION_DOCTYPE}`.`last_seen` <= excluded.`last_seen`"
+		)
+
+	updates = ", ".join(
+		f"`{column}` = if(`last_seen` is null or `last_seen` <= values(`last_seen`), values(`{column}`), `{column}`)"
+		for column in UPDATE_COLUMNS
+	)
+	return f"{query} on duplicate key update {updates}"
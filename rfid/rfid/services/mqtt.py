@@ -0,0 +1,197 @@
+"""MQTT subscriber feeding reader tag reports into the ingest pipeline.
+
+Every enabled RFID Reader with an MQTT topic is subscribed on the broker set
+in RFID Settings. Messages are buffered and written in micro-batches through
+``process_impinj_payload``; QoS 1/2 messages are acknowledged only after the
+batch that contains them has been committed, so a crash leaves them with the
+broker for redelivery.
+
+A failed batch is retried a few times, then written message by message. A
+message that still fails is logged to the Error Log with its payload and
+acknowledged, so one bad message cannot stall the subscription. When it
+cannot even be logged, the database is down: the client reconnects and the
+persistent session redelivers everything not yet acknowledged.
+
+Run it under supervisor next to the bench workers::
+
+    bench --site <site-name> rfid-mqtt
+"""
+
+from __future__ import annotations
+
+import queue
+import signal
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import frappe
+import paho.mqtt.client as mqtt
+from frappe.utils import cint, flt
+from frappe.utils.password import get_decrypted_password
+
+from rfid.rfid.doctype.rfid_settings.rfid_settings import get_settings
+
+from .batching import MicroBatcher
+from .ingest import process_impinj_payload
+from .parser import loads
+from .stream import DEFAULT_BATCH_SIZE, DEFAULT_FLUSH_INTERVAL, QUEUE_SIZE, READER_DOCTYPE, normalise_stream_event
+
+MQTT_SOURCE = "impinj-mqtt"
+DEFAULT_PORT = 1883
+KEEPALIVE = 60
+# Attempts to write a batch before it is written message by message.
+MAX_FLUSH_ATTEMPTS = 3
+RETRY_DELAY = 1.0
+# Payload bytes kept in the Error Log for a message that is given up on.
+LOGGED_PAYLOAD_SIZE = 10000
+
+
+class MQTTIngestor:
+	"""Subscribe to reader topics and commit their messages in micro-batches."""
+
+	def __init__(self, settings: frappe._dict, topics: List[Tuple[str, str]], logger=None):
+		self.settings = settings
+		self.topics = topics
+		self.qos = cint(settings.mqtt_qos)
+		self.logger = logger
+		self.inbox: "queue.Queue[mqtt.MQTTMessage]" = queue.Queue(maxsize=QUEUE_SIZE)
+
+		self.client = mqtt.Client(
+			mqtt.CallbackAPIVersion.VERSION2,
+			client_id=settings.mqtt_client_id or f"rfid-{frappe.local.site}",
+			# A persistent session keeps unacknowledged messages for redelivery.
+			clean_session=False,
+			manual_ack=True,
+		)
+		if settings.mqtt_username:
+			self.client.username_pw_set(settings.mqtt_username, settings.mqtt_password or None)
+		if settings.mqtt_tls:
+			self.client.tls_set()
+
+		self.client.on_connect = self._on_connect
+		self.client.on_message = self._on_message
+		self.client.reconnect_delay_set(min_delay=1, max_delay=60)
+
+	def run(self, stop: threading.Event) -> None:
+		self.client.connect_async(self.settings.mqtt_host, cint(self.settings.mqtt_port) or DEFAULT_PORT, KEEPALIVE)
+		self.client.loop_start()
+		try:
+			MicroBatcher(
+				self.inbox,
+				self.flush,
+				cint(self.settings.stream_batch_size) or DEFAULT_BATCH_SIZE,
+				flt(self.settings.stream_flush_interval) or DEFAULT_FLUSH_INTERVAL,
+			).run(stop)
+		finally:
+			self.client.disconnect()
+			self.client.loop_stop()
+
+	def flush(self, messages: List["mqtt.MQTTMessage"]) -> None:
+		for attempt in range(1, MAX_FLUSH_ATTEMPTS + 1):
+			if self._write(messages) is None:
+				self._ack(messages)
+				return
+			if attempt < MAX_FLUSH_ATTEMPTS:
+				time.sleep(RETRY_DELAY * attempt)
+
+		for message in messages:
+			error = self._write([message])
+			if error:
+				try:
+					frappe.log_error(
+						f"{message.topic}\n{frappe.safe_decode(message.payload[:LOGGED_PAYLOAD_SIZE])}\n\n{error}",
+						"RFID MQTT message dropped",
+					)
+					frappe.db.commit()
+				except Exception:
+					self._log("warning", "RFID MQTT ingest cannot reach the database; reconnecting for redelivery")
+					self.client.reconnect()
+					return
+			self._ack([message])
+
+	def reader_for(self, topic: str) -> Optional[str]:
+		for subscription, reader_name in self.topics:
+			if mqtt.topic_matches_sub(subscription, topic):
+				return reader_name
+		return None
+
+	def _decode(self, message: "mqtt.MQTTMessage") -> List[Dict[str, Any]]:
+		try:
+			payload = loads(message.payload)
+		except ValueError:
+			self._log("warning", f"RFID MQTT message on {message.topic} is not JSON")
+			return []
+
+		reader_name = self.reader_for(message.topic) or message.topic
+		items = payload if isinstance(payload, list) else [payload]
+		return [normalise_stream_event(item, reader_name) for item in items if isinstance(item, dict)]
+
+	def _write(self, messages: List["mqtt.MQTTMessage"]) -> Optional[str]:
+		"""Write and commit the messages' reads; returns the traceback on failure."""
+
+		events = []
+		for message in messages:
+			events.extend(self._decode(message))
+
+		try:
+			process_impinj_payload(events, source=MQTT_SOURCE)
+			frappe.db.commit()
+		except Exception:
+			error = frappe.get_traceback()
+			frappe.db.rollback()
+			self._log("warning", f"RFID MQTT ingest failure: {error}")
+			return error
+		return None
+
+	def _ack(self, messages: List["mqtt.MQTTMessage"]) -> None:
+		for message in messages:
+			if message.qos:
+				self.client.ack(message.mid, message.qos)
+
+	def _on_connect(self, client, userdata, flags, reason_code, properties):
+		if reason_code.is_failure:
+			self._log("warning", f"RFID MQTT connection refused: {reason_code}")
+			return
+		client.subscribe([(topic, self.qos) for topic, _reader in self.topics])
+
+	def _on_message(self, client, userdata, message):
+		self.inbox.put(message)
+
+	def _log(self, level: str, message: str) -> None:
+		if self.logger:
+			getattr(self.logger, level)(message)
+
+
+def run_mqtt_ingest(reader_names: Optional[List[str]] = None) -> None:
+	"""Consume MQTT tag reports for every enabled reader until SIGINT/SIGTERM.
+
+	Expects ``frappe`` to be initialised and connected for the target site.
+	"""
+
+	settings = get_settings()
+	logger = frappe.logger("rfid")
+	if not settings.mqtt_host:
+		logger.warning("Set the MQTT broker host in RFID Settings first.")
+		return
+
+	filters: Dict[str, Any] = {"enabled": 1, "mqtt_topic": ("is", "set")}
+	if reader_names:
+		filters["name"] = ("in", reader_names)
+
+	readers = frappe.get_all(READER_DOCTYPE, filters=filters, fields=["name", "mqtt_topic"])
+	if not readers:
+		logger.warning("No RFID Reader has an MQTT topic configured.")
+		return
+
+	settings = frappe._dict(settings)
+	settings.mqtt_password = get_decrypted_password(
+		"RFID Settings", "RFID Settings", "mqtt_password", raise_exception=False
+	)
+
+	stop = threading.Event()
+	for signum in (signal.SIGINT, signal.SIGTERM):
+		signal.signal(signum, lambda *_args: stop.set())
+
+	topics = [(reader.mqtt_topic, reader.name) for reader in readers]
+	MQTTIngestor(settings, topics, logger=logger).run(stop)
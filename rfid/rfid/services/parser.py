@@ -0,0 +1,264 @@
+"""Schema-detecting fast path for Impinj payloads.
+
+A reader always sends the same layout, so the generic extractors in ``ingest``
+re-discover on every read what was already known from the last payload. The
+first payload from a caller is inspected once to find where the reads and
+their EPC, timestamp, RSSI, antenna and reader values live; later payloads are
+read with a compiled extractor doing direct key access. Any read that does
+not fit the remembered layout sends the whole payload down the generic path
+and the layout is detected again on the next payload.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import frappe
+
+try:
+	import orjson
+except ImportError:  # pragma: no cover - optional speed-up
+	orjson = None
+
+CONTAINER_KEYS = (
+	"notifications",
+	"Notification",
+	"events",
+	"items",
+	"records",
+	"tagReport",
+	"tagReportData",
+	"tag_reads",
+	"tags",
+)
+ENVELOPE_KEY = "tagInventoryEvent"
+DATA_KEYS = ("data", "eventData")
+EPC_KEYS = ("epc", "epcHex", "epcStr", "tag", "id")
+TIMESTAMP_KEYS = (
+	"timestamp",
+	"readTime",
+	"eventTime",
+	"firstSeenTimestamp",
+	"lastSeenTimestamp",
+	"modified",
+	"observedAt",
+)
+RSSI_KEYS = ("peakRssiCdbm", "rssi", "peakRssi", "rssiDbm")
+ANTENNA_KEYS = ("antennaPort", "antenna", "antenna_port")
+
+# (node, epc, raw timestamp, rssi, antenna port, reader)
+TagRead = Tuple[Dict[str, Any], str, Any, Optional[float], Optional[int], Optional[str]]
+
+# Remembered layouts per site and caller.
+_layouts: Dict[Tuple[str, str], "Layout"] = {}
+
+
+def loads(data: Any) -> Any:
+	"""Decode a JSON body with orjson when it is installed."""
+
+	if orjson is not None:
+		return orjson.loads(data)
+	return json.loads(data)
+
+
+def dumps(value: Any) -> bytes:
+	"""Encode ``value`` as compact JSON with orjson when it is installed."""
+
+	if orjson is not None:
+		return orjson.dumps(value, default=str)
+	return json.dumps(value, separators=(",", ":"), default=str).encode("utf-8")
+
+
+class Layout:
+	"""Where the reads and their values sit in one payload shape."""
+
+	def __init__(
+		self,
+		container: Optional[str],
+		body_key: Optional[str],
+		epc_key: str,
+		time_key: str,
+		time_in_entry: bool,
+		rssi_key: Optional[str],
+		antenna_key: Optional[str],
+		reader_key: Optional[str],
+		reader_in_entry: bool,
+	):
+		self.container = container
+		self.body_key = body_key
+		self.epc_key = epc_key
+		self.time_key = time_key
+		self.time_in_entry = time_in_entry
+		self.rssi_key = rssi_key
+		self.antenna_key = antenna_key
+		self.reader_key = reader_key
+		self.reader_in_entry = reader_in_entry
+		self.extract = self._compile()
+
+	@classmethod
+	def detect(cls, payload: Any) -> Optional["Layout"]:
+		"""Derive a layout from the first read of ``payload``, or ``None`` when the
+		shape is not one the fast path handles."""
+
+		container, nodes = _find_nodes(payload)
+		if not nodes or not isinstance(nodes[0], dict):
+			return None
+
+		entry = nodes[0]
+		body_key = None
+		for key in (ENVELOPE_KEY, *DATA_KEYS):
+			if isinstance(entry.get(key), dict):
+				body_key = key
+				break
+		body = entry[body_key] if body_key else entry
+		if body_key in DATA_KEYS:
+			# The generic path replaces such nodes with their data section.
+			entry = body
+
+		epc_keys = ("epcHex",) if body_key == ENVELOPE_KEY else EPC_KEYS
+		epc_key = _first_key(body, epc_keys, lambda value: isinstance(value, str) and value.strip())
+
+		# Envelope values stand in for the read's own ``timestamp`` and
+		# ``reader``, as ``unwrap_inventory_event`` does on the generic path.
+		envelope = body_key == ENVELOPE_KEY
+		time_key, time_in_entry = _first_key(body, TIMESTAMP_KEYS, _is_timestamp), False
+		if envelope and time_key != "timestamp" and _is_timestamp(entry.get("timestamp")):
+			time_key, time_in_entry = "timestamp", True
+		elif not time_key and envelope:
+			time_key, time_in_entry = _first_key(entry, TIMESTAMP_KEYS, _is_timestamp), True
+
+		reader_key, reader_in_entry = ("reader" if "reader" in body else None), False
+		if not reader_key and envelope:
+			reader_in_entry = True
+			if "hostname" in entry:
+				reader_key = "hostname"
+			elif "reader" in entry:
+				reader_key = "reader"
+
+		reader_container = entry if reader_in_entry else body
+		if not epc_key or not time_key or (reader_key and not isinstance(reader_container[reader_key], (str, type(None)))):
+			return None
+
+		return cls(
+			container,
+			body_key,
+			epc_key,
+			time_key,
+			time_in_entry,
+			_first_key(body, RSSI_KEYS, lambda value: value is not None),
+			_first_key(body, ANTENNA_KEYS, lambda value: value is not None),
+			reader_key,
+			reader_in_entry,
+		)
+
+	def read(self, payload: Any) -> Optional[List[TagRead]]:
+		"""Extract every read in ``payload``; ``None`` when any read does not fit."""
+
+		if self.container is None:
+			nodes = payload if isinstance(payload, list) else None
+		else:
+			nodes = payload.get(self.container) if isinstance(payload, dict) else None
+		if not isinstance(nodes, list):
+			return None
+
+		extract = self.extract
+		try:
+			return [extract(node) for node in nodes]
+		except (KeyError, TypeError, ValueError, AttributeError):
+			return None
+
+	def _compile(self) -> Callable[[Dict[str, Any]], TagRead]:
+		body_key = self.body_key
+		epc_key = self.epc_key
+		time_key, time_in_entry = self.time_key, self.time_in_entry
+		rssi_key = self.rssi_key
+		rssi_scale = 0.01 if rssi_key == "peakRssiCdbm" else 1.0
+		antenna_key = self.antenna_key
+		reader_key, reader_in_entry = self.reader_key, self.reader_in_entry
+
+		# Missing required keys raise KeyError and unexpected types raise
+		# TypeError/AttributeError; ``read`` turns both into a mismatch.
+		unwrap = body_key in DATA_KEYS
+
+		def extract(node: Dict[str, Any]) -> TagRead:
+			body = node[body_key] if body_key else node
+			if unwrap:
+				node = body
+
+			epc = body[epc_key].strip().upper()
+			if not epc:
+				raise ValueError(epc_key)
+
+			timestamp = (node if time_in_entry else body)[time_key]
+			if timestamp is None:
+				raise KeyError(time_key)
+
+			rssi = None
+			if rssi_key:
+				rssi = body.get(rssi_key)
+				if rssi is not None:
+					rssi = float(rssi) * rssi_scale
+
+			antenna = None
+			if antenna_key:
+				antenna = body.get(antenna_key)
+				if antenna is not None:
+					antenna = int(antenna)
+
+			reader = None
+			if reader_key:
+				reader = (node if reader_in_entry else body).get(reader_key)
+				if reader is not None:
+					reader = reader.strip() or None
+
+			return node, epc, timestamp, rssi, antenna, reader
+
+		return extract
+
+
+def parse_reads(payload: Any, layout_key: str) -> Optional[List[TagRead]]:
+	"""Read ``payload`` with the layout remembered for ``layout_key``.
+
+	Returns ``None`` when the payload has to go through the generic path.
+	"""
+
+	key = (frappe.local.site, layout_key)
+	layout = _layouts.get(key)
+	if layout is None:
+		layout = Layout.detect(payload)
+		if layout is None:
+			return None
+		_layouts[key] = layout
+
+	reads = layout.read(payload)
+	if reads is None:
+		_layouts.pop(key, None)
+	return reads
+
+
+def _find_nodes(payload: Any) -> Tuple[Optional[str], Optional[List[Any]]]:
+	if isinstance(payload, list):
+		return None, payload
+
+	if isinstance(payload, dict):
+		for key in CONTAINER_KEYS:
+			value = payload.get(key)
+			if isinstance(value, list):
+				return key, value
+
+	return None, None
+
+
+def _first_key(container: Dict[str, Any], keys: Tuple[str, ...], accept: Callable[[Any], Any]) -> Optional[str]:
+	for key in keys:
+		if accept(container.get(key)):
+			return key
+	return None
+
+
+def _is_timestamp(value: Any) -> bool:
+	if isinstance(value, str):
+		return bool(value.strip())
+	# Epoch seconds, milliseconds or microseconds.
+	return isinstance(value, (int, float)) and not isinstance(value, bool)
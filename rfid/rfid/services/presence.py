@@ -0,0 +1,338 @@
+"""Presence of tags in reader zones.
+
+Each reader antenna is a zone. Reads move a tag through ``enter``, ``dwell``
+and ``exit`` transitions, and with RFID Settings → Track Presence on, only
+those transitions are sent to webhooks instead of every read.
+
+A tag enters a zone on a read at or above the enter RSSI and stays while its
+reads there are no more than the hysteresis below it; it moves to another zone
+only when read there at least the hysteresis stronger than in its current
+zone. It exits when it has not been read in its zone for the exit timeout, and
+dwells once after staying the dwell time.
+
+The state of a batch of tags is loaded from Redis with one MGET, updated in
+memory and written back with one pipeline. Each tag is locked while this
+happens, so concurrent ingests and sweeps of the same tag take turns instead
+of overwriting each other's changes; tags another worker holds are updated
+once it lets go. Exit and dwell deadlines sit on a
+timer wheel of one Redis set per second; each ingest request and a scheduled
+sweep claim the seconds that have passed and look only at the tags filed
+under them. Reads do not move a tag's timer; when it fires early the tag is
+filed again under its current deadline. A sweep paused for longer than
+``MAX_SWEEP_SLOTS`` drops the timers that fell due before that, and those tags
+leave their zone without an exit.
+"""
+
+from __future__ import annotations
+
+import math
+import pickle
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import frappe
+from frappe.utils import cint, flt
+
+from rfid.rfid.doctype.rfid_settings.rfid_settings import get_settings
+
+from .raddec import build_raddecs
+from .webhook import dispatch_raddec_events
+
+ENTER = "enter"
+DWELL = "dwell"
+EXIT = "exit"
+EVENT_PREFIX = "rfid.presence."
+# Source reported for transitions raised by timers rather than reads.
+SWEEP_SOURCE = "presence"
+REDIS_STATE_PREFIX = "rfid_presence"
+REDIS_WHEEL_PREFIX = "rfid_presence_wheel"
+REDIS_WHEEL_CURSOR_KEY = "rfid_presence_wheel_cursor"
+REDIS_LOCK_PREFIX = "rfid_presence_lock"
+# Milliseconds after which the lock of a worker that died mid-update expires.
+LOCK_TIMEOUT_MS = 5000
+LOCK_POLL_INTERVAL = 0.01
+DEFAULT_EXIT_TIMEOUT = 10.0
+DEFAULT_DWELL_TIME = 60.0
+DEFAULT_HYSTERESIS = 3.0
+# Weight of a new read in the smoothed RSSI of a tag's zone.
+RSSI_SMOOTHING = 0.3
+# Seconds of the wheel a sweep looks back over after a pause; timers older
+# than this are dropped along with their slots.
+MAX_SWEEP_SLOTS = 3600
+# Tag state outlives its last read by this many seconds past the exit timeout,
+# so its exit is sent before the state expires unless the sweep pauses longer.
+STATE_TTL_MARGIN = MAX_SWEEP_SLOTS
+SWEEP_CHUNK_SIZE = 500
+
+# (event, tag state at the transition)
+Transition = Tuple[str, Dict[str, Any]]
+# (epc, current state, now) -> (new state, transitions)
+StateUpdate = Callable[[str, Optional[Dict[str, Any]], float], Tuple[Optional[Dict[str, Any]], List[Transition]]]
+
+
+class PresenceRules:
+	"""Timeouts and RSSI thresholds of the presence state machine."""
+
+	def __init__(
+		self,
+		exit_timeout: float = DEFAULT_EXIT_TIMEOUT,
+		dwell_time: float = DEFAULT_DWELL_TIME,
+		enter_rssi: Optional[float] = None,
+		hysteresis: float = DEFAULT_HYSTERESIS,
+	):
+		self.exit_timeout = exit_timeout
+		self.dwell_time = dwell_time
+		self.enter_rssi = enter_rssi
+		self.hysteresis = hysteresis
+
+	@classmethod
+	def from_settings(cls, settings: frappe._dict) -> "PresenceRules":
+		return cls(
+			flt(settings.presence_exit_timeout) or DEFAULT_EXIT_TIMEOUT,
+			flt(settings.presence_dwell_time),
+			# RSSI is negative, so 0 means no threshold.
+			flt(settings.presence_enter_rssi) or None,
+			flt(settings.presence_hysteresis),
+		)
+
+	def observe(
+		self, state: Optional[Dict[str, Any]], read: Dict[str, Any], now: float
+	) -> Tuple[Optional[Dict[str, Any]], List[Transition]]:
+		"""Apply one read of the tag to its state; returns the new state and transitions."""
+
+		state, transitions = self.expire(state, now)
+		rssi = read.get("rssi") or None
+		zone = (read.get("reader"), read.get("antenna_port"))
+
+		if state and (state["reader"], state["antenna_port"]) == zone:
+			if self.enter_rssi is None or rssi is None or rssi >= self.enter_rssi - self.hysteresis:
+				_refresh(state, read, rssi, now)
+			return state, transitions
+
+		if self.enter_rssi is not None and rssi is not None and rssi < self.enter_rssi:
+			return state, transitions
+
+		if state:
+			# Stay in the current zone unless clearly stronger in the new one.
+			if state["rssi"] is not None and (rssi is None or rssi < state["rssi"] + self.hysteresis):
+				return state, transitions
+			transitions.append((EXIT, dict(state)))
+
+		state = {
+			"rfid": read["rfid"],
+			"item_code": read.get("item_code"),
+			"reader": zone[0],
+			"antenna_port": zone[1],
+			"rssi": rssi,
+			"entered": now,
+			"last_seen": now,
+			"first_read": read["read_time"],
+			"last_read": read["read_time"],
+			"reads": 1,
+			"dwelled": False,
+			"timer": None,
+		}
+		transitions.append((ENTER, dict(state)))
+		return state, transitions
+
+	def expire(self, state: Optional[Dict[str, Any]], now: float) -> Tuple[Optional[Dict[str, Any]], List[Transition]]:
+		"""Apply the timeouts due at ``now``."""
+
+		if not state:
+			return None, []
+
+		if now - state["last_seen"] >= self.exit_timeout:
+			return None, [(EXIT, state)]
+
+		if self.dwell_time and not state["dwelled"] and now - state["entered"] >= self.dwell_time:
+			state["dwelled"] = True
+			return state, [(DWELL, dict(state))]
+
+		return state, []
+
+	def deadline(self, state: Dict[str, Any]) -> float:
+		"""Return when the state next needs ``expire``."""
+
+		deadline = state["last_seen"] + self.exit_timeout
+		if self.dwell_time and not state["dwelled"]:
+			deadline = min(deadline, state["entered"] + self.dwell_time)
+		return deadline
+
+
+def update_presence(events: Iterable[Dict[str, Any]], source: str) -> int:
+	"""Run committed reads through the state machine, then the timers that are
+	due, and dispatch the transitions; returns how many were dispatched."""
+
+	rules = PresenceRules.from_settings(get_settings())
+
+	by_tag: Dict[str, List[Dict[str, Any]]] = {}
+	for event in events:
+		by_tag.setdefault(event["rfid"], []).append(event)
+
+	def observe(epc: str, state: Optional[Dict[str, Any]], now: float):
+		transitions: List[Transition] = []
+		for read in sorted(by_tag[epc], key=lambda event: event["read_time"]):
+			state, changes = rules.observe(state, read, now)
+			transitions.extend(changes)
+		return state, transitions
+
+	transitions = _update_states(frappe.cache(), list(by_tag), rules, observe)
+	expired = _sweep(rules, time.time())
+	_dispatch(transitions, source)
+	_dispatch(expired, SWEEP_SOURCE)
+	return len(transitions) + len(expired)
+
+
+def sweep_presence() -> None:
+	"""Scheduled: send exits and dwells that fell due while no reads arrived."""
+
+	settings = get_settings()
+	if not settings.presence_tracking:
+		return
+	_dispatch(_sweep(PresenceRules.from_settings(settings), time.time()), SWEEP_SOURCE)
+
+
+def _sweep(rules: PresenceRules, now: float) -> List[Transition]:
+	cache = frappe.cache()
+	current = int(now)
+	# GETSET hands every sweeper its own run of seconds.
+	previous = cache.getset(cache.make_key(REDIS_WHEEL_CURSOR_KEY), current)
+	start = cint(previous) + 1 if previous else current
+	start = max(start, current - MAX_SWEEP_SLOTS)
+
+	def expire(epc: str, state: Optional[Dict[str, Any]], now: float):
+		if state is None:
+			return None, []
+		state["timer"] = None
+		return rules.expire(state, now)
+
+	transitions: List[Transition] = []
+	for chunk_start in range(start, current + 1, SWEEP_CHUNK_SIZE):
+		slots = range(chunk_start, min(chunk_start + SWEEP_CHUNK_SIZE, current + 1))
+		pipe = cache.pipeline()
+		for slot in slots:
+			pipe.smembers(_slot_key(cache, slot))
+			pipe.delete(_slot_key(cache, slot))
+		results = pipe.execute()
+
+		epcs = {frappe.safe_decode(member) for members in results[::2] for member in members}
+		transitions.extend(_update_states(cache, list(epcs), rules, expire))
+
+	return transitions
+
+
+def _update_states(cache, epcs: List[str], rules: PresenceRules, update: StateUpdate) -> List[Transition]:
+	"""Apply ``update`` to the state of each of ``epcs`` under its lock; returns the transitions.
+
+	Tags locked by another worker are retried once it lets go, so nobody waits
+	while holding a lock.
+	"""
+
+	transitions: List[Transition] = []
+	waiting = epcs
+	while waiting:
+		pipe = cache.pipeline()
+		for epc in waiting:
+			pipe.set(_lock_key(cache, epc), 1, nx=True, px=LOCK_TIMEOUT_MS)
+		acquired = pipe.execute()
+		locked = [epc for epc, ok in zip(waiting, acquired) if ok]
+		waiting = [epc for epc, ok in zip(waiting, acquired) if not ok]
+
+		if locked:
+			try:
+				now = time.time()
+				states = _load_states(cache, locked)
+				for epc in locked:
+					states[epc], changes = update(epc, states[epc], now)
+					transitions.extend(changes)
+				_save_states(cache, states, rules, now)
+			finally:
+				cache.delete(*(_lock_key(cache, epc) for epc in locked))
+		elif waiting:
+			time.sleep(LOCK_POLL_INTERVAL)
+
+	return transitions
+
+
+def _refresh(state: Dict[str, Any], read: Dict[str, Any], rssi: Optional[float], now: float) -> None:
+	state["last_seen"] = now
+	state["last_read"] = max(state["last_read"], read["read_time"])
+	state["reads"] += 1
+	if rssi is not None:
+		previous = state["rssi"]
+		state["rssi"] = rssi if previous is None else previous + RSSI_SMOOTHING * (rssi - previous)
+
+
+def _load_states(cache, epcs: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+	raw_states = cache.mget([_state_key(cache, epc) for epc in epcs])
+	return {epc: pickle.loads(raw) if raw else None for epc, raw in zip(epcs, raw_states)}
+
+
+def _save_states(cache, states: Dict[str, Optional[Dict[str, Any]]], rules: PresenceRules, now: float) -> None:
+	pipe = cache.pipeline()
+	ttl = math.ceil(rules.exit_timeout + STATE_TTL_MARGIN)
+	for epc, state in states.items():
+		key = _state_key(cache, epc)
+		if state is None:
+			pipe.delete(key)
+			continue
+
+		slot = math.ceil(rules.deadline(state))
+		# An earlier pending timer still fires in time and re-files the tag.
+		# A timer already due may have been claimed by a concurrent sweep.
+		timer = state["timer"]
+		if timer is None or timer > slot or timer <= now:
+			state["timer"] = max(slot, int(now) + 1)
+			pipe.sadd(_slot_key(cache, state["timer"]), epc)
+			pipe.expire(_slot_key(cache, state["timer"]), ttl)
+		pipe.set(key, pickle.dumps(state), ex=ttl)
+	pipe.execute()
+
+
+def _dispatch(transitions: List[Transition], source: str) -> None:
+	by_event: Dict[str, List[Tuple[Dict[str, Any], Dict[str, Any]]]] = {}
+	for event, state in transitions:
+		row = {
+			"rfid": state["rfid"],
+			"reader": state["reader"],
+			"antenna_port": state["antenna_port"],
+			"rssi": state["rssi"],
+			"read_time": state["last_read"],
+			"read_count": state["reads"],
+		}
+		for raddec in build_raddecs([row]):
+			by_event.setdefault(event, []).append(
+				(
+					raddec,
+					{
+						"transition": event,
+						"reader": state["reader"],
+						"antenna_port": state["antenna_port"],
+						"rfid": state["rfid"],
+						"item_code": state.get("item_code"),
+						"entered_at": _isoformat(state["first_read"]),
+						"last_seen": _isoformat(state["last_read"]),
+						"dwell_seconds": round(state["last_seen"] - state["entered"], 3),
+						"source": source,
+					},
+				)
+			)
+	for event, items in by_event.items():
+		dispatch_raddec_events(items, event=EVENT_PREFIX + event)
+
+
+def _isoformat(value: Any) -> Any:
+	return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _state_key(cache, epc: str) -> str:
+	return cache.make_key(f"{REDIS_STATE_PREFIX}|{epc}")
+
+
+def _lock_key(cache, epc: str) -> str:
+	return cache.make_key(f"{REDIS_LOCK_PREFIX}|{epc}")
+
+
+def _slot_key(cache, slot: int) -> str:
+	return cache.make_key(f"{REDIS_WHEEL_PREFIX}|{slot}")
@@ -0,0 +1,70 @@
+"""Redis lists whose items survive the consumer that took them.
+
+A consumer takes items with LMOVE onto a processing list of its own and
+removes them only once their work is committed, so a job that is killed
+mid-batch loses nothing. While it works it keeps a heartbeat key alive; a
+scheduled sweep calls ``recover`` to move the items of a processing list
+whose heartbeat has expired back to the head of their list. Items may
+therefore be handled twice, and consumers must tolerate that.
+
+Lists are named without the site prefix; keys are made here with
+``make_key`` and every list command goes through a pipeline, since the cache
+wrapper's own list methods would prefix them a second time.
+"""
+
+from __future__ import annotations
+
+from typing import List
+
+# Seconds without a heartbeat after which a consumer's processing list is
+# considered abandoned and put back.
+PROCESSING_TIMEOUT = 300
+
+
+def take(cache, name: str, count: int) -> List[bytes]:
+	"""Move up to ``count`` items from the head of list ``name`` onto its
+	processing list, where they stay until ``ack`` releases them."""
+
+	key = cache.make_key(name)
+	processing = processing_key(cache, name)
+	pipe = cache.pipeline(transaction=True)
+	for _index in range(count):
+		pipe.lmove(key, processing, "LEFT", "RIGHT")
+	pipe.set(heartbeat_key(cache, name), 1, ex=PROCESSING_TIMEOUT)
+	return [item for item in pipe.execute()[:-1] if item is not None]
+
+
+def ack(cache, pipe, name: str, taken: List[bytes]) -> None:
+	"""Queue on ``pipe`` the release of items taken from list ``name``."""
+
+	processing = processing_key(cache, name)
+	for raw in taken:
+		pipe.lrem(processing, 1, raw)
+	pipe.set(heartbeat_key(cache, name), 1, ex=PROCESSING_TIMEOUT)
+
+
+def recover(cache, name: str) -> None:
+	"""Put the items of an abandoned processing list back at the head of ``name``."""
+
+	processing = processing_key(cache, name)
+	heartbeat = heartbeat_key(cache, name)
+
+	def move_back(pipe) -> None:
+		alive, stranded = pipe.exists(heartbeat), pipe.llen(processing)
+		pipe.multi()
+		if alive:
+			return
+		# Popped from the tail and pushed to the head, the items keep their order.
+		for _index in range(stranded):
+			pipe.lmove(processing, cache.make_key(name), "RIGHT", "LEFT")
+
+	# Retried when a consumer takes or releases items meanwhile.
+	cache.transaction(move_back, processing, heartbeat)
+
+
+def processing_key(cache, name: str) -> str:
+	return cache.make_key(f"{name}|processing")
+
+
+def heartbeat_key(cache, name: str) -> str:
+	return cache.make_key(f"{name}|heartbeat")
@@ -1,90 +1,253 @@
-"""Utilities to transform RFID Tag Event data into raddec JSON."""
+"""Utilities to transform RFID Tag Event data into raddec JSON.
+
+``build_raddecs`` renders one raddec per stored read. ``RaddecAggregator``
+collects reads over a short window and renders one raddec per transmitter,
+with an ``rssiSignature`` entry per receiver and antenna that heard it and the
+real number of decodings behind each entry.
+"""
 
 from __future__ import annotations
 
 import hashlib
-from typing import Any, Dict, Optional
+from datetime import tzinfo
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from frappe.utils import cstr, get_datetime
 
-import frappe
-from frappe.utils import cstr
+from .timestamps import epoch_ms, system_zone
 
 TRANSMITTER_TYPE_UNKNOWN = 0
 TRANSMITTER_TYPE_EPC96 = 5
 TRANSMITTER_TYPE_TID96 = 7
 RECEIVER_TYPE_EUI48 = 2
 
+_TRANSMITTER_TYPES = {24: TRANSMITTER_TYPE_EPC96, 32: TRANSMITTER_TYPE_TID96}
+_UNSET = object()
+
 
 def build_raddec(event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
 	"""Return a raddec-style payload for the given tag event data."""
 
-	rfid_value = cstr(event.get("rfid")).strip()
-	read_time = event.get("read_time")
+	for raddec in build_raddecs([event]):
+		return raddec
+	return None
 
-	if not rfid_value or not read_time:
-		return None
 
-	transmitter_id = _normalise_transmitter_id(rfid_value)
-	transmitter_type = _guess_transmitter_type(transmitter_id)
+def build_raddecs(
+	rows: Iterable[Dict[str, Any]],
+	with_docname: bool = False,
+	zone: Optional[tzinfo] = None,
+) -> Iterator[Dict[str, Any]]:
+	"""Render raddecs for many tag events from their typed columns.
 
-	if not transmitter_id:
-		return None
+	Work that depends only on the reader (receiver id) is done once per reader
+	and the timezone once per call. ``antenna_port`` and ``rssi`` are NOT NULL
+	columns, so a stored 0 means the reader did not report the value. Rows that
+	cannot be rendered are skipped.
+	"""
 
-	timestamp = int(read_time.timestamp() * 1000)
+	zone = zone or system_zone()
+	receivers: Dict[Optional[str], Optional[str]] = {}
 
-	receiver_id = _derive_receiver_id(event.get("reader"))
-	receiver_antenna = event.get("antenna_port")
-	rssi = event.get("rssi")
+	for row in rows:
+		rfid_value = row.get("rfid")
+		read_time = row.get("read_time")
+		if not rfid_value or not read_time:
+			continue
 
-	rssi_signature = []
-	if receiver_id and rssi is not None:
-		try:
-			rssi_value = float(rssi)
-		except (TypeError, ValueError):
-			rssi_value = None
-		else:
-			rssi_signature.append(
+		transmitter_id = _normalise_transmitter_id(cstr(rfid_value).strip())
+		if not transmitter_id:
+			continue
+
+		reader = row.get("reader")
+		receiver_id = receivers.get(reader, _UNSET)
+		if receiver_id is _UNSET:
+			receiver_id = receivers[reader] = _derive_receiver_id(reader)
+
+		raddec = {
+			"transmitterId": transmitter_id,
+			"transmitterIdType": _TRANSMITTER_TYPES.get(len(transmitter_id), TRANSMITTER_TYPE_UNKNOWN),
+			"timestamp": epoch_ms(get_datetime(read_time), zone),
+		}
+
+		receiver_antenna = row.get("antenna_port") or None
+		rssi = row.get("rssi")
+		if receiver_id and rssi:
+			try:
+				rssi_value = round(float(rssi))
+			except (TypeError, ValueError):
+				pass
+			else:
+				raddec["rssiSignature"] = [
+					{
+						"receiverId": receiver_id,
+						"receiverIdType": RECEIVER_TYPE_EUI48,
+						"receiverAntenna": receiver_antenna,
+						"rssi": rssi_value,
+						"numberOfDecodings": row.get("read_count") or 1,
+					}
+				]
+
+		if receiver_id and receiver_antenna is not None:
+			raddec["receivers"] = [
 				{
 					"receiverId": receiver_id,
 					"receiverIdType": RECEIVER_TYPE_EUI48,
-					"receiverAntenna": receiver_antenna,
-					"rssi": round(rssi_value),
-					"numberOfDecodings": 1,
+					"antenna": receiver_antenna,
 				}
-			)
-
-	raddec = {
-		"transmitterId": transmitter_id,
-		"transmitterIdType": transmitter_type,
-		"timestamp": timestamp,
-	}
-
-	if rssi_signature:
-		raddec["rssiSignature"] = rssi_signature
-
-	if receiver_id and receiver_antenna is not None:
-		raddec["receivers"] = [
-			{
-				"receiverId": receiver_id,
-				"receiverIdType": RECEIVER_TYPE_EUI48,
-				"antenna": receiver_antenna,
+			]
+
+		if with_docname:
+			raddec["_docname"] = row.get("name")
+
+		yield raddec
+
+
+class RaddecAggregator:
+	"""Combine the reads of each transmitter arriving within ``window`` seconds.
+
+	The window of a transmitter opens with its first read and closes
+	``window`` seconds later, counted on the clock passed to ``add`` and
+	``flush``; reads arriving meanwhile from any reader or antenna join it.
+	Each ``rssiSignature`` entry carries the mean RSSI of its decodings and
+	entries are ordered strongest first.
+	"""
+
+	def __init__(self, window: float, zone: Optional[tzinfo] = None):
+		self.window = window
+		self.zone = zone or system_zone()
+		self._open: Dict[str, Dict[str, Any]] = {}
+		self._closed: List[Dict[str, Any]] = []
+		self._receivers: Dict[Optional[str], Optional[str]] = {}
+
+	def __len__(self) -> int:
+		return len(self._open) + len(self._closed)
+
+	def add(self, row: Dict[str, Any], now: float) -> None:
+		"""Add one read; ``read_time`` is a datetime or epoch milliseconds."""
+
+		rfid_value = row.get("rfid")
+		read_time = row.get("read_time")
+		if not rfid_value or not read_time:
+			return
+
+		transmitter_id = _normalise_transmitter_id(cstr(rfid_value).strip())
+		if not transmitter_id:
+			return
+
+		entry = self._open.get(transmitter_id)
+		if entry is not None and now - entry["opened"] >= self.window:
+			self._closed.append(self._open.pop(transmitter_id))
+			entry = None
+		if entry is None:
+			entry = self._open[transmitter_id] = {
+				"transmitterId": transmitter_id,
+				"rfid": rfid_value,
+				"item_code": None,
+				"opened": now,
+				"first": None,
+				"decodings": 0,
+				"signature": {},
 			}
-		]
 
-	return raddec
+		read_ms = read_time if isinstance(read_time, int) else epoch_ms(get_datetime(read_time), self.zone)
+		entry["first"] = read_ms if entry["first"] is None else min(entry["first"], read_ms)
+		entry["item_code"] = entry["item_code"] or row.get("item_code")
+		decodings = row.get("read_count") or 1
+		entry["decodings"] += decodings
 
+		reader = row.get("reader")
+		receiver_id = self._receivers.get(reader, _UNSET)
+		if receiver_id is _UNSET:
+			receiver_id = self._receivers[reader] = _derive_receiver_id(reader)
 
-def _normalise_transmitter_id(rfid_value: str) -> str:
-	clean_hex = "".join(ch for ch in rfid_value if ch.isalnum()).lower()
-	return clean_hex
+		key = (receiver_id, row.get("antenna_port") or None)
+		signal = entry["signature"].get(key)
+		if signal is None:
+			signal = entry["signature"][key] = {"reader": reader, "decodings": 0, "rssi_total": 0.0, "rssi_decodings": 0}
+		signal["decodings"] += decodings
+		try:
+			rssi = float(row.get("rssi") or 0)
+		except (TypeError, ValueError):
+			rssi = 0
+		if rssi:
+			signal["rssi_total"] += rssi * decodings
+			signal["rssi_decodings"] += decodings
+
+	def flush(self, now: Optional[float] = None) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+		"""Return ``(raddec, summary)`` for every window closed by ``now``, or for
+		all windows without ``now``. The summary names the strongest reader and
+		antenna, every reader heard on, the item and the decodings."""
+
+		closed, self._closed = self._closed, []
+		for transmitter_id in list(self._open):
+			if now is None or now - self._open[transmitter_id]["opened"] >= self.window:
+				closed.append(self._open.pop(transmitter_id))
+		return [self._render(entry) for entry in closed]
 
+	def _render(self, entry: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+		transmitter_id = entry["transmitterId"]
+		raddec: Dict[str, Any] = {
+			"transmitterId": transmitter_id,
+			"transmitterIdType": _TRANSMITTER_TYPES.get(len(transmitter_id), TRANSMITTER_TYPE_UNKNOWN),
+			"timestamp": entry["first"],
+		}
 
-def _guess_transmitter_type(transmitter_id: str) -> int:
-	length = len(transmitter_id)
-	if length == 24:
-		return TRANSMITTER_TYPE_EPC96
-	if length == 32:
-		return TRANSMITTER_TYPE_TID96
-	return TRANSMITTER_TYPE_UNKNOWN
+		signature = []
+		receivers = []
+		readers = []
+		for (receiver_id, antenna), signal in entry["signature"].items():
+			if signal["reader"] not in readers:
+				readers.append(signal["reader"])
+			if not receiver_id:
+				continue
+			if antenna is not None:
+				receivers.append({"receiverId": receiver_id, "receiverIdType": RECEIVER_TYPE_EUI48, "antenna": antenna})
+			if signal["rssi_decodings"]:
+				signature.append(
+					(
+						signal,
+						{
+							"receiverId": receiver_id,
+							"receiverIdType": RECEIVER_TYPE_EUI48,
+							"receiverAntenna": antenna,
+							"rssi": round(signal["rssi_total"] / signal["rssi_decodings"]),
+							"numberOfDecodings": signal["decodings"],
+						},
+					)
+				)
+
+		signature.sort(key=lambda item: item[1]["rssi"], reverse=True)
+		if signature:
+			raddec["rssiSignature"] = [item[1] for item in signature]
+		if receivers:
+			raddec["receivers"] = receivers
+
+		strongest = signature[0] if signature else None
+		summary = {
+			"rfid": entry["rfid"],
+			"reader": strongest[0]["reader"] if strongest else readers[0] if readers else None,
+			"antenna_port": strongest[1]["receiverAntenna"] if strongest else None,
+			"readers": readers,
+			"item_code": entry["item_code"],
+			"decodings": entry["decodings"],
+		}
+		return raddec, summary
+
+
+def aggregate_raddecs(rows: Iterable[Dict[str, Any]], zone: Optional[tzinfo] = None) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+	"""Combine all ``rows`` into one raddec per transmitter."""
+
+	aggregator = RaddecAggregator(float("inf"), zone)
+	for row in rows:
+		aggregator.add(row, 0)
+	return aggregator.flush()
+
+
+def _normalise_transmitter_id(rfid_value: str) -> str:
+	if rfid_value.isalnum():
+		return rfid_value.lower()
+	return "".join(ch for ch in rfid_value if ch.isalnum()).lower()
 
 
 def _derive_receiver_id(reader: Optional[str]) -> Optional[str]:
@@ -0,0 +1,169 @@
+"""Windowed raddecs for webhooks.
+
+With RFID Settings → Raddec Window above 0, webhooks receive one raddec per
+tag and window instead of one per read. After each ingest commit the reads
+are appended to a Redis list; a flush job feeds them to a
+``RaddecAggregator``, so reads of a tag from every reader and antenna within
+the window become one raddec with a combined ``rssiSignature``, and
+dispatches each raddec once its window closes.
+
+The job keeps running while reads arrive. Windows still open when it hands
+over are sent early rather than kept in memory of a finished job. Queued
+reads stay on a processing list (see ``processing``) until the raddecs they
+went into are committed, so reads taken by a job that dies are put back by
+the sweep; their raddecs may then be sent twice.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import frappe
+from frappe.utils import flt
+
+from rfid.rfid.doctype.rfid_settings.rfid_settings import get_settings
+
+from .jobs import enqueue_job
+from .parser import dumps, loads
+from .processing import ack, recover, take
+from .raddec import RaddecAggregator
+from .timestamps import epoch_ms
+from .webhook import dispatch_raddec_events
+
+REDIS_WINDOW_KEY = "rfid_raddec_window"
+# Source reported for raddecs combined over a window.
+WINDOW_SOURCE = "raddec_window"
+# A flush job hands over to the next one after this many seconds.
+FLUSH_TIME_BUDGET = 55
+# Idle polls a flush job waits for late reads before it exits.
+FLUSH_LINGER_POLLS = 8
+# Polls per window, bounding how late past its window a raddec is sent.
+POLLS_PER_WINDOW = 4
+MAX_POLL_INTERVAL = 0.25
+# Queued chunks (one per ingest request) taken per poll.
+FLUSH_CHUNK_SIZE = 500
+
+# (epc, reader, antenna port, rssi, read time in epoch milliseconds, item code)
+WindowRead = Tuple[str, Optional[str], Optional[int], Optional[float], int, Optional[str]]
+
+
+def get_raddec_window(settings: Optional[frappe._dict] = None) -> float:
+	"""Return the window in seconds, 0 when reads are sent one by one."""
+
+	return max(flt((settings or get_settings()).raddec_window), 0.0)
+
+
+def queue_raddec_reads(events: Iterable[Dict[str, Any]]) -> None:
+	"""Queue committed reads for windowed raddecs and make sure a flush job runs.
+
+	``events`` are single reads; rows of open aggregates already count reads
+	folded into them, so their ``read_count`` is not used.
+	"""
+
+	reads: List[WindowRead] = [
+		(
+			event["rfid"],
+			event.get("reader"),
+			event.get("antenna_port"),
+			event.get("rssi"),
+			epoch_ms(event["read_time"]),
+			event.get("item_code"),
+		)
+		for event in events
+	]
+	if not reads:
+		return
+
+	cache = frappe.cache()
+	pipe = cache.pipeline()
+	pipe.rpush(cache.make_key(REDIS_WINDOW_KEY), dumps(reads))
+	pipe.execute()
+	_enqueue_flush()
+
+
+def flush_raddec_window() -> int:
+	"""Combine queued reads and dispatch raddecs as their windows close;
+	returns how many were dispatched."""
+
+	window = get_raddec_window() or 1.0
+	interval = min(window / POLLS_PER_WINDOW, MAX_POLL_INTERVAL)
+	aggregator = RaddecAggregator(window)
+	cache = frappe.cache()
+	deadline = time.monotonic() + FLUSH_TIME_BUDGET
+	dispatched = 0
+	idle = 0
+	# Chunks taken whose reads are not all in committed raddecs yet.
+	held: List[bytes] = []
+
+	while time.monotonic() < deadline and idle < FLUSH_LINGER_POLLS:
+		chunks = take(cache, REDIS_WINDOW_KEY, FLUSH_CHUNK_SIZE)
+		held.extend(chunks)
+
+		now = time.time()
+		for chunk in chunks:
+			for epc, reader, antenna, rssi, read_ms, item_code in loads(chunk):
+				aggregator.add(
+					{
+						"rfid": epc,
+						"reader": reader,
+						"antenna_port": antenna,
+						"rssi": rssi,
+						"read_time": read_ms,
+						"item_code": item_code,
+					},
+					now,
+				)
+
+		dispatched += _dispatch(aggregator.flush(now))
+		if held and not len(aggregator):
+			_release(cache, held)
+			held = []
+		idle = 0 if chunks or len(aggregator) else idle + 1
+		time.sleep(interval)
+
+	dispatched += _dispatch(aggregator.flush())
+	_release(cache, held)
+	if _queued(cache):
+		_enqueue_flush()
+	return dispatched
+
+
+def sweep_raddec_window() -> None:
+	"""Scheduled: put back reads of flush jobs that died, then restart the
+	flush job when reads are still waiting."""
+
+	cache = frappe.cache()
+	recover(cache, REDIS_WINDOW_KEY)
+	if _queued(cache):
+		_enqueue_flush()
+
+
+def _queued(cache) -> int:
+	# Through a pipeline: the cache wrapper's llen would prefix the key again.
+	pipe = cache.pipeline()
+	pipe.llen(cache.make_key(REDIS_WINDOW_KEY))
+	return pipe.execute()[0]
+
+
+def _release(cache, chunks: List[bytes]) -> None:
+	if not chunks:
+		return
+
+	pipe = cache.pipeline()
+	ack(cache, pipe, REDIS_WINDOW_KEY, chunks)
+	pipe.execute()
+
+
+def _dispatch(raddecs: List[Tuple[Dict[str, Any], Dict[str, Any]]]) -> int:
+	if not raddecs:
+		return 0
+
+	dispatch_raddec_events((raddec, {**summary, "source": WINDOW_SOURCE}) for raddec, summary in raddecs)
+	# Commit the outbox rows so the delivery job can post them.
+	frappe.db.commit()
+	return len(raddecs)
+
+
+def _enqueue_flush() -> None:
+	enqueue_job("rfid.rfid.services.raddec_window.flush_raddec_window", "rfid_raddec_window_flush", "short")
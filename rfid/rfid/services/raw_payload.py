@@ -0,0 +1,155 @@
+"""Raw payload retention for RFID Tag Event.
+
+Per-event storage keeps the JSON of each read on its own row. Compressed batch
+storage keeps the request body once per ingest batch in an RFID Payload Batch
+row, compressed with zstd when ``zstandard`` is installed and gzip otherwise;
+each event points at it by batch name and the index of its read in the body.
+"""
+
+from __future__ import annotations
+
+import base64
+import gzip
+import json
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import frappe
+from frappe.utils import now_datetime
+
+try:
+	import zstandard
+except ImportError:  # pragma: no cover - optional speed-up
+	zstandard = None
+
+BATCH_DOCTYPE = "RFID Payload Batch"
+STORE_PER_EVENT = "Per Event"
+STORE_BATCH = "Compressed Batch"
+RETAIN_ALWAYS = "Always"
+RETAIN_ON_ERROR = "On Error"
+RETAIN_NEVER = "Never"
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+# Decoded batches kept per worker so reading several events of one batch
+# decompresses it once.
+BATCH_CACHE_SIZE = 16
+
+_batch_cache: "OrderedDict[Tuple[str, str], List[Any]]" = OrderedDict()
+
+
+def prepare_raw_refs(events: List[Dict[str, Any]], settings: frappe._dict) -> Optional[str]:
+	"""Attach raw payload values to ``events`` before they are inserted.
+
+	Returns the name reserved for the batch row when events reference one;
+	``save_raw_batch`` must then be called once the events are stored.
+	"""
+
+	if (settings.raw_payload_retention or RETAIN_ALWAYS) != RETAIN_ALWAYS:
+		return None
+
+	if settings.raw_payload_storage != STORE_BATCH:
+		for event in events:
+			event["raw_payload"] = frappe.as_json(event["_node"])
+		return None
+
+	batch_name = frappe.generate_hash(length=16)
+	for event in events:
+		event["raw_batch"] = batch_name
+		event["raw_index"] = event["_raw_index"]
+	return batch_name
+
+
+def save_raw_batch(
+	batch_name: Optional[str],
+	payload: Any,
+	raw_body: Optional[bytes],
+	source: str,
+	settings: frappe._dict,
+	stored: int,
+	failed: int,
+) -> Optional[str]:
+	"""Store the compressed body when the events reference it, or when reads
+	failed and retention is "On Error"."""
+
+	if batch_name:
+		if not stored:
+			return None
+	elif failed and settings.raw_payload_retention == RETAIN_ON_ERROR:
+		batch_name = frappe.generate_hash(length=16)
+	else:
+		return None
+
+	if raw_body is None:
+		raw_body = json.dumps(payload, separators=(",", ":"), default=str).encode("utf-8")
+
+	compression, data = compress(raw_body)
+	now = now_datetime()
+	user = frappe.session.user
+	frappe.db.bulk_insert(
+		BATCH_DOCTYPE,
+		[
+			"name", "owner", "creation", "modified", "modified_by", "docstatus", "idx",
+			"source", "compression", "read_count", "error_count", "raw_size", "stored_size", "payload",
+		],
+		[(batch_name, user, now, now, user, 0, 0, source, compression, stored, failed, len(raw_body), len(data), data)],
+	)
+	return batch_name
+
+
+def load_raw_node(event_name: str) -> Optional[Any]:
+	"""Return the raw read stored for one RFID Tag Event."""
+
+	from .ingest import TAG_EVENT_DOCTYPE
+
+	row = frappe.db.get_value(TAG_EVENT_DOCTYPE, event_name, ["raw_payload", "raw_batch", "raw_index"], as_dict=True)
+	if not row:
+		return None
+
+	if row.raw_payload:
+		return json.loads(row.raw_payload)
+
+	if row.raw_batch:
+		nodes = _load_batch_nodes(row.raw_batch)
+		if nodes is not None and 0 <= row.raw_index < len(nodes):
+			return nodes[row.raw_index]
+
+	return None
+
+
+def compress(body: bytes) -> Tuple[str, str]:
+	"""Return ``(codec, base64 text)`` for ``body``."""
+
+	if zstandard is not None:
+		return "zstd", base64.b64encode(zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)).decode()
+	return "gzip", base64.b64encode(gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)).decode()
+
+
+def decompress(codec: str, data: str) -> bytes:
+	raw = base64.b64decode(data)
+	if codec == "zstd":
+		if zstandard is None:
+			frappe.throw(frappe._("Install zstandard to read zstd-compressed RFID payloads."))
+		return zstandard.ZstdDecompressor().decompress(raw)
+	return gzip.decompress(raw)
+
+
+def _load_batch_nodes(batch_name: str) -> Optional[List[Any]]:
+	from .ingest import _iter_impinj_nodes
+	from .parser import loads
+
+	key = (frappe.local.site, batch_name)
+	nodes = _batch_cache.get(key)
+	if nodes is not None:
+		_batch_cache.move_to_end(key)
+		return nodes
+
+	row = frappe.db.get_value(BATCH_DOCTYPE, batch_name, ["compression", "payload"], as_dict=True)
+	if not row or not row.payload:
+		return None
+
+	# Indexes count reads in the order the ingest pipeline walked them.
+	nodes = list(_iter_impinj_nodes(loads(decompress(row.compression, row.payload))))
+	_batch_cache[key] = nodes
+	if len(_batch_cache) > BATCH_CACHE_SIZE:
+		_batch_cache.popitem(last=False)
+	return nodes
@@ -0,0 +1,156 @@
+"""Maintenance and lookups for the RFID Registry EPC index."""
+
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import frappe
+from frappe.utils import now_datetime
+
+REGISTRY_DOCTYPE = "RFID Registry"
+BACKFILL_CHUNK_SIZE = 5000
+
+# (doctype, EPC field) pairs whose values are indexed in the registry.
+EPC_SOURCES = (
+	("Serial No", "custom_barcode"),
+	("Asset", "custom_rfid"),
+	("Item", "custom_barcode"),
+)
+
+
+def lookup_epcs(epcs: Iterable[str]) -> Dict[str, Dict[str, str]]:
+	"""Resolve EPCs to ``{"doctype", "name", "item_code"}`` with one primary-key query."""
+
+	keys = list({epc.upper() for epc in epcs if epc})
+	if not keys:
+		return {}
+
+	rows = frappe.get_all(
+		REGISTRY_DOCTYPE,
+		filters={"name": ("in", keys)},
+		fields=["name", "reference_doctype", "reference_name", "item_code"],
+	)
+	return {
+		row.name: {"doctype": row.reference_doctype, "name": row.reference_name, "item_code": row.item_code}
+		for row in rows
+	}
+
+
+def get_epcs_for(doctype: str, names: Iterable[str]) -> Dict[str, Dict[str, str]]:
+	"""Return ``{name: {"epc", "item_code"}}`` for records of ``doctype`` present in the registry."""
+
+	names = list(names)
+	if not names:
+		return {}
+
+	rows = frappe.get_all(
+		REGISTRY_DOCTYPE,
+		filters={"reference_doctype": doctype, "reference_name": ("in", names)},
+		fields=["epc", "reference_name", "item_code"],
+	)
+	return {row.reference_name: {"epc": row.epc, "item_code": row.item_code} for row in rows}
+
+
+def sync_doc_epc(doc, fieldname: str) -> None:
+	"""Keep the registry in step with ``doc`` when its EPC field is set or changed in this save."""
+
+	if not doc.is_new() and not doc.has_value_changed(fieldname):
+		return
+
+	previous = doc.get_doc_before_save()
+	old_epc = previous.get(fieldname) if previous else None
+	new_epc = doc.get(fieldname)
+	item_code = doc.name if doc.doctype == "Item" else doc.get("item_code")
+
+	register_epcs(doc.doctype, [(doc.name, new_epc, item_code)], stale=[old_epc])
+
+
+def register_epcs(
+	doctype: str,
+	entries: List[Tuple[str, Optional[str], Optional[str]]],
+	stale: Optional[Iterable[Optional[str]]] = None,
+) -> None:
+	"""Point the EPC of each ``(name, epc, item_code)`` entry at its ``doctype`` record.
+
+	Any previous registry rows for the same records, the same EPCs, or listed in
+	``stale`` are removed first. Once the transaction commits, the shared
+	resolution cache is invalidated for every EPC touched and the new EPCs are
+	added to the foreign-tag filter.
+	"""
+
+	names = [name for name, _epc, _item_code in entries]
+	new_rows = [(name, epc, item_code) for name, epc, item_code in entries if epc]
+	touched = {epc.upper() for _name, epc, _item_code in new_rows}
+	touched.update(epc.upper() for epc in stale or () if epc)
+
+	if names:
+		touched.update(
+			frappe.get_all(
+				REGISTRY_DOCTYPE,
+				filters={"reference_doctype": doctype, "reference_name": ("in", names)},
+				pluck="name",
+			)
+		)
+
+	if touched:
+		frappe.db.delete(REGISTRY_DOCTYPE, {"name": ("in", list(touched))})
+
+	if new_rows:
+		now = now_datetime()
+		user = frappe.session.user
+		frappe.db.bulk_insert(
+			REGISTRY_DOCTYPE,
+			["name", "epc", "reference_doctype", "reference_name", "item_code", "owner", "creation", "modified", "modified_by"],
+			[(epc.upper(), epc, doctype, name, item_code, user, now, now, user) for name, epc, item_code in new_rows],
+			ignore_duplicates=True,
+		)
+
+	# Imported here because the resolver and filter themselves read through the registry.
+	from .bloom import add_epcs
+	from .resolver import invalidate_epcs
+
+	invalidate_epcs(touched)
+	# Added once committed, so a filter rebuild either reads the new rows or
+	# collects them for its swap.
+	new_epcs = [epc for _name, epc, _item_code in new_rows]
+	if new_epcs:
+		frappe.db.after_commit.add(lambda: add_epcs(new_epcs))
+
+
+def backfill_registry() -> Dict[str, int]:
+	"""Index every existing Serial No, Asset and Item EPC.
+
+	Run once after installing the registry:
+
+	    bench --site <site-name> execute rfid.rfid.services.registry.backfill_registry
+	"""
+
+	counts: Dict[str, int] = {}
+
+	for doctype, fieldname in EPC_SOURCES:
+		fields = ["name", fieldname] if doctype == "Item" else ["name", fieldname, "item_code"]
+		counts[doctype] = 0
+		start = 0
+
+		while True:
+			rows = frappe.get_all(
+				doctype,
+				filters={fieldname: ("is", "set")},
+				fields=fields,
+				order_by="name asc",
+				start=start,
+				page_length=BACKFILL_CHUNK_SIZE,
+			)
+			if not rows:
+				break
+
+			register_epcs(
+				doctype,
+				[(row.name, row.get(fieldname), row.get("item_code") or row.name) for row in rows],
+			)
+			frappe.db.commit()
+
+			counts[doctype] += len(rows)
+			start += BACKFILL_CHUNK_SIZE
+
+	return counts
@@ -0,0 +1,195 @@
+"""Shared EPC -> record resolution cache for tag ingest.
+
+EPCs are resolved through the RFID Registry and kept in a bounded per-process
+LRU in front of a Redis hash shared by every worker. Once a transaction that
+re-registers an EPC commits, its entry is dropped from Redis and a version
+counter bumped, which makes every process discard its local LRU on its next
+lookup. The hash expires a fixed time after it was created, however busy
+ingest is, so an entry cached from a lookup that raced an invalidation does not
+outlive it for long. EPCs the foreign-tag Bloom filter rules out never reach
+Redis or the registry.
+"""
+
+from __future__ import annotations
+
+import pickle
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+import frappe
+from frappe.utils import cint
+
+from rfid.rfid.doctype.rfid_settings.rfid_settings import get_settings
+
+from .bloom import record_false_positives, split_known
+from .registry import lookup_epcs
+
+REDIS_MAP_KEY = "rfid_epc_map"
+REDIS_VERSION_KEY = "rfid_epc_map_version"
+REDIS_HITS_KEY = "rfid_epc_cache_hits"
+REDIS_MISSES_KEY = "rfid_epc_cache_misses"
+# Seconds the shared hash lives after it was created.
+REDIS_MAP_TTL = 6 * 60 * 60
+DEFAULT_LOCAL_CACHE_SIZE = 10000
+
+
+class LRUCache:
+	"""Small bounded mapping that evicts the least recently used key."""
+
+	def __init__(self, maxsize: int):
+		self.maxsize = maxsize
+		self.version: Optional[int] = None
+		self._data: "OrderedDict[str, Any]" = OrderedDict()
+
+	def __len__(self) -> int:
+		return len(self._data)
+
+	def get(self, key: str) -> Optional[Any]:
+		value = self._data.get(key)
+		if value is not None:
+			self._data.move_to_end(key)
+		return value
+
+	def set(self, key: str, value: Any) -> None:
+		self._data[key] = value
+		self._data.move_to_end(key)
+		while len(self._data) > self.maxsize:
+			self._data.popitem(last=False)
+
+	def discard(self, key: str) -> None:
+		self._data.pop(key, None)
+
+	def clear(self) -> None:
+		self._data.clear()
+
+
+# One LRU per site, since a worker process may serve several sites.
+_local_caches: Dict[str, LRUCache] = {}
+_local_stats: Dict[str, Dict[str, int]] = {}
+
+
+def resolve_epcs(epcs: Iterable[str]) -> Dict[str, Dict[str, str]]:
+	"""Resolve EPCs to ``{"doctype", "name", "item_code"}`` via the LRU, Redis and finally the database."""
+
+	pending = {epc.upper() for epc in epcs if epc}
+	resolved: Dict[str, Dict[str, str]] = {}
+	if not pending:
+		return resolved
+
+	local = _get_local_cache()
+	for epc in list(pending):
+		info = local.get(epc)
+		if info is not None:
+			resolved[epc] = info
+			pending.discard(epc)
+
+	pending, _foreign = split_known(pending)
+
+	cache = frappe.cache()
+	if pending:
+		keys = list(pending)
+		for epc, raw in zip(keys, cache.hmget(cache.make_key(REDIS_MAP_KEY), keys)):
+			if raw is None:
+				continue
+			info = pickle.loads(raw)
+			resolved[epc] = info
+			local.set(epc, info)
+			pending.discard(epc)
+
+	hits = len(resolved)
+	misses = len(pending)
+
+	if pending:
+		fetched = lookup_epcs(pending)
+		if fetched:
+			key = cache.make_key(REDIS_MAP_KEY)
+			pipe = cache.pipeline()
+			pipe.hset(key, mapping={epc: pickle.dumps(info) for epc, info in fetched.items()})
+			# Only when the hash has no TTL yet, so constant fills cannot keep it alive.
+			pipe.expire(key, REDIS_MAP_TTL, nx=True)
+			pipe.execute()
+		for epc, info in fetched.items():
+			resolved[epc] = info
+			local.set(epc, info)
+		record_false_positives(len(pending) - len(fetched))
+
+	_record_stats(hits, misses)
+	return resolved
+
+
+def invalidate_epcs(epcs: Iterable[Optional[str]]) -> None:
+	"""Forget cached resolutions for the given EPCs in Redis and in every worker's LRU.
+
+	This runs after the current transaction commits: dropped earlier, a lookup
+	from another worker could cache the registry rows that are being replaced.
+	"""
+
+	keys = {epc.upper() for epc in epcs if epc}
+	if keys:
+		frappe.db.after_commit.add(lambda: _drop_cached(keys))
+
+
+def get_cache_stats() -> Dict[str, Any]:
+	"""Return hit/miss counters for this process and across all workers."""
+
+	cache = frappe.cache()
+	site = frappe.local.site
+	local = _local_caches.get(site)
+	local_stats = _local_stats.get(site, {"hits": 0, "misses": 0})
+	hits = cint(cache.get(cache.make_key(REDIS_HITS_KEY)))
+	misses = cint(cache.get(cache.make_key(REDIS_MISSES_KEY)))
+
+	return {
+		"hits": hits,
+		"misses": misses,
+		"hit_rate": round(hits / (hits + misses), 4) if hits + misses else None,
+		"shared_entries": cache.hlen(cache.make_key(REDIS_MAP_KEY)),
+		"local_entries": len(local) if local else 0,
+		"local_capacity": local.maxsize if local else None,
+		"local_hits": local_stats["hits"],
+		"local_misses": local_stats["misses"],
+	}
+
+
+def _get_local_cache() -> LRUCache:
+	site = frappe.local.site
+	maxsize = cint(get_settings().epc_cache_size) or DEFAULT_LOCAL_CACHE_SIZE
+
+	local = _local_caches.get(site)
+	if local is None or local.maxsize != maxsize:
+		local = _local_caches[site] = LRUCache(maxsize)
+
+	cache = frappe.cache()
+	version = cint(cache.get(cache.make_key(REDIS_VERSION_KEY)))
+	if local.version != version:
+		local.clear()
+		local.version = version
+
+	return local
+
+
+def _record_stats(hits: int, misses: int) -> None:
+	stats = _local_stats.setdefault(frappe.local.site, {"hits": 0, "misses": 0})
+	stats["hits"] += hits
+	stats["misses"] += misses
+
+	cache = frappe.cache()
+	pipe = cache.pipeline()
+	if hits:
+		pipe.incrby(cache.make_key(REDIS_HITS_KEY), hits)
+	if misses:
+		pipe.incrby(cache.make_key(REDIS_MISSES_KEY), misses)
+	pipe.execute()
+
+
+def _drop_cached(keys: Iterable[str]) -> None:
+	cache = frappe.cache()
+	pipe = cache.pipeline()
+	pipe.hdel(cache.make_key(REDIS_MAP_KEY), *keys)
+	pipe.incr(cache.make_key(REDIS_VERSION_KEY))
+	pipe.execute()
+
+	local = _local_caches.get(frappe.local.site)
+	if local:
+		for key in keys:
+			local.discard(key)
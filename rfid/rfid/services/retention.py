@@ -0,0 +1,262 @@
+"""Retention for RFID Tag Event.
+
+Every hour the reads of each completed hour are summarised per EPC, reader
+and antenna into RFID Tag Rollup. Once a day, events older than the hot window
+(RFID Settings → Hot Window) are exported to gzip-compressed NDJSON files under
+the site's private files and deleted, a bounded batch per transaction so
+ingest keeps writing while the table is trimmed. Events are only removed once
+their hour has been rolled up, and RFID Payload Batch rows age out with them.
+
+How far the rollup has got is kept in RFID Settings → Rolled Up Until, which
+also moves past hours without reads, so a quiet spell is skipped in one step
+instead of being scanned hour by hour on every run.
+"""
+
+from __future__ import annotations
+
+import gzip
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import frappe
+from frappe.query_builder import Case
+from frappe.query_builder.functions import Coalesce, Max, Min, Sum
+from frappe.utils import add_days, cint, get_datetime, now_datetime
+
+from rfid.rfid.doctype.rfid_settings.rfid_settings import SETTINGS_DOCTYPE, get_settings
+from rfid.rfid.doctype.rfid_tag_rollup.rfid_tag_rollup import make_rollup_name
+
+from .ingest import TAG_EVENT_DOCTYPE
+from .parser import dumps
+from .raw_payload import BATCH_DOCTYPE
+
+ROLLUP_DOCTYPE = "RFID Tag Rollup"
+# RFID Settings field holding the start of the first hour not rolled up yet.
+WATERMARK_FIELD = "rolled_up_until"
+ARCHIVE_FOLDER = "rfid_archive"
+ARCHIVE_FIELDS = (
+	"name",
+	"creation",
+	"rfid",
+	"serial_no",
+	"item_code",
+	"reader",
+	"antenna_port",
+	"read_time",
+	"rssi",
+	"first_seen",
+	"last_seen",
+	"read_count",
+	"peak_rssi",
+	"mean_rssi",
+	"raw_payload",
+	"raw_batch",
+	"raw_index",
+)
+DEFAULT_BATCH_SIZE = 5000
+# Hours already rolled up are summarised again for this long, picking up reads
+# that readers delivered late.
+ROLLUP_LOOKBACK_HOURS = 3
+# Hours summarised per run while catching up on an existing table.
+MAX_ROLLUP_HOURS = 168
+# Jobs hand over to the next run after this many seconds.
+TIME_BUDGET = 1200
+# Pause between delete batches so replicas and ingest keep up.
+BATCH_PAUSE = 0.2
+
+HOUR = timedelta(hours=1)
+
+
+def rollup_tag_events() -> Dict[str, int]:
+	"""Scheduled hourly: summarise every completed hour not rolled up yet."""
+
+	totals = {"hours": 0, "rollups": 0}
+	end = _hour_floor(now_datetime())
+	watermark = get_rollup_watermark()
+	if watermark:
+		hour = watermark - HOUR * ROLLUP_LOOKBACK_HOURS
+	else:
+		oldest = frappe.db.get_value(TAG_EVENT_DOCTYPE, {}, "min(read_time)")
+		if not oldest:
+			return totals
+		hour = watermark = _hour_floor(get_datetime(oldest))
+
+	deadline = time.monotonic() + TIME_BUDGET
+	while hour < end and totals["hours"] < MAX_ROLLUP_HOURS and time.monotonic() < deadline:
+		if hour >= watermark:
+			# Hours without reads have nothing to summarise; skip to the next one with some.
+			hour = _next_read_hour(hour, end)
+		if hour < end:
+			totals["rollups"] += rollup_hour(hour)
+			totals["hours"] += 1
+			hour += HOUR
+
+		watermark = max(watermark, hour)
+		frappe.db.set_single_value(SETTINGS_DOCTYPE, WATERMARK_FIELD, watermark, update_modified=False)
+		frappe.db.commit()
+
+	return totals
+
+
+def get_rollup_watermark() -> Optional[datetime]:
+	"""Return the start of the first hour that has not been rolled up yet."""
+
+	watermark = frappe.db.get_single_value(SETTINGS_DOCTYPE, WATERMARK_FIELD, cache=False)
+	if watermark:
+		return get_datetime(watermark)
+
+	# Sites that rolled up hours before the watermark was kept.
+	latest = frappe.db.get_value(ROLLUP_DOCTYPE, {}, "max(hour)")
+	return get_datetime(latest) + HOUR if latest else None
+
+
+def rollup_hour(hour: datetime) -> int:
+	"""Replace the rollups of the hour starting at ``hour``; returns how many were written."""
+
+	table = frappe.qb.DocType(TAG_EVENT_DOCTYPE)
+	# Aggregated rows stand for ``read_count`` reads; zero RSSI means none was reported.
+	reads = Case().when(table.read_count > 0, table.read_count).else_(1)
+	rssi = Case().when(table.mean_rssi != 0, table.mean_rssi).when(table.rssi != 0, table.rssi)
+	rows = (
+		frappe.qb.from_(table)
+		.select(
+			table.rfid,
+			table.reader,
+			table.antenna_port,
+			Max(table.item_code).as_("item_code"),
+			Sum(reads).as_("read_count"),
+			Min(Coalesce(table.first_seen, table.read_time)).as_("first_seen"),
+			Max(Coalesce(table.last_seen, table.read_time)).as_("last_seen"),
+			Max(Case().when(table.peak_rssi != 0, table.peak_rssi).when(table.rssi != 0, table.rssi)).as_("peak_rssi"),
+			Sum(rssi * reads).as_("rssi_total"),
+			Sum(Case().when(rssi.isnotnull(), reads).else_(0)).as_("rssi_reads"),
+		)
+		.where((table.read_time >= hour) & (table.read_time < hour + HOUR))
+		.groupby(table.rfid, table.reader, table.antenna_port)
+	).run(as_dict=True)
+
+	frappe.db.delete(ROLLUP_DOCTYPE, {"hour": hour})
+	if not rows:
+		return 0
+
+	now = now_datetime()
+	user = frappe.session.user
+	values = [
+		(
+			make_rollup_name(hour, row.rfid, row.reader, row.antenna_port),
+			user, now, now, user, 0, 0,
+			hour,
+			row.rfid,
+			row.reader,
+			row.antenna_port,
+			row.item_code,
+			cint(row.read_count),
+			row.first_seen,
+			row.last_seen,
+			row.peak_rssi,
+			round(row.rssi_total / row.rssi_reads, 2) if row.rssi_reads else None,
+		)
+		for row in rows
+	]
+	frappe.db.bulk_insert(
+		ROLLUP_DOCTYPE,
+		[
+			"name", "owner", "creation", "modified", "modified_by", "docstatus", "idx",
+			"hour", "rfid", "reader", "antenna_port", "item_code",
+			"read_count", "first_seen", "last_seen", "peak_rssi", "mean_rssi",
+		],
+		values,
+	)
+	return len(values)
+
+
+def archive_tag_events() -> Dict[str, int]:
+	"""Scheduled daily: export and delete events older than the hot window."""
+
+	settings = get_settings()
+	days = cint(settings.hot_window_days)
+	totals = {"events": 0, "files": 0, "payload_batches": 0}
+	if days <= 0:
+		return totals
+
+	# Only drop reads of hours that are rolled up and no longer re-rolled.
+	watermark = get_rollup_watermark()
+	if not watermark:
+		return totals
+	settled = watermark - HOUR * ROLLUP_LOOKBACK_HOURS
+	cutoff = min(get_datetime(add_days(now_datetime(), -days)), settled)
+
+	batch_size = max(1, cint(settings.retention_batch_size) or DEFAULT_BATCH_SIZE)
+	deadline = time.monotonic() + TIME_BUDGET
+	table = frappe.qb.DocType(TAG_EVENT_DOCTYPE)
+
+	while time.monotonic() < deadline:
+		# Oldest first along the (read_time, name) index; each batch is deleted
+		# before the next is read, so the query always starts at the front.
+		rows = (
+			frappe.qb.from_(table)
+			.select(*ARCHIVE_FIELDS)
+			.where(table.read_time < cutoff)
+			.orderby(table.read_time)
+			.orderby(table.name)
+			.limit(batch_size)
+		).run(as_dict=True)
+		if not rows:
+			break
+
+		if settings.archive_tag_events:
+			write_archive(rows)
+			totals["files"] += 1
+
+		frappe.db.delete(TAG_EVENT_DOCTYPE, {"name": ("in", [row.name for row in rows])})
+		frappe.db.commit()
+		totals["events"] += len(rows)
+		time.sleep(BATCH_PAUSE)
+
+	while time.monotonic() < deadline:
+		names = frappe.get_all(
+			BATCH_DOCTYPE, filters={"creation": ("<", cutoff)}, pluck="name", limit=batch_size, order_by="creation asc"
+		)
+		if not names:
+			break
+
+		frappe.db.delete(BATCH_DOCTYPE, {"name": ("in", names)})
+		frappe.db.commit()
+		totals["payload_batches"] += len(names)
+		time.sleep(BATCH_PAUSE)
+
+	return totals
+
+
+def write_archive(rows: List[Dict[str, Any]]) -> str:
+	"""Write ``rows`` as one gzip-compressed NDJSON file and return its path.
+
+	Files are grouped per day of the first read and named after the first row,
+	so a batch that is exported again after a failed delete overwrites its file.
+	"""
+
+	first = rows[0]
+	folder = frappe.get_site_path("private", "files", ARCHIVE_FOLDER, first.read_time.strftime("%Y-%m-%d"))
+	os.makedirs(folder, exist_ok=True)
+	path = os.path.join(folder, f"{first.read_time.strftime('%H%M%S%f')}-{first.name}.ndjson.gz")
+
+	partial = f"{path}.part"
+	with gzip.open(partial, "wb") as handle:
+		for row in rows:
+			handle.write(dumps(row))
+			handle.write(b"\n")
+	os.replace(partial, path)
+	return path
+
+
+def _next_read_hour(hour: datetime, end: datetime) -> datetime:
+	"""Return the first hour from ``hour`` on that has reads, or ``end`` if none does before it."""
+
+	first = frappe.db.get_value(TAG_EVENT_DOCTYPE, {"read_time": (">=", hour)}, "min(read_time)")
+	return min(_hour_floor(get_datetime(first)), end) if first else end
+
+
+def _hour_floor(value: datetime) -> datetime:
+	return value.replace(minute=0, second=0, microsecond=0)
@@ -0,0 +1,172 @@
+"""Long-running consumer for the Impinj IoT Device Interface event stream.
+
+Each enabled RFID Reader with "Consume Event Stream" set gets a thread holding
+a persistent connection to its newline-delimited JSON stream. Decoded events
+are queued and written by the main thread in micro-batches through the same
+pipeline as ``ingest_impinj_events``.
+
+Run it under supervisor next to the bench workers::
+
+    bench --site <site-name> rfid-stream
+"""
+
+from __future__ import annotations
+
+import queue
+import random
+import signal
+import threading
+from typing import Any, Dict, List, Optional
+
+import frappe
+import requests
+from frappe.utils import cint, flt
+
+from rfid.rfid.doctype.rfid_settings.rfid_settings import get_settings
+
+from .batching import MicroBatcher
+from .ingest import process_impinj_payload, unwrap_inventory_event
+from .parser import loads
+
+READER_DOCTYPE = "RFID Reader"
+STREAM_SOURCE = "impinj-stream"
+CONNECT_TIMEOUT = 10
+# The reader sends keep-alive newlines, so a silent connection is a dead one.
+READ_TIMEOUT = 60
+MIN_BACKOFF = 1.0
+MAX_BACKOFF = 60.0
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_FLUSH_INTERVAL = 1.0
+QUEUE_SIZE = 10000
+
+
+class StreamReader(threading.Thread):
+	"""Follow one reader's event stream, reconnecting with exponential backoff."""
+
+	def __init__(
+		self,
+		reader_name: str,
+		url: str,
+		sink: "queue.Queue[Dict[str, Any]]",
+		stop: threading.Event,
+		auth: Optional[tuple] = None,
+		verify: bool = True,
+		logger=None,
+	):
+		super().__init__(name=f"rfid-stream-{reader_name}", daemon=True)
+		self.reader_name = reader_name
+		self.url = url
+		self.sink = sink
+		self.stop = stop
+		self.auth = auth
+		self.verify = verify
+		self.logger = logger
+		self.session = requests.Session()
+
+	def run(self) -> None:
+		backoff = MIN_BACKOFF
+
+		while not self.stop.is_set():
+			try:
+				with self.session.get(
+					self.url,
+					stream=True,
+					auth=self.auth,
+					verify=self.verify,
+					timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+				) as response:
+					response.raise_for_status()
+					backoff = MIN_BACKOFF
+					self._consume(response)
+			except requests.RequestException as exc:
+				self._log("warning", f"RFID stream {self.reader_name} disconnected: {exc}")
+
+			if self.stop.wait(backoff * random.uniform(0.5, 1.0)):
+				break
+			backoff = min(backoff * 2, MAX_BACKOFF)
+
+		self.session.close()
+
+	def _consume(self, response: requests.Response) -> None:
+		for line in response.iter_lines():
+			if self.stop.is_set():
+				return
+			if not line:
+				continue
+
+			try:
+				event = loads(line)
+			except ValueError:
+				self._log("warning", f"RFID stream {self.reader_name} sent invalid JSON: {line[:200]!r}")
+				continue
+
+			if isinstance(event, dict):
+				self.sink.put(normalise_stream_event(event, self.reader_name))
+
+	def _log(self, level: str, message: str) -> None:
+		if self.logger:
+			getattr(self.logger, level)(message)
+
+
+def normalise_stream_event(event: Dict[str, Any], reader_name: str) -> Dict[str, Any]:
+	"""Flatten a stream event and fall back to ``reader_name`` for its reader."""
+
+	node = unwrap_inventory_event(event)
+	node.setdefault("reader", event.get("hostname") or reader_name)
+	return node
+
+
+def run_stream_consumers(reader_names: Optional[List[str]] = None) -> None:
+	"""Consume every enabled reader stream until SIGINT/SIGTERM.
+
+	Expects ``frappe`` to be initialised and connected for the target site.
+	"""
+
+	filters: Dict[str, Any] = {"enabled": 1, "stream_enabled": 1}
+	if reader_names:
+		filters["name"] = ("in", reader_names)
+
+	logger = frappe.logger("rfid")
+	readers = frappe.get_all(READER_DOCTYPE, filters=filters, pluck="name")
+	if not readers:
+		logger.warning("No RFID Reader is configured to consume its event stream.")
+		return
+
+	settings = get_settings()
+	sink: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=QUEUE_SIZE)
+	stop = threading.Event()
+
+	for signum in (signal.SIGINT, signal.SIGTERM):
+		signal.signal(signum, lambda *_args: stop.set())
+
+	for name in readers:
+		reader = frappe.get_doc(READER_DOCTYPE, name)
+		auth = None
+		if reader.username:
+			auth = (reader.username, reader.get_password("password", raise_exception=False) or "")
+
+		StreamReader(
+			reader.name,
+			reader.get_stream_url(),
+			sink,
+			stop,
+			auth=auth,
+			verify=bool(reader.verify_ssl),
+			logger=logger,
+		).start()
+
+	MicroBatcher(
+		sink,
+		_flush_events,
+		cint(settings.stream_batch_size) or DEFAULT_BATCH_SIZE,
+		flt(settings.stream_flush_interval) or DEFAULT_FLUSH_INTERVAL,
+	).run(stop)
+
+
+def _flush_events(batch: List[Dict[str, Any]]) -> None:
+	try:
+		process_impinj_payload(batch, source=STREAM_SOURCE)
+	except Exception:
+		frappe.db.rollback()
+		frappe.log_error(frappe.get_traceback(), "RFID stream ingest failure")
+		frappe.db.commit()
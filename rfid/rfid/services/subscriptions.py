@@ -0,0 +1,167 @@
+"""Subscription filters of RFID Webhook endpoints.
+
+An endpoint can narrow what it receives by reader, antenna, EPC pattern, item
+group and minimum RSSI; an empty filter lets everything through. The filters
+of all enabled endpoints are compiled into one ``SubscriptionIndex``: readers,
+antennas and item groups become hash maps from value to endpoint names, and
+EPC patterns a prefix trie. An event is looked up once per dimension and the
+candidate set narrowed by intersection, so only the endpoints that can still
+match are checked further.
+
+EPC patterns are hex, one per line or comma-separated. A pattern matches every
+EPC that starts with it; ``?`` or ``x`` stands for any one hex digit and a
+trailing ``*`` is ignored, e.g. ``3034`` or ``30??0123``.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Set
+
+from frappe.utils import cint, cstr, flt
+
+WILDCARD = "?"
+_SEPARATORS = re.compile(r"[\r\n,;]+")
+_PATTERN = re.compile(r"[0-9A-F?]+")
+
+
+class _TrieNode:
+	__slots__ = ("children", "hooks")
+
+	def __init__(self):
+		self.children: Dict[str, "_TrieNode"] = {}
+		self.hooks: Set[str] = set()
+
+
+class SubscriptionIndex:
+	"""Endpoints' subscription filters compiled for lookup by event."""
+
+	def __init__(self, hooks: Iterable[Dict[str, Any]], item_groups: Optional[Callable[[str], Iterable[str]]] = None):
+		"""``item_groups`` expands an item group to itself and its descendants."""
+
+		self.names: FrozenSet[str] = frozenset()
+		self.filtered = False
+		self._readers: Dict[str, Set[str]] = {}
+		self._antennas: Dict[int, Set[str]] = {}
+		self._groups: Dict[str, Set[str]] = {}
+		self._min_rssi: Dict[str, float] = {}
+		self._trie = _TrieNode()
+		self._any_reader: Set[str] = set()
+		self._any_antenna: Set[str] = set()
+		self._any_epc: Set[str] = set()
+		self._any_group: Set[str] = set()
+
+		names = set()
+		for hook in hooks:
+			name = hook["name"]
+			names.add(name)
+
+			readers = split_values(hook.get("filter_readers"))
+			_index(self._readers, self._any_reader, name, readers)
+
+			antennas = [cint(value) for value in split_values(hook.get("filter_antennas")) if cint(value)]
+			_index(self._antennas, self._any_antenna, name, antennas)
+
+			groups = split_values(hook.get("filter_item_groups"), lines_only=True)
+			if groups and item_groups:
+				groups = {expanded for group in groups for expanded in item_groups(group)}
+			_index(self._groups, self._any_group, name, groups)
+
+			patterns = [normalise_pattern(value) for value in split_values(hook.get("filter_epcs"))]
+			patterns = [pattern for pattern in patterns if pattern]
+			if patterns:
+				for pattern in patterns:
+					self._insert(pattern, name)
+			else:
+				self._any_epc.add(name)
+
+			if flt(hook.get("min_rssi")):
+				self._min_rssi[name] = flt(hook.get("min_rssi"))
+
+			if readers or antennas or groups or patterns or name in self._min_rssi:
+				self.filtered = True
+
+		self.names = frozenset(names)
+
+	def match(
+		self,
+		reader: Optional[str] = None,
+		antenna: Optional[int] = None,
+		epc: Optional[str] = None,
+		rssi: Optional[float] = None,
+		item_group: Optional[Callable[[], Optional[str]]] = None,
+	) -> Set[str]:
+		"""Return the names of the endpoints subscribed to an event.
+
+		``item_group`` is called only when a remaining endpoint filters on it.
+		"""
+
+		if not self.filtered:
+			return set(self.names)
+
+		candidates = self._any_reader | self._readers.get(cstr(reader), set())
+		if candidates and candidates - self._any_antenna:
+			candidates &= self._any_antenna | self._antennas.get(cint(antenna), set())
+		if candidates and candidates - self._any_epc:
+			candidates &= self._any_epc | self._match_epc(cstr(epc).strip().upper())
+		if candidates and candidates - self._any_group:
+			group = item_group() if item_group else None
+			candidates &= self._any_group | self._groups.get(cstr(group), set())
+		for name in [name for name in candidates if name in self._min_rssi]:
+			if rssi is None or rssi < self._min_rssi[name]:
+				candidates.discard(name)
+		return candidates
+
+	def _insert(self, pattern: str, name: str) -> None:
+		node = self._trie
+		for char in pattern:
+			node = node.children.setdefault(char, _TrieNode())
+		node.hooks.add(name)
+
+	def _match_epc(self, epc: str) -> Set[str]:
+		matched: Set[str] = set()
+		nodes = [self._trie]
+		for char in epc:
+			following = []
+			for node in nodes:
+				matched |= node.hooks
+				for key in (char, WILDCARD):
+					child = node.children.get(key)
+					if child is not None:
+						following.append(child)
+			if not following:
+				return matched
+			nodes = following
+		for node in nodes:
+			matched |= node.hooks
+		return matched
+
+
+def split_values(value: Any, lines_only: bool = False) -> List[str]:
+	"""Split a filter field into its values; item group names may contain spaces
+	and commas, so they are split by line only."""
+
+	if not value:
+		return []
+	parts = cstr(value).splitlines() if lines_only else _SEPARATORS.split(cstr(value))
+	return [part.strip() for part in parts if part.strip()]
+
+
+def normalise_pattern(value: str) -> str:
+	"""Return an EPC pattern in upper case with ``?`` wildcards and no trailing ``*``."""
+
+	pattern = value.strip().upper().rstrip("*")
+	return pattern.replace("X", WILDCARD)
+
+
+def is_valid_pattern(pattern: str) -> bool:
+	return bool(_PATTERN.fullmatch(pattern))
+
+
+def _index(index: Dict[Any, Set[str]], unfiltered: Set[str], name: str, values: Iterable[Any]) -> None:
+	values = list(values)
+	if not values:
+		unfiltered.add(name)
+		return
+	for value in values:
+		index.setdefault(value, set()).add(name)
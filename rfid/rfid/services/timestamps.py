@@ -0,0 +1,157 @@
+"""Timestamp normalisation for tag reads.
+
+Readers send ISO-8601 strings with ``Z`` or a UTC offset (the IoT Device
+Interface uses nanosecond fractions) or epoch values in seconds, milliseconds
+or microseconds, as numbers or digit strings. Every form is turned into the
+naive system-timezone datetime Frappe stores, in one pass and without
+exceptions on the common path. ``frappe.utils.get_datetime`` is only used for
+strings ``datetime.fromisoformat`` cannot read.
+"""
+
+from __future__ import annotations
+
+import re
+from datetime import datetime, timedelta, timezone, tzinfo
+from typing import Any, Dict, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+import frappe
+from frappe.utils import get_datetime, get_system_timezone
+
+# Epoch values below these bounds are seconds, milliseconds and microseconds;
+# anything larger is nanoseconds. The bounds sit in the year 5138.
+EPOCH_SECONDS_LIMIT = 1e11
+EPOCH_MILLIS_LIMIT = 1e14
+EPOCH_MICROS_LIMIT = 1e17
+OFFSET_CACHE_SIZE = 4096
+
+_EPOCH = datetime(1970, 1, 1)
+# fromisoformat before Python 3.11 rejects fractions beyond six digits.
+_LONG_FRACTION = re.compile(r"(\.\d{6})\d+")
+
+_zones: Dict[str, tzinfo] = {}
+# UTC offset of a zone per half hour of UTC time. Converting through
+# ``astimezone`` and stripping the tzinfo costs more than parsing the string.
+_zone_offsets: Dict[Tuple[tzinfo, int, int, int, int, bool], timedelta] = {}
+# "+05:00" style suffixes seen in ISO strings.
+_suffix_offsets: Dict[str, timedelta] = {}
+
+
+def system_zone() -> tzinfo:
+	"""Return the site's system timezone, cached per site."""
+
+	site = frappe.local.site
+	zone = _zones.get(site)
+	if zone is None:
+		zone = _zones[site] = ZoneInfo(get_system_timezone())
+	return zone
+
+
+def normalise_timestamp(value: Any, zone: Optional[tzinfo] = None) -> Optional[datetime]:
+	"""Return ``value`` as a naive datetime in ``zone`` (the system timezone by
+	default), or ``None`` when it is not a timestamp.
+
+	Naive ISO strings are taken to be in ``zone`` already; epoch values are UTC.
+	"""
+
+	if value is None or isinstance(value, bool):
+		return None
+
+	zone = zone or system_zone()
+
+	if isinstance(value, str):
+		text = value.strip()
+		if not text:
+			return None
+
+		if text[-1] == "Z":
+			utc = _parse_naive(text[:-1])
+			return _utc_to_zone(utc, zone) if utc else None
+
+		if len(text) > 16 and text[-3] == ":" and text[-6] in "+-":
+			local = _parse_naive(text[:-6])
+			offset = _suffix_offset(text[-6:])
+			if local and offset is not None:
+				return _utc_to_zone(local - offset, zone)
+
+		if text.isdigit():
+			return _from_epoch(int(text), zone)
+
+		parsed = _parse_naive(text)
+		if parsed is None:
+			try:
+				parsed = get_datetime(text)
+			except Exception:
+				return None
+	elif isinstance(value, (int, float)):
+		return _from_epoch(value, zone)
+	elif isinstance(value, datetime):
+		parsed = value
+	else:
+		return None
+
+	offset = parsed.utcoffset()
+	if offset is not None:
+		return _utc_to_zone(parsed.replace(tzinfo=None) - offset, zone)
+	return parsed
+
+
+def epoch_ms(value: datetime, zone: Optional[tzinfo] = None) -> int:
+	"""Return epoch milliseconds for a naive system-timezone datetime."""
+
+	if value.tzinfo is None:
+		value = value.replace(tzinfo=zone or system_zone())
+	return int(value.timestamp() * 1000)
+
+
+def _from_epoch(value: float, zone: tzinfo) -> Optional[datetime]:
+	magnitude = abs(value)
+	if magnitude < EPOCH_SECONDS_LIMIT:
+		micros = value * 1e6
+	elif magnitude < EPOCH_MILLIS_LIMIT:
+		micros = value * 1e3
+	elif magnitude < EPOCH_MICROS_LIMIT:
+		micros = value
+	else:
+		micros = value / 1e3
+
+	try:
+		return _utc_to_zone(_EPOCH + timedelta(0, 0, round(micros)), zone)
+	except OverflowError:
+		return None
+
+
+def _utc_to_zone(utc: datetime, zone: tzinfo) -> datetime:
+	key = (zone, utc.year, utc.month, utc.day, utc.hour, utc.minute >= 30)
+	offset = _zone_offsets.get(key)
+	if offset is None:
+		if len(_zone_offsets) >= OFFSET_CACHE_SIZE:
+			_zone_offsets.clear()
+		bucket = datetime(utc.year, utc.month, utc.day, utc.hour, 30 if key[-1] else 0, tzinfo=timezone.utc)
+		offset = _zone_offsets[key] = bucket.astimezone(zone).utcoffset()
+	return utc + offset
+
+
+def _suffix_offset(suffix: str) -> Optional[timedelta]:
+	offset = _suffix_offsets.get(suffix)
+	if offset is None:
+		hours, minutes = suffix[1:3], suffix[4:6]
+		if not (hours.isdigit() and minutes.isdigit()):
+			return None
+		offset = timedelta(hours=int(hours), minutes=int(minutes))
+		if suffix[0] == "-":
+			offset = -offset
+		_suffix_offsets[suffix] = offset
+	return offset
+
+
+def _parse_naive(text: str) -> Optional[datetime]:
+	try:
+		return datetime.fromisoformat(text)
+	except ValueError:
+		pass
+
+	try:
+		return datetime.fromisoformat(_LONG_FRACTION.sub(r"\1", text))
+	except ValueError:
+		return None
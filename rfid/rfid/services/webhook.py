@@ -1,72 +1,587 @@
-"""Webhook dispatch helpers for RFID raddec events."""
+"""Webhook dispatch helpers for RFID raddec events.
+
+Every request to an endpoint is first written to RFID Webhook Delivery, the
+outbox, and a single delivery job posts what is due. Endpoints set to "Per
+Event" delivery get one row per event, inserted in the transaction that
+produced the event. Endpoints set to "Batched" collect events in a Redis list
+of their own, pushed once that transaction commits; the delivery job cuts a
+batch into one row once an endpoint has ``batch_size`` events waiting or its
+oldest has waited ``batch_linger`` seconds. The batch stays on a processing
+list (see ``processing``) until its row is committed, so a batch taken by a
+job that dies is put back by the sweep and may go out twice.
+
+Rows of different endpoints go out concurrently, each endpoint over its own
+keep-alive ``requests.Session`` kept for the life of the worker. A failed row
+is retried with exponential backoff and dead-lettered after the last attempt;
+dead rows can be replayed in bulk. Each endpoint has a circuit breaker: after
+a run of failures its rows are held, without spending attempts, until a
+cooldown has passed and one trial request succeeds.
+
+Each endpoint picks the encoding and compression of its bodies (see
+``encodings``). An event is encoded once per encoding among the endpoints it
+goes to, and the signature covers the bytes as sent.
+
+Enabled endpoints (with decrypted secrets) and their compiled subscription
+filters are cached per worker and reloaded when an RFID Webhook is saved or
+deleted; each event is queued only for the endpoints subscribed to it.
+"""
 
 from __future__ import annotations
 
 import hashlib
 import hmac
-import json
-from typing import Any, Dict
+import pickle
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 import frappe
 import requests
+from frappe.utils import add_days, cint, flt, now_datetime
+from frappe.utils.nestedset import get_descendants_of
+from frappe.utils.password import get_decrypted_password
+from requests.adapters import HTTPAdapter
+
+from rfid.rfid.doctype.rfid_settings.rfid_settings import get_settings
+
+from .encodings import BATCH_EVENT, JSON, NO_COMPRESSION, EncodedBody, encode_body, load_body
+from .jobs import enqueue_job
+from .parser import dumps
+from .processing import ack, heartbeat_key, processing_key, recover, take
+from .subscriptions import SubscriptionIndex
 
 DEFAULT_TIMEOUT = 10
+RADDEC_EVENT = "rfid.raddec"
 EVENT_HEADER = "X-RFID-Event"
 SIGNATURE_HEADER = "X-RFID-Signature"
+WEBHOOK_DOCTYPE = "RFID Webhook"
+DELIVERY_DOCTYPE = "RFID Webhook Delivery"
+DELIVERY_BATCHED = "Batched"
+PENDING = "Pending"
+RETRYING = "Retrying"
+DELIVERED = "Delivered"
+DEAD = "Dead"
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_BATCH_LINGER = 1.0
+DEFAULT_CONCURRENCY = 4
+DEFAULT_MAX_ATTEMPTS = 8
+DEFAULT_RETRY_DELAY = 10.0
+MAX_RETRY_DELAY = 3600.0
+DEFAULT_BREAKER_THRESHOLD = 5
+DEFAULT_BREAKER_COOLDOWN = 60.0
+REDIS_QUEUE_PREFIX = "rfid_webhook_queue"
+REDIS_BREAKER_PREFIX = "rfid_webhook_breaker"
+REDIS_VERSION_KEY = "rfid_webhook_version"
+# Rows posted per endpoint in one round of the delivery job.
+DELIVERY_CHUNK_SIZE = 100
+# A delivery job hands over to the next one after this many seconds.
+DELIVERY_TIME_BUDGET = 240
+# Idle polls a delivery job waits for new events before it exits.
+DELIVERY_LINGER_POLLS = 20
+POLL_INTERVAL = 0.05
+# Seconds between outbox queries while no new rows are written.
+OUTBOX_POLL_INTERVAL = 1.0
+UPDATE_BATCH_SIZE = 5000
+
+DELIVERY_FIELDS = [
+	"name", "owner", "creation", "modified", "modified_by", "docstatus", "idx",
+	"webhook", "event", "status", "event_count", "content_type", "content_encoding", "attempts", "next_attempt", "payload",
+]
+
+# (row name, response code, error, attempted at in epoch seconds)
+Attempt = Tuple[str, Optional[int], Optional[str], float]
+
+# Enabled endpoints and their subscriptions per site, with the webhook version
+# they were loaded at.
+_webhooks: Dict[str, Tuple[Optional[bytes], List[frappe._dict], SubscriptionIndex]] = {}
+# One keep-alive session per endpoint URL and worker.
+_sessions: Dict[str, requests.Session] = {}
+
+
+def dispatch_raddec_event(raddec: Dict[str, Any], metadata: Dict[str, Any], event: str = RADDEC_EVENT) -> None:
+	"""Queue webhook delivery of the given raddec payload.
+
+	``event`` names the payload for receivers, e.g. ``rfid.presence.enter``
+	for presence transitions.
+	"""
+
+	dispatch_raddec_events([(raddec, metadata)], event)
 
 
-def dispatch_raddec_event(raddec: Dict[str, Any], metadata: Dict[str, Any]) -> None:
-	"""Enqueue asynchronous webhook delivery for the given raddec payload."""
+def dispatch_raddec_events(items: Iterable[Tuple[Dict[str, Any], Dict[str, Any]]], event: str = RADDEC_EVENT) -> None:
+	"""Hand ``(raddec, metadata)`` pairs to the enabled endpoints subscribed to them."""
 
-	if not raddec:
+	items = [(raddec, metadata) for raddec, metadata in items if raddec]
+	if not items:
 		return
 
-	frappe.enqueue(
-		"rfid.rfid.services.webhook._dispatch_async",
-		raddec=raddec,
-		metadata=metadata,
-		queue="short",
-		job_description=f"Dispatch RFID raddec {metadata.get('docname', '')}",
-	)
+	hooks = get_webhooks()
+	if not hooks:
+		return
+
+	by_name = {hook.name: hook for hook in hooks}
+	subscriptions = get_subscriptions()
+	rows: List[Tuple[str, str, int, EncodedBody]] = []
+	queued: Dict[str, List[bytes]] = {}
+	for raddec, metadata in items:
+		names = subscriptions.match(**_subject(raddec, metadata))
+		if not names:
+			continue
+
+		body = dumps({"event": event, "data": raddec, "meta": metadata})
+		encoded: Dict[Tuple[str, str], EncodedBody] = {}
+		for name in names:
+			hook = by_name[name]
+			if hook.delivery_mode == DELIVERY_BATCHED:
+				queued.setdefault(name, []).append(body)
+				continue
+			key = (hook.encoding, hook.compression)
+			if key not in encoded:
+				encoded[key] = encode_body([body], *key)
+			rows.append((name, event, 1, encoded[key]))
+
+	if rows:
+		_insert_deliveries(rows)
+		# The rows become visible to the delivery job with the caller's commit.
+		_enqueue_delivery(after_commit=True)
+
+	if queued:
+		now = time.time()
+
+		def push() -> None:
+			cache = frappe.cache()
+			pipe = cache.pipeline()
+			for name, bodies in queued.items():
+				# Each queued item is ``(queued at, encoded {"event", "data", "meta"})``.
+				pipe.rpush(_queue_key(cache, name), *(pickle.dumps((now, body)) for body in bodies))
+			pipe.execute()
+			_enqueue_delivery()
+
+		# Like the outbox rows, the events only exist once the caller commits.
+		frappe.db.after_commit.add(push)
+
+
+def get_webhooks() -> List[frappe._dict]:
+	"""Return enabled endpoints, cached per worker until an RFID Webhook changes."""
+
+	return _load_webhooks()[1]
+
 
+def get_subscriptions() -> SubscriptionIndex:
+	"""Return the compiled subscription filters of the enabled endpoints."""
 
-def _dispatch_async(raddec: Dict[str, Any], metadata: Dict[str, Any]) -> None:
-	webhooks = frappe.get_all(
-		"RFID Webhook",
-		filters={"enabled": 1},
-		fields=["name", "webhook_url", "secret", "timeout"],
+	return _load_webhooks()[2]
+
+
+def _load_webhooks() -> Tuple[Optional[bytes], List[frappe._dict], SubscriptionIndex]:
+	cache = frappe.cache()
+	version = cache.get(cache.make_key(REDIS_VERSION_KEY))
+	cached = _webhooks.get(frappe.local.site)
+	if cached and cached[0] == version:
+		return cached
+
+	hooks = frappe.get_all(
+		WEBHOOK_DOCTYPE,
+		filters={"enabled": 1, "webhook_url": ("is", "set")},
+		fields=[
+			"name", "webhook_url", "timeout", "delivery_mode", "batch_size", "batch_linger", "encoding", "compression",
+			"filter_readers", "filter_antennas", "filter_epcs", "filter_item_groups", "min_rssi",
+		],
 	)
+	for hook in hooks:
+		hook.secret = get_decrypted_password(WEBHOOK_DOCTYPE, hook.name, "secret", raise_exception=False)
+		hook.timeout = cint(hook.timeout) or DEFAULT_TIMEOUT
+		hook.encoding = hook.encoding or JSON
+		hook.compression = hook.compression or NO_COMPRESSION
+		hook.batch_size = max(1, cint(hook.batch_size) or DEFAULT_BATCH_SIZE)
+		hook.batch_linger = flt(hook.batch_linger) if hook.batch_linger is not None else DEFAULT_BATCH_LINGER
 
-	if not webhooks:
-		return
+	_webhooks[frappe.local.site] = (version, hooks, SubscriptionIndex(hooks, _item_group_tree))
+	return _webhooks[frappe.local.site]
+
+
+def invalidate_webhooks(drop_queue: Optional[str] = None) -> None:
+	"""Make every worker reload its endpoints on next use, dropping the events
+	and breaker state kept for endpoint ``drop_queue``."""
+
+	cache = frappe.cache()
+	if drop_queue:
+		name = _queue_name(drop_queue)
+		cache.delete(
+			cache.make_key(name), processing_key(cache, name), heartbeat_key(cache, name), _breaker_key(cache, drop_queue)
+		)
+	cache.incr(cache.make_key(REDIS_VERSION_KEY))
+
+
+def deliver_webhooks() -> Dict[str, int]:
+	"""Cut due batches into the outbox and post due rows until nothing is left."""
+
+	cache = frappe.cache()
+	settings = get_settings()
+	concurrency = max(1, cint(settings.webhook_concurrency) or DEFAULT_CONCURRENCY)
+	deadline = time.monotonic() + DELIVERY_TIME_BUDGET
+	totals = {"delivered": 0, "failed": 0, "dead": 0}
+	last_poll = 0.0
+	idle = 0
+
+	with ThreadPoolExecutor(max_workers=concurrency) as pool:
+		while time.monotonic() < deadline and idle < DELIVERY_LINGER_POLLS:
+			hooks = get_webhooks()
+			ready, waiting = _ready_batches(cache, [hook for hook in hooks if hook.delivery_mode == DELIVERY_BATCHED])
+			if ready:
+				rows = []
+				for hook, taken in ready:
+					batch = [pickle.loads(raw)[1] for raw in taken]
+					rows.append((hook.name, BATCH_EVENT, len(batch), encode_body(batch, hook.encoding, hook.compression, batch=True)))
+				_insert_deliveries(rows)
+				frappe.db.commit()
+
+				pipe = cache.pipeline()
+				for hook, taken in ready:
+					ack(cache, pipe, _queue_name(hook.name), taken)
+				pipe.execute()
+
+			due = []
+			if ready or time.monotonic() - last_poll >= OUTBOX_POLL_INTERVAL:
+				due = _due_deliveries(cache, hooks)
+				last_poll = time.monotonic()
+			if not due:
+				idle = 0 if waiting else idle + 1
+				time.sleep(POLL_INTERVAL)
+				continue
+
+			idle = 0
+			futures = [(hook, rows, pool.submit(_post_rows, hook, rows)) for hook, rows in due]
+			for hook, rows, future in futures:
+				for outcome, count in _record_attempts(cache, settings, hook, rows, future.result()).items():
+					totals[outcome] += count
+			frappe.db.commit()
+
+	if _has_pending(cache):
+		_enqueue_delivery()
+
+	return totals
+
+
+def sweep_deliveries() -> None:
+	"""Scheduled: put back batches of jobs that died, then restart delivery when
+	events wait or retries have fallen due."""
+
+	cache = frappe.cache()
+	for hook in get_webhooks():
+		if hook.delivery_mode == DELIVERY_BATCHED:
+			recover(cache, _queue_name(hook.name))
+
+	if _has_pending(cache):
+		_enqueue_delivery()
+
+
+def replay_deliveries(names: Optional[List[str]] = None, webhook: Optional[str] = None) -> int:
+	"""Queue dead-lettered rows (all, those of ``webhook`` or ``names``) for
+	delivery again with fresh attempts; returns how many were queued."""
+
+	filters = {"status": DEAD}
+	if names is not None:
+		filters["name"] = ("in", names or [""])
+	if webhook:
+		filters["webhook"] = webhook
+
+	rows = frappe.get_all(DELIVERY_DOCTYPE, filters=filters, pluck="name")
+	if not rows:
+		return 0
+
+	table = frappe.qb.DocType(DELIVERY_DOCTYPE)
+	now = now_datetime()
+	for start in range(0, len(rows), UPDATE_BATCH_SIZE):
+		(
+			frappe.qb.update(table)
+			.set(table.status, PENDING)
+			.set(table.attempts, 0)
+			.set(table.next_attempt, now)
+			.set(table.modified, now)
+			.where(table.name.isin(rows[start : start + UPDATE_BATCH_SIZE]))
+		).run()
+	_enqueue_delivery(after_commit=True)
+	return len(rows)
 
-	payload = {
-		"event": "rfid.raddec",
-		"data": raddec,
-		"meta": metadata,
+
+def purge_deliveries() -> int:
+	"""Scheduled daily: delete delivered rows older than the configured days."""
+
+	days = cint(get_settings().webhook_log_days)
+	if days <= 0:
+		return 0
+
+	cutoff = add_days(now_datetime(), -days)
+	deleted = 0
+	while True:
+		names = frappe.get_all(
+			DELIVERY_DOCTYPE,
+			filters={"status": DELIVERED, "creation": ("<", cutoff)},
+			pluck="name",
+			limit=UPDATE_BATCH_SIZE,
+		)
+		if not names:
+			return deleted
+		frappe.db.delete(DELIVERY_DOCTYPE, {"name": ("in", names)})
+		frappe.db.commit()
+		deleted += len(names)
+
+
+def retry_delay(attempts: int, base: float = DEFAULT_RETRY_DELAY) -> float:
+	"""Seconds to wait after the ``attempts``-th failed attempt, with ±20% jitter."""
+
+	delay = min(base * 2 ** max(attempts - 1, 0), MAX_RETRY_DELAY)
+	return delay * random.uniform(0.8, 1.2)
+
+
+def _subject(raddec: Dict[str, Any], metadata: Dict[str, Any]) -> Dict[str, Any]:
+	"""Return the values subscriptions filter an event on."""
+
+	signature = (raddec.get("rssiSignature") or [{}])[0]
+	rssi = metadata.get("rssi", signature.get("rssi"))
+	item_code = metadata.get("item_code")
+	return {
+		"reader": metadata.get("reader"),
+		"antenna": metadata.get("antenna_port") or signature.get("receiverAntenna"),
+		"epc": metadata.get("rfid") or raddec.get("transmitterId"),
+		"rssi": flt(rssi) if rssi else None,
+		"item_group": lambda: frappe.get_cached_value("Item", item_code, "item_group") if item_code else None,
 	}
 
-	for hook in webhooks:
-		url = hook.get("webhook_url")
-		if not url:
+
+def _item_group_tree(group: str) -> List[str]:
+	return [group, *get_descendants_of("Item Group", group, ignore_permissions=True)]
+
+
+def _insert_deliveries(rows: List[Tuple[str, str, int, EncodedBody]]) -> None:
+	now = now_datetime()
+	user = frappe.session.user
+	frappe.db.bulk_insert(
+		DELIVERY_DOCTYPE,
+		DELIVERY_FIELDS,
+		[
+			(
+				frappe.generate_hash(length=16), user, now, now, user, 0, 0,
+				webhook, event, PENDING, count, content_type, content_encoding, 0, now, payload,
+			)
+			for webhook, event, count, (payload, content_type, content_encoding) in rows
+		],
+	)
+
+
+def _due_deliveries(cache, hooks: List[frappe._dict]) -> List[Tuple[frappe._dict, List[frappe._dict]]]:
+	"""Return the rows due now of every endpoint whose breaker lets requests through."""
+
+	now = now_datetime()
+	due = []
+	for hook in hooks:
+		opened_until = _breaker_open_until(cache, hook.name)
+		if opened_until is not None and opened_until > time.time():
+			continue
+		rows = frappe.get_all(
+			DELIVERY_DOCTYPE,
+			filters={"webhook": hook.name, "status": ("in", [PENDING, RETRYING]), "next_attempt": ("<=", now)},
+			fields=["name", "event", "attempts", "content_type", "content_encoding", "payload"],
+			order_by="next_attempt asc, creation asc",
+			# A half-open breaker lets a single trial request through.
+			limit=1 if opened_until is not None else DELIVERY_CHUNK_SIZE,
+		)
+		if rows:
+			due.append((hook, rows))
+	return due
+
+
+def _post_rows(hook: frappe._dict, rows: List[frappe._dict]) -> List[Attempt]:
+	"""Post rows in order, stopping at the first failure so a down endpoint
+	costs one timeout per round. Runs in delivery threads."""
+
+	attempts = []
+	for row in rows:
+		body = load_body(row.payload, row.content_type, row.content_encoding)
+		code, error = _post(hook, body, row.event, row.content_type, row.content_encoding)
+		# Epoch time: now_datetime reads the site's time zone from frappe.local.
+		attempts.append((row.name, code, error, time.time()))
+		if error:
+			break
+	return attempts
+
+
+def _record_attempts(
+	cache, settings: frappe._dict, hook: frappe._dict, rows: List[frappe._dict], attempts: List[Attempt]
+) -> Dict[str, int]:
+	by_name = {row.name: row for row in rows}
+	counts = {"delivered": 0, "failed": 0, "dead": 0}
+	now_ts, now = time.time(), now_datetime()
+
+	delivered: Dict[Optional[int], List[str]] = {}
+	for name, code, error, attempted_ts in attempts:
+		if not error:
+			delivered.setdefault(code, []).append(name)
+			continue
+
+		attempted = now - timedelta(seconds=now_ts - attempted_ts)
+		attempt = cint(by_name[name].attempts) + 1
+		dead = attempt >= (cint(settings.webhook_max_attempts) or DEFAULT_MAX_ATTEMPTS)
+		delay = retry_delay(attempt, flt(settings.webhook_retry_delay) or DEFAULT_RETRY_DELAY)
+		frappe.db.set_value(
+			DELIVERY_DOCTYPE,
+			name,
+			{
+				"status": DEAD if dead else RETRYING,
+				"attempts": attempt,
+				"last_attempt": attempted,
+				"next_attempt": None if dead else attempted + timedelta(seconds=delay),
+				"response_code": code,
+				"last_error": error,
+			},
+			update_modified=False,
+		)
+		counts["dead" if dead else "failed"] += 1
+		_breaker_failure(cache, settings, hook.name)
+
+	table = frappe.qb.DocType(DELIVERY_DOCTYPE)
+	for code, names in delivered.items():
+		(
+			frappe.qb.update(table)
+			.set(table.status, DELIVERED)
+			.set(table.attempts, table.attempts + 1)
+			.set(table.last_attempt, now)
+			.set(table.delivered_at, now)
+			.set(table.next_attempt, None)
+			.set(table.response_code, code)
+			.set(table.last_error, None)
+			.where(table.name.isin(names))
+		).run()
+		counts["delivered"] += len(names)
+	if delivered:
+		cache.delete(_breaker_key(cache, hook.name))
+
+	return counts
+
+
+def _breaker_open_until(cache, hook_name: str) -> Optional[float]:
+	# Breaker hashes are read and written through pipelines: the cache wrapper's
+	# hget and hset would prefix the key again and pickle the values.
+	pipe = cache.pipeline()
+	pipe.hget(_breaker_key(cache, hook_name), "open_until")
+	value = pipe.execute()[0]
+	return flt(value) if value else None
+
+
+def _breaker_failure(cache, settings: frappe._dict, hook_name: str) -> None:
+	# Failures only reset on success, so a failed trial request reopens at once.
+	key = _breaker_key(cache, hook_name)
+	pipe = cache.pipeline()
+	pipe.hincrby(key, "failures", 1)
+	failures = pipe.execute()[0]
+	if failures >= (cint(settings.webhook_breaker_threshold) or DEFAULT_BREAKER_THRESHOLD):
+		cooldown = flt(settings.webhook_breaker_cooldown) or DEFAULT_BREAKER_COOLDOWN
+		pipe.hset(key, "open_until", time.time() + cooldown)
+		pipe.execute()
+
+
+def _has_pending(cache) -> bool:
+	batched = [hook for hook in get_webhooks() if hook.delivery_mode == DELIVERY_BATCHED]
+	if batched:
+		pipe = cache.pipeline()
+		for hook in batched:
+			pipe.llen(_queue_key(cache, hook.name))
+		if any(pipe.execute()):
+			return True
+	return bool(
+		frappe.db.exists(DELIVERY_DOCTYPE, {"status": ("in", [PENDING, RETRYING]), "next_attempt": ("<=", now_datetime())})
+	)
+
+
+def _ready_batches(cache, hooks: List[frappe._dict]) -> Tuple[List[Tuple[frappe._dict, List[bytes]]], bool]:
+	"""Take a batch of raw queued items onto the processing list of every
+	endpoint that is full or has lingered long enough; also report whether any
+	endpoint still has events waiting."""
+
+	if not hooks:
+		return [], False
+
+	pipe = cache.pipeline()
+	for hook in hooks:
+		key = _queue_key(cache, hook.name)
+		pipe.llen(key)
+		pipe.lindex(key, 0)
+	results = pipe.execute()
+
+	now = time.time()
+	due = []
+	waiting = False
+	for index, hook in enumerate(hooks):
+		depth, head = results[2 * index], results[2 * index + 1]
+		if not depth:
 			continue
+		waiting = True
+		if depth >= hook.batch_size or now - pickle.loads(head)[0] >= hook.batch_linger:
+			due.append(hook)
+
+	ready = []
+	for hook in due:
+		taken = take(cache, _queue_name(hook.name), hook.batch_size)
+		if taken:
+			ready.append((hook, taken))
+	return ready, waiting
+
+
+def _post(
+	hook: frappe._dict,
+	body: bytes,
+	event: str,
+	content_type: Optional[str] = None,
+	content_encoding: Optional[str] = None,
+) -> Tuple[Optional[int], Optional[str]]:
+	"""POST ``body`` to the endpoint; returns the response code and, on failure,
+	an error description.
+
+	Runs in delivery threads, so it must not touch ``frappe.local``.
+	"""
+
+	headers = {"Content-Type": content_type or "application/json", EVENT_HEADER: event}
+	if content_encoding:
+		headers["Content-Encoding"] = content_encoding
+	if hook.secret:
+		headers[SIGNATURE_HEADER] = hmac.new(hook.secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+
+	code = None
+	try:
+		response = _session(hook.webhook_url).post(hook.webhook_url, data=body, headers=headers, timeout=hook.timeout)
+		code = response.status_code
+		response.raise_for_status()
+	except Exception as exc:
+		return code, f"{hook.webhook_url}: {exc!r}"
+	return code, None
+
+
+def _session(url: str) -> requests.Session:
+	session = _sessions.get(url)
+	if session is None:
+		session = requests.Session()
+		# Each endpoint is posted to by one thread at a time.
+		adapter = HTTPAdapter(pool_connections=1, pool_maxsize=2)
+		session.mount("http://", adapter)
+		session.mount("https://", adapter)
+		_sessions[url] = session
+	return session
+
+
+def _queue_name(hook_name: str) -> str:
+	return f"{REDIS_QUEUE_PREFIX}|{hook_name}"
+
 
-		headers = {
-			"Content-Type": "application/json",
-			EVENT_HEADER: "rfid.raddec",
-		}
+def _queue_key(cache, hook_name: str) -> str:
+	return cache.make_key(_queue_name(hook_name))
 
-		secret = hook.get("secret")
-		encoded_payload = json.dumps(payload, default=str).encode("utf-8")
 
-		if secret:
-			signature = hmac.new(secret.encode("utf-8"), encoded_payload, hashlib.sha256).hexdigest()
-			headers[SIGNATURE_HEADER] = signature
+def _breaker_key(cache, hook_name: str) -> str:
+	return cache.make_key(f"{REDIS_BREAKER_PREFIX}|{hook_name}")
 
-		timeout = hook.get("timeout") or DEFAULT_TIMEOUT
 
-		try:
-			requests.post(url, data=encoded_payload, headers=headers, timeout=timeout)
-		except Exception:
-			title = f"RFID Webhook failed: {hook.get('name')}"
-			frappe.log_error(frappe.get_traceback(), title)
+def _enqueue_delivery(after_commit: bool = False) -> None:
+	enqueue_job("rfid.rfid.services.webhook.deliver_webhooks", "rfid_webhook_delivery", "long", after_commit=after_commit)
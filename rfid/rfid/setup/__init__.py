@@ -6,7 +6,6 @@ import json
 from typing import Dict
 
 import frappe
-from frappe.utils import add_days, today
 
 OPERATIONS_SHORTCUTS = [
     {
@@ -47,6 +46,13 @@ INTEGRATION_SHORTCUTS = [
         "icon": "octicon octicon-pulse",
         "color": "#6c5ce7",
     },
+    {
+        "label": "RFID Live Monitor",
+        "link_to": "rfid-live-monitor",
+        "type": "Page",
+        "icon": "octicon octicon-broadcast",
+        "color": "#e84393",
+    },
     {
         "label": "RFID Webhook",
         "link_to": "RFID Webhook",
@@ -130,7 +136,7 @@ def deploy_workspace() -> None:
             {
                 "id": f"shortcut_integration_{idx}",
                 "type": "shortcut",
-                "data": {"shortcut_name": cfg["label"], "col": 6},
+                "data": {"shortcut_name": cfg["label"], "col": 4},
             }
         )
 
@@ -140,54 +146,58 @@ def deploy_workspace() -> None:
 
 
 def _build_number_cards() -> list[Dict[str, object]]:
-    today_str = today()
-    week_ago = add_days(today_str, -7)
+    # Values come from precomputed counters (rfid.rfid.services.counters), so
+    # cards cost no COUNT queries and their day windows roll over by themselves.
     return [
         {
             "name": "RFID Pending Queue",
             "label": "Pending Queue",
-            "doctype": "RFID Print Queue",
-            "aggregate_function": "Count",
-            "filters": [["RFID Print Queue", "status", "=", "Pending"]],
+            "method": "rfid.rfid.api.get_pending_print_count",
             "color": "#5E64FF",
             "icon": "octicon octicon-radio-tower",
         },
         {
             "name": "RFIDs Created Today",
             "label": "RFIDs Created Today",
-            "doctype": "Serial No",
-            "aggregate_function": "Count",
-            "filters": [["Serial No", "creation", ">=", today_str]],
+            "method": "rfid.rfid.api.get_serials_created_today",
             "color": "#29CD42",
             "icon": "octicon octicon-number",
         },
         {
             "name": "RFID Assets Tagged",
             "label": "RFID Assets Tagged",
-            "doctype": "Asset",
-            "aggregate_function": "Count",
-            "filters": [["Asset", "custom_rfid", "is", "set"]],
+            "method": "rfid.rfid.api.get_tagged_asset_count",
             "color": "#ffa00a",
             "icon": "octicon octicon-device-desktop",
         },
         {
             "name": "RFID Stock Entries 7d",
             "label": "RFID Stock Entries 7d",
-            "doctype": "Stock Entry",
-            "aggregate_function": "Count",
-            "filters": [["Stock Entry", "creation", ">=", week_ago]],
+            "method": "rfid.rfid.api.get_stock_entries_7d",
             "color": "#ff5858",
             "icon": "octicon octicon-package",
         },
         {
             "name": "RFID Printed Today",
             "label": "RFID Printed Today",
-            "doctype": "RFID Print Queue",
-            "aggregate_function": "Count",
-            "filters": [["RFID Print Queue", "status", "=", "Completed"], ["RFID Print Queue", "modified", ">=", today_str]],
+            "method": "rfid.rfid.api.get_printed_today",
             "color": "#7575ff",
             "icon": "octicon octicon-check",
         },
+        {
+            "name": "RFID Reads Last Hour",
+            "label": "Tag Reads (last hour)",
+            "method": "rfid.rfid.api.get_tag_reads_last_hour",
+            "color": "#6c5ce7",
+            "icon": "octicon octicon-pulse",
+        },
+        {
+            "name": "RFID Unique Tags Today",
+            "label": "Unique Tags Today",
+            "method": "rfid.rfid.api.get_unique_tags_today",
+            "color": "#00cec9",
+            "icon": "octicon octicon-tag",
+        },
     ]
 
 
@@ -201,23 +211,23 @@ def _ensure_number_card(cfg: Dict[str, object]) -> str:
                 "doctype": "Number Card",
                 "name": name,
                 "label": cfg["label"],
-                "document_type": cfg["doctype"],
-                "function": cfg["aggregate_function"],
-                "filters_json": json.dumps(cfg["filters"]),
+                "method": cfg["method"],
                 "color": cfg.get("color"),
                 "icon": cfg.get("icon"),
-                "type": "Document Type",
+                "type": "Custom",
             }
         )
         card.insert(ignore_permissions=True)
 
     card.label = cfg["label"]
-    card.document_type = cfg["doctype"]
-    card.function = cfg["aggregate_function"]
-    card.filters_json = json.dumps(cfg["filters"])
+    # Cards deployed by earlier versions counted documents directly.
+    card.document_type = None
+    card.function = None
+    card.filters_json = "[]"
+    card.method = cfg["method"]
     card.color = cfg.get("color")
     card.icon = cfg.get("icon")
-    card.type = "Document Type"
+    card.type = "Custom"
     card.save(ignore_permissions=True)
 
     if card.name != name:
@@ -0,0 +1,84 @@
+# Copyright (c) 2025, RFID and Contributors
+# See license.txt
+
+"""Micro-benchmark of the fast-path parser against the generic extractors.
+
+    bench --site <site-name> execute rfid.tests.benchmark_parser.run
+
+Only read extraction, including timestamp parsing, is timed; event naming,
+raddec and JSON encoding of the raw payload are the same on both paths.
+"""
+
+import json
+import timeit
+
+from frappe.utils import get_datetime
+
+from rfid.rfid.services import parser
+from rfid.rfid.services.ingest import (
+	_extract_epc,
+	_extract_reader,
+	_extract_rssi,
+	_extract_timestamp,
+	_iter_impinj_nodes,
+	_node_body,
+)
+
+READS_PER_PAYLOAD = 200
+ROUNDS = 50
+
+
+def _envelope_payload():
+	return [
+		{
+			"timestamp": f"2025-11-20T12:00:{index % 60:02d}.{index:06d}Z",
+			"hostname": "impinj-14-1a-2b",
+			"eventType": "tagInventory",
+			"tagInventoryEvent": {
+				"epc": "4gAAAAAAAAAAAAAB",
+				"epcHex": f"E2000000000000000000{index:04X}",
+				"antennaPort": index % 4 + 1,
+				"peakRssiCdbm": -5400 - index,
+			},
+		}
+		for index in range(READS_PER_PAYLOAD)
+	]
+
+
+def _generic(payload):
+	reads = []
+	for node in _iter_impinj_nodes(payload):
+		body = _node_body(node)
+		reads.append(
+			(node, _extract_epc(body), _extract_timestamp(node, body), _extract_rssi(body), body.get("antennaPort"), _extract_reader(node, body))
+		)
+	return reads
+
+
+def _fast(payload):
+	return [
+		(node, epc, get_datetime(timestamp), rssi, antenna, reader)
+		for node, epc, timestamp, rssi, antenna, reader in parser.parse_reads(payload, "benchmark")
+	]
+
+
+def _time(func, *args):
+	return min(timeit.repeat(lambda: func(*args), number=ROUNDS, repeat=5)) / (ROUNDS * READS_PER_PAYLOAD) * 1e6
+
+
+def run():
+	payload = _envelope_payload()
+	body = json.dumps(payload).encode()
+	_fast(payload)
+
+	results = {
+		"generic extractors (us/read)": _time(_generic, payload),
+		"fast path (us/read)": _time(_fast, payload),
+		"json.loads (us/read)": _time(json.loads, body),
+	}
+	if parser.orjson is not None:
+		results["orjson.loads (us/read)"] = _time(parser.orjson.loads, body)
+
+	for label, value in results.items():
+		print(f"{label:<32}{value:8.3f}")
+	return results
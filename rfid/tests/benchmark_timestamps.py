@@ -0,0 +1,59 @@
+# Copyright (c) 2025, RFID and Contributors
+# See license.txt
+
+"""Benchmark of the tag-read timestamp normaliser against ``get_datetime``.
+
+    bench --site <site-name> execute rfid.tests.benchmark_timestamps.run
+
+``get_datetime`` cannot read epoch values, so it is timed on the ISO share of
+the sample only.
+"""
+
+import time
+
+from frappe.utils import get_datetime
+
+from rfid.rfid.services.timestamps import normalise_timestamp, system_zone
+
+READS = 1_000_000
+
+
+def _sample(reads):
+	base_us = 1763640000000000
+	values = []
+	for index in range(reads):
+		us = base_us + index * 997
+		kind = index % 4
+		if kind == 0:
+			values.append(time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(us // 1000000)) + f".{us % 1000000:06d}000Z")
+		elif kind == 1:
+			values.append(time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(us // 1000000)) + f".{us % 1000000 // 1000:03d}+00:00")
+		elif kind == 2:
+			values.append(us // 1000)
+		else:
+			values.append(us)
+	return values
+
+
+def _time(func, values):
+	start = time.perf_counter()
+	for value in values:
+		func(value)
+	return time.perf_counter() - start
+
+
+def run(reads=READS):
+	reads = int(reads)
+	values = _sample(reads)
+	iso_values = [value for value in values if isinstance(value, str)]
+	zone = system_zone()
+
+	results = {
+		f"get_datetime, {len(iso_values)} ISO reads (s)": _time(get_datetime, iso_values),
+		f"normalise_timestamp, {len(iso_values)} ISO reads (s)": _time(lambda value: normalise_timestamp(value, zone), iso_values),
+		f"normalise_timestamp, {reads} mixed reads (s)": _time(lambda value: normalise_timestamp(value, zone), values),
+	}
+
+	for label, value in results.items():
+		print(f"{label:<48}{value:8.3f}")
+	return results
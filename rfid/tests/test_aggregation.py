@@ -0,0 +1,63 @@
+# Copyright (c) 2025, RFID and Contributors
+# See license.txt
+
+from datetime import datetime, timedelta
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from rfid.rfid.services.aggregation import _lock_key, _redis_key, aggregate_events, save_open_states
+
+BASE = datetime(2025, 1, 1, 12, 0, 0)
+KEY = ("E200AGG", "dock", "1")
+
+
+def read(name, seconds, rssi=-60.0):
+	return {
+		"name": name,
+		"rfid": "E200AGG",
+		"reader": "dock",
+		"antenna_port": 1,
+		"read_time": BASE + timedelta(seconds=seconds),
+		"rssi": rssi,
+	}
+
+
+class TestAggregateEvents(FrappeTestCase):
+	def setUp(self):
+		cache = frappe.cache()
+		cache.delete(_redis_key(cache, KEY), _lock_key(cache, KEY))
+
+	def tearDown(self):
+		self.setUp()
+
+	def test_folds_late_reads_and_skips_counted_ones(self):
+		new_events, _updates, open_states, folded = aggregate_events([read("agg-1", 2), read("agg-2", 4)], 5.0)
+		self.assertEqual([event["name"] for event in new_events], ["agg-1"])
+		self.assertEqual(folded, 1)
+
+		save_open_states(open_states, ["agg-1"], 5.0)
+		frappe.db.after_commit.run()
+
+		# A read older than the last one, plus the last one sent again.
+		late, resent = read("agg-0", 1, -40.0), read("agg-2", 4)
+		new_events, updates, _open_states, folded = aggregate_events([late, resent], 5.0)
+
+		self.assertEqual((new_events, folded), ([], 2))
+		self.assertEqual((late.get("_resent"), resent.get("_resent")), (None, True))
+		self.assertEqual(updates["agg-1"]["read_count"], 3)
+		self.assertEqual(updates["agg-1"]["first_seen"], BASE + timedelta(seconds=1))
+		self.assertEqual(updates["agg-1"]["last_seen"], BASE + timedelta(seconds=4))
+		self.assertEqual(updates["agg-1"]["peak_rssi"], -40.0)
+
+	def test_holds_aggregates_until_commit(self):
+		_new_events, _updates, open_states, _folded = aggregate_events([read("agg-1", 2)], 5.0)
+		cache = frappe.cache()
+
+		save_open_states(open_states, ["agg-1"], 5.0)
+		self.assertIsNone(cache.get(_redis_key(cache, KEY)))
+		self.assertIsNotNone(cache.get(_lock_key(cache, KEY)))
+
+		frappe.db.after_commit.run()
+		self.assertIsNotNone(cache.get(_redis_key(cache, KEY)))
+		self.assertIsNone(cache.get(_lock_key(cache, KEY)))
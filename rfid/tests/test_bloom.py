@@ -0,0 +1,46 @@
+# Copyright (c) 2025, RFID and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from rfid.rfid.services.bloom import (
+	REDIS_BITS_KEY,
+	REDIS_META_KEY,
+	REDIS_PENDING_KEY,
+	REDIS_REBUILDING_KEY,
+	_get_local_filter,
+	add_epcs,
+	get_filter_stats,
+	rebuild_filter,
+)
+
+
+class TestBloomFilter(FrappeTestCase):
+	def setUp(self):
+		cache = frappe.cache()
+		cache.delete(*(cache.make_key(key) for key in (REDIS_BITS_KEY, REDIS_META_KEY, REDIS_PENDING_KEY, REDIS_REBUILDING_KEY)))
+
+	def test_added_epcs_reach_the_shared_filter(self):
+		count = rebuild_filter()["count"]
+		epc = "E2" + frappe.generate_hash(length=22).upper()
+		self.assertNotIn(epc, _get_local_filter())
+
+		add_epcs([epc.lower(), None])
+
+		self.assertIn(epc, _get_local_filter())
+		self.assertEqual(get_filter_stats()["count"], count + 1)
+
+	def test_rebuild_keeps_epcs_added_while_it_runs(self):
+		rebuild_filter()
+		cache = frappe.cache()
+		# As if a rebuild were reading the registry.
+		cache.set(cache.make_key(REDIS_REBUILDING_KEY), 1)
+		epc = "E2" + frappe.generate_hash(length=22).upper()
+
+		add_epcs([epc])
+		rebuild_filter()
+
+		self.assertIn(epc, _get_local_filter())
+		self.assertEqual(cache.scard(cache.make_key(REDIS_PENDING_KEY)), 0)
+		self.assertIsNone(cache.get(cache.make_key(REDIS_REBUILDING_KEY)))
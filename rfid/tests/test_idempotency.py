@@ -0,0 +1,33 @@
+# Copyright (c) 2025, RFID and Contributors
+# See license.txt
+
+import json
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from rfid.rfid.services.idempotency import get_request_key
+
+STAMPED = {"timestamp": "2025-11-20T12:00:00Z", "tagInventoryEvent": {"epcHex": "E200000000000000000000AA"}}
+UNSTAMPED = {"tagInventoryEvent": {"epcHex": "E200000000000000000000AA"}}
+
+
+@patch("rfid.rfid.services.idempotency.get_settings", return_value=frappe._dict(idempotency_ttl=60))
+@patch("frappe.get_request_header", return_value=None)
+class TestRequestKey(FrappeTestCase):
+	def test_hashes_bodies_whose_reads_are_all_timestamped(self, _header, _settings):
+		body = json.dumps([STAMPED]).encode()
+
+		self.assertIsNotNone(get_request_key(body))
+		self.assertEqual(get_request_key(body), get_request_key(body, json.loads(body)))
+
+	def test_does_not_replay_bodies_that_can_repeat(self, _header, _settings):
+		for payload in ([STAMPED, UNSTAMPED], [{"eventType": "keepalive", "timestamp": "2025-11-20T12:00:00Z"}]):
+			with self.subTest(payload=payload):
+				self.assertIsNone(get_request_key(json.dumps(payload).encode()))
+
+	def test_uses_the_header_whatever_the_body(self, header, _settings):
+		header.return_value = "retry-1"
+
+		self.assertIsNotNone(get_request_key(json.dumps([UNSTAMPED]).encode()))
@@ -0,0 +1,76 @@
+# Copyright (c) 2025, RFID and Contributors
+# See license.txt
+
+import json
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from rfid.rfid.services.ingest_queue import (
+	REDIS_INTAKE_KEY,
+	_known_partitions,
+	_partition_name,
+	drain_partition,
+	enqueue_payload,
+	get_queue_stats,
+	split_intake,
+	sweep_queues,
+)
+from rfid.rfid.services.processing import heartbeat_key, processing_key, take
+
+
+class TestIngestQueue(FrappeTestCase):
+	def setUp(self):
+		self.epc = "E2" + frappe.generate_hash(length=22).upper()
+
+	def tearDown(self):
+		frappe.db.delete("RFID Tag Event", {"rfid": self.epc})
+		frappe.db.commit()
+
+	def body(self):
+		return json.dumps(
+			[
+				{
+					"timestamp": "2025-11-20T12:00:00.000000Z",
+					"hostname": "impinj-14-1a-2b",
+					"eventType": "tagInventory",
+					"tagInventoryEvent": {"epcHex": self.epc, "antennaPort": 1},
+				}
+			]
+		).encode()
+
+	def assert_drained(self):
+		for partition in _known_partitions(frappe.cache()):
+			drain_partition(partition)
+
+		cache = frappe.cache()
+		pipe = cache.pipeline()
+		for name in [REDIS_INTAKE_KEY, *(_partition_name(partition) for partition in _known_partitions(cache))]:
+			pipe.llen(processing_key(cache, name))
+		self.assertFalse(any(pipe.execute()))
+		self.assertEqual(get_queue_stats()["depth"], 0)
+		self.assertTrue(frappe.db.exists("RFID Tag Event", {"rfid": self.epc}))
+
+	@patch("frappe.enqueue")
+	def test_payload_taken_by_a_killed_job_is_put_back(self, _enqueue):
+		enqueue_payload(self.body())
+		cache = frappe.cache()
+		# A split job took the payload and died before handing it on.
+		self.assertTrue(take(cache, REDIS_INTAKE_KEY, 1000))
+		sweep_queues()
+		self.assertEqual(get_queue_stats()["intake"]["depth"], 0)
+
+		cache.delete(heartbeat_key(cache, REDIS_INTAKE_KEY))
+		sweep_queues()
+		self.assertGreaterEqual(get_queue_stats()["intake"]["depth"], 1)
+
+		split_intake()
+		self.assert_drained()
+
+	@patch("frappe.enqueue")
+	def test_enqueued_payload_is_split_and_drained(self, _enqueue):
+		self.assertGreaterEqual(enqueue_payload(self.body())["intake_depth"], 1)
+		self.assertGreaterEqual(split_intake()["reads"], 1)
+		self.assertEqual(get_queue_stats()["intake"]["depth"], 0)
+		self.assert_drained()
@@ -0,0 +1,43 @@
+# Copyright (c) 2025, RFID and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from rq.job import JobStatus
+
+from rfid.rfid.services.jobs import NEXT_RUN_SUFFIX, enqueue_job
+
+METHOD = "rfid.rfid.services.live.flush_live_frames"
+
+
+@patch("frappe.enqueue")
+@patch("rfid.rfid.services.jobs.get_job_status")
+class TestEnqueueJob(FrappeTestCase):
+	def enqueued(self, enqueue):
+		return [call.kwargs["job_id"] for call in enqueue.call_args_list]
+
+	def test_queues_a_run_behind_a_running_one(self, status, enqueue):
+		status.side_effect = lambda job_id: {"flush": JobStatus.STARTED}.get(job_id)
+
+		enqueue_job(METHOD, "flush", "long")
+
+		self.assertEqual(self.enqueued(enqueue), ["flush" + NEXT_RUN_SUFFIX])
+		self.assertEqual(enqueue.call_args.kwargs["lock"], "flush")
+
+	def test_skips_when_a_run_is_waiting(self, status, enqueue):
+		for statuses in ({"flush": JobStatus.QUEUED}, {"flush": JobStatus.STARTED, "flush" + NEXT_RUN_SUFFIX: JobStatus.QUEUED}):
+			with self.subTest(statuses=statuses):
+				status.side_effect = statuses.get
+				enqueue_job(METHOD, "flush", "long")
+				self.assertEqual(self.enqueued(enqueue), [])
+
+	def test_waits_for_the_commit(self, status, enqueue):
+		status.return_value = None
+
+		enqueue_job(METHOD, "flush", "long", after_commit=True)
+		self.assertEqual(self.enqueued(enqueue), [])
+
+		frappe.db.after_commit.run()
+		self.assertEqual(self.enqueued(enqueue), ["flush"])
@@ -0,0 +1,85 @@
+# Copyright (c) 2025, RFID and Contributors
+# See license.txt
+
+from datetime import datetime
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from rfid.rfid.services.live import (
+	LIVE_EVENT,
+	REDIS_LIVE_GATE_PREFIX,
+	REDIS_LIVE_READERS_KEY,
+	_list_key,
+	build_frame,
+	flush_live_frames,
+	publish_live_reads,
+)
+from rfid.rfid.services.parser import dumps
+
+
+class TestBuildFrame(FrappeTestCase):
+	def test_folds_reads_per_tag_and_antenna(self):
+		chunks = [
+			dumps([["E200A", 1, -50.0, 1000], ["E200B", 1, -61.5, 1010], ["E200A", 1, None, 1020]]),
+			dumps([["E200A", 2, -70.0, 1030], ["E200A", 1, -48.0, 1005]]),
+		]
+
+		frame = build_frame("dock-1", chunks, 10)
+
+		self.assertEqual(frame["reader"], "dock-1")
+		self.assertEqual(frame["reads"], 5)
+		self.assertEqual(frame["dropped"], 0)
+		# Most recently seen tags come last.
+		self.assertEqual([(tag["epc"], tag["antenna"]) for tag in frame["tags"]], [("E200B", 1), ("E200A", 2), ("E200A", 1)])
+
+		tag = frame["tags"][-1]
+		self.assertEqual(tag["count"], 3)
+		self.assertEqual((tag["first"], tag["last"]), (1000, 1020))
+		# The newest read had no RSSI; the latest known one is kept.
+		self.assertEqual(tag["rssi"], -50.0)
+
+	def test_keeps_most_recent_tags(self):
+		chunk = dumps([[f"E2{index:04X}", 1, None, index] for index in range(5)])
+
+		frame = build_frame("dock-1", [chunk], 2)
+
+		self.assertEqual(frame["dropped"], 3)
+		self.assertEqual([tag["epc"] for tag in frame["tags"]], ["E20003", "E20004"])
+
+
+@patch("frappe.enqueue")
+@patch("rfid.rfid.services.live.get_settings", return_value=frappe._dict(live_frame_rate=20, live_frame_size=10))
+class TestLiveFlush(FrappeTestCase):
+	reader = "test-live-dock"
+
+	def setUp(self):
+		cache = frappe.cache()
+		cache.delete(_list_key(cache, self.reader), cache.make_key(f"{REDIS_LIVE_GATE_PREFIX}|{self.reader}"))
+
+	def tearDown(self):
+		self.setUp()
+
+	@patch("frappe.publish_realtime")
+	def test_flush_publishes_reads_queued_while_the_window_was_closed(self, publish_realtime, _settings, enqueue):
+		cache = frappe.cache()
+		# Another request just published this reader's frame.
+		cache.set(cache.make_key(f"{REDIS_LIVE_GATE_PREFIX}|{self.reader}"), 1, px=50)
+
+		publish_live_reads([{"rfid": "E200LIVE", "reader": self.reader, "antenna_port": 1, "rssi": -55.0, "read_time": datetime.now()}])
+		publish_realtime.assert_not_called()
+		enqueue.assert_called()
+
+		flush_live_frames()
+
+		(event, frame), _kwargs = publish_realtime.call_args
+		self.assertEqual(event, LIVE_EVENT)
+		self.assertEqual((frame["reader"], frame["reads"]), (self.reader, 1))
+		self.assertEqual(frame["tags"][0]["epc"], "E200LIVE")
+		pipe = cache.pipeline()
+		pipe.llen(_list_key(cache, self.reader))
+		pipe.sismember(cache.make_key(REDIS_LIVE_READERS_KEY), self.reader)
+		depth, member = pipe.execute()
+		self.assertEqual(depth, 0)
+		self.assertFalse(member)
@@ -0,0 +1,114 @@
+# Copyright (c) 2025, RFID and Contributors
+# See license.txt
+
+import json
+import os
+import socket
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+import frappe
+import paho.mqtt.client as mqtt
+from frappe.tests.utils import FrappeTestCase
+
+from rfid.rfid.services.mqtt import MQTTIngestor
+
+BROKER_HOST = os.environ.get("RFID_TEST_MQTT_HOST", "127.0.0.1")
+BROKER_PORT = int(os.environ.get("RFID_TEST_MQTT_PORT", 1883))
+TEST_EPC = "E200000000000000000000AA"
+
+
+def _broker_available() -> bool:
+	try:
+		socket.create_connection((BROKER_HOST, BROKER_PORT), timeout=1).close()
+		return True
+	except OSError:
+		return False
+
+
+def _settings(**overrides):
+	return frappe._dict(
+		{
+			"mqtt_host": BROKER_HOST,
+			"mqtt_port": BROKER_PORT,
+			"mqtt_qos": "1",
+			"mqtt_client_id": "rfid-test-ingestor",
+			"stream_batch_size": 50,
+			"stream_flush_interval": 0.2,
+			**overrides,
+		}
+	)
+
+
+class TestMQTTIngestor(FrappeTestCase):
+	def test_decode_maps_topic_to_reader(self):
+		ingestor = MQTTIngestor(_settings(), [("impinj/dock-door-1/#", "dock-door-1")])
+		message = mqtt.MQTTMessage(topic=b"impinj/dock-door-1/events")
+		message.payload = json.dumps(
+			{"timestamp": "2025-11-20T12:00:00Z", "tagInventoryEvent": {"epcHex": TEST_EPC, "antennaPort": 2}}
+		).encode()
+
+		(event,) = ingestor._decode(message)
+		self.assertEqual(event["epc"], TEST_EPC)
+		self.assertEqual(event["reader"], "dock-door-1")
+		self.assertIsNone(ingestor.reader_for("other/topic"))
+
+	@patch("rfid.rfid.services.mqtt.time.sleep")
+	@patch("frappe.log_error")
+	def test_sets_aside_a_message_that_keeps_failing(self, log_error, _sleep):
+		ingestor = MQTTIngestor(_settings(), [("impinj/#", "dock-door-1")])
+		ingestor.client = MagicMock()
+		messages = []
+		for mid, epc in enumerate([TEST_EPC, "BAD"], start=1):
+			message = mqtt.MQTTMessage(mid=mid, topic=b"impinj/dock-door-1/events")
+			message.qos = 1
+			message.payload = json.dumps({"tagInventoryEvent": {"epcHex": epc}}).encode()
+			messages.append(message)
+
+		def process(events, source):
+			if any(event["epc"] == "BAD" for event in events):
+				raise ValueError("bad read")
+
+		with patch("rfid.rfid.services.mqtt.process_impinj_payload", side_effect=process) as process_payload:
+			ingestor.flush(messages)
+
+		# Three attempts at the batch, then one per message.
+		self.assertEqual(process_payload.call_count, 5)
+		self.assertEqual(log_error.call_args.args[1], "RFID MQTT message dropped")
+		self.assertEqual([call.args for call in ingestor.client.ack.call_args_list], [(1, 1), (2, 1)])
+		ingestor.client.reconnect.assert_not_called()
+
+	@unittest.skipUnless(_broker_available(), "no MQTT broker (e.g. mosquitto) on RFID_TEST_MQTT_HOST")
+	def test_ingests_from_local_broker(self):
+		topic = "rfid-test/dock-door-1/events"
+		ingestor = MQTTIngestor(_settings(), [(topic, "dock-door-1")])
+		stop = threading.Event()
+
+		flush = ingestor.flush
+
+		def flush_and_stop(messages):
+			flush(messages)
+			stop.set()
+
+		ingestor.flush = flush_and_stop
+		threading.Thread(target=self._publish, args=(topic,), daemon=True).start()
+		threading.Timer(15, stop.set).start()
+		# Flushes need the site's DB connection, so the ingestor runs on this thread.
+		ingestor.run(stop)
+
+		self.assertTrue(frappe.db.exists("RFID Tag Event", {"rfid": TEST_EPC}))
+
+	def _publish(self, topic):
+		publisher = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+		publisher.connect(BROKER_HOST, BROKER_PORT)
+		publisher.loop_start()
+		time.sleep(1)
+		publisher.publish(
+			topic,
+			json.dumps({"timestamp": "2025-11-20T12:00:00Z", "tagInventoryEvent": {"epcHex": TEST_EPC}}),
+			qos=1,
+		).wait_for_publish(timeout=5)
+		publisher.loop_stop()
+		publisher.disconnect()
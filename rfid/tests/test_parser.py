@@ -0,0 +1,61 @@
+# Copyright (c) 2025, RFID and Contributors
+# See license.txt
+
+from frappe.tests.utils import FrappeTestCase
+
+from rfid.rfid.services.ingest import _build_event, _iter_events, _iter_impinj_nodes
+from rfid.rfid.services.parser import Layout, parse_reads
+
+EVENT_FIELDS = ("name", "rfid", "reader", "antenna_port", "read_time", "rssi", "_raw_index")
+
+PAYLOADS = {
+	"iot_envelope": [
+		{
+			"timestamp": "2025-11-20T12:00:00.000000Z",
+			"hostname": "impinj-14-1a-2b",
+			"eventType": "tagInventory",
+			"tagInventoryEvent": {
+				"epc": "4gAAAAAAAAAAAAAB",
+				"epcHex": "E20000000000000000000001",
+				"antennaPort": 1,
+				"peakRssiCdbm": -5400,
+			},
+		},
+		{
+			"timestamp": "2025-11-20T12:00:00.250000Z",
+			"hostname": "impinj-14-1a-2b",
+			"eventType": "tagInventory",
+			"tagInventoryEvent": {"epc": "4gAAAAAAAAAAAAAC", "epcHex": "e20000000000000000000002", "antennaPort": 2},
+		},
+	],
+	"notifications": {
+		"notifications": [
+			{"data": {"epc": "E20000000000000000000003", "antennaPort": "3", "rssi": -61.5, "readTime": "2025-11-20T12:00:01+00:00"}},
+			{"data": {"epc": "E20000000000000000000004", "antennaPort": "4", "rssi": -48, "readTime": "2025-11-20T12:00:02+00:00"}},
+		]
+	},
+	"flat": [
+		{"epc": " e20000000000000000000005 ", "timestamp": "2025-11-20 12:00:03", "reader": "gate", "antenna": 1, "peakRssi": -70},
+	],
+}
+
+
+class TestFastPathParser(FrappeTestCase):
+	def test_fast_path_matches_generic_path(self):
+		for shape, payload in PAYLOADS.items():
+			with self.subTest(shape=shape):
+				self.assertIsNotNone(Layout.detect(payload))
+				generic = [
+					{**_build_event(node), "_raw_index": index} for index, node in enumerate(_iter_impinj_nodes(payload))
+				]
+				fast = list(_iter_events(payload, f"test|{shape}"))
+				self.assertEqual(
+					[[event[field] for field in EVENT_FIELDS] for event in fast],
+					[[event[field] for field in EVENT_FIELDS] for event in generic],
+				)
+
+	def test_mismatch_falls_back_and_forgets_layout(self):
+		self.assertIsNotNone(parse_reads(PAYLOADS["iot_envelope"], "test|mixed"))
+		# A read in another shape sends the payload down the generic path.
+		self.assertIsNone(parse_reads(PAYLOADS["iot_envelope"] + PAYLOADS["flat"], "test|mixed"))
+		self.assertIsNotNone(parse_reads(PAYLOADS["flat"], "test|mixed"))
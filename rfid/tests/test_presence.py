@@ -0,0 +1,117 @@
+# Copyright (c) 2025, RFID and Contributors
+# See license.txt
+
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from rfid.rfid.services.presence import (
+	DWELL,
+	ENTER,
+	EXIT,
+	PresenceRules,
+	_lock_key,
+	_state_key,
+	update_presence,
+)
+
+START = datetime(2025, 11, 20, 12, 0, 0)
+EPC = "E2801160600002"
+
+
+def read(reader="dock-1", antenna=1, rssi=-60.0, offset=0.0):
+	return {
+		"rfid": EPC,
+		"reader": reader,
+		"antenna_port": antenna,
+		"rssi": rssi,
+		"read_time": START + timedelta(seconds=offset),
+	}
+
+
+class TestPresenceRules(FrappeTestCase):
+	def setUp(self):
+		self.rules = PresenceRules(exit_timeout=10, dwell_time=30, enter_rssi=-70, hysteresis=3)
+
+	def events(self, transitions):
+		return [(event, state["reader"], state["antenna_port"]) for event, state in transitions]
+
+	def test_enter_dwell_exit(self):
+		state, transitions = self.rules.observe(None, read(), 0)
+		self.assertEqual(self.events(transitions), [(ENTER, "dock-1", 1)])
+
+		for second in range(5, 30, 5):
+			state, transitions = self.rules.observe(state, read(offset=second), second)
+			self.assertEqual(transitions, [])
+		self.assertEqual(self.rules.deadline(state), 30)
+
+		state, transitions = self.rules.observe(state, read(offset=30), 30)
+		self.assertEqual(self.events(transitions), [(DWELL, "dock-1", 1)])
+		self.assertEqual(self.rules.deadline(state), 40)
+
+		state, transitions = self.rules.expire(state, 39)
+		self.assertEqual(transitions, [])
+
+		state, transitions = self.rules.expire(state, 40)
+		self.assertIsNone(state)
+		self.assertEqual(self.events(transitions), [(EXIT, "dock-1", 1)])
+
+	def test_rssi_hysteresis(self):
+		state, transitions = self.rules.observe(None, read(rssi=-72), 0)
+		self.assertIsNone(state)
+		self.assertEqual(transitions, [])
+
+		state, _transitions = self.rules.observe(None, read(rssi=-68), 0)
+		# Slightly below the enter threshold keeps the tag in its zone...
+		state, _transitions = self.rules.observe(state, read(rssi=-72, offset=8), 8)
+		self.assertEqual(state["last_seen"], 8)
+		# ...further below does not.
+		state, _transitions = self.rules.observe(state, read(rssi=-74, offset=16), 16)
+		self.assertEqual(state["last_seen"], 8)
+
+	def test_zone_change_needs_stronger_read(self):
+		state, _transitions = self.rules.observe(None, read(rssi=-60), 0)
+
+		state, transitions = self.rules.observe(state, read(antenna=2, rssi=-58), 1)
+		self.assertEqual(transitions, [])
+		self.assertEqual(state["antenna_port"], 1)
+
+		state, transitions = self.rules.observe(state, read(antenna=2, rssi=-55), 2)
+		self.assertEqual(self.events(transitions), [(EXIT, "dock-1", 1), (ENTER, "dock-1", 2)])
+		self.assertEqual(state["antenna_port"], 2)
+
+	def test_timed_out_tag_enters_again(self):
+		state, _transitions = self.rules.observe(None, read(), 0)
+
+		state, transitions = self.rules.observe(state, read(offset=12), 12)
+		self.assertEqual(self.events(transitions), [(EXIT, "dock-1", 1), (ENTER, "dock-1", 1)])
+		self.assertEqual(state["entered"], 12)
+
+
+@patch("rfid.rfid.services.presence._dispatch")
+@patch(
+	"rfid.rfid.services.presence.get_settings",
+	return_value=frappe._dict(presence_exit_timeout=10, presence_hysteresis=3),
+)
+class TestPresenceStates(FrappeTestCase):
+	def setUp(self):
+		cache = frappe.cache()
+		cache.delete(_state_key(cache, EPC), _lock_key(cache, EPC))
+
+	def tearDown(self):
+		self.setUp()
+
+	def test_waits_for_a_tag_another_worker_holds(self, _settings, dispatch):
+		cache = frappe.cache()
+		# Another worker is updating the tag.
+		cache.set(_lock_key(cache, EPC), 1, px=200)
+
+		update_presence([read()], "test")
+		self.assertEqual([event for event, _state in dispatch.call_args_list[0].args[0]], [ENTER])
+		self.assertIsNone(cache.get(_lock_key(cache, EPC)))
+
+		dispatch.reset_mock()
+		update_presence([read(offset=1)], "test")
+		self.assertEqual(dispatch.call_args_list[0].args[0], [])
@@ -0,0 +1,109 @@
+# Copyright (c) 2025, RFID and Contributors
+# See license.txt
+
+from datetime import datetime
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from rfid.rfid.services.processing import heartbeat_key, processing_key, take
+from rfid.rfid.services.raddec import RaddecAggregator, aggregate_raddecs
+from rfid.rfid.services.raddec_window import (
+	REDIS_WINDOW_KEY,
+	WINDOW_SOURCE,
+	flush_raddec_window,
+	queue_raddec_reads,
+	sweep_raddec_window,
+)
+
+
+class TestRaddecAggregator(FrappeTestCase):
+	def test_combines_receivers_and_antennas_per_transmitter(self):
+		rows = [
+			{"rfid": "E200A", "reader": "a1b2c3d4e5f6", "antenna_port": 1, "rssi": -60, "read_time": 1000},
+			{"rfid": "E200A", "reader": "a1b2c3d4e5f6", "antenna_port": 1, "rssi": -64, "read_time": 1200},
+			{"rfid": "E200A", "reader": "0a0b0c0d0e0f", "antenna_port": 2, "rssi": -50, "read_time": 900, "read_count": 3},
+			{"rfid": "E200B", "reader": "a1b2c3d4e5f6", "antenna_port": 1, "rssi": 0, "read_time": 1100, "item_code": "TOOL"},
+		]
+
+		(first, first_summary), (second, second_summary) = aggregate_raddecs(rows)
+
+		self.assertEqual(first["transmitterId"], "e200a")
+		self.assertEqual(first["timestamp"], 900)
+		self.assertEqual(
+			[(entry["receiverId"], entry["receiverAntenna"], entry["rssi"], entry["numberOfDecodings"]) for entry in first["rssiSignature"]],
+			[("0a0b0c0d0e0f", 2, -50, 3), ("a1b2c3d4e5f6", 1, -62, 2)],
+		)
+		self.assertEqual(first_summary["reader"], "0a0b0c0d0e0f")
+		self.assertEqual(first_summary["readers"], ["a1b2c3d4e5f6", "0a0b0c0d0e0f"])
+		self.assertEqual(first_summary["decodings"], 5)
+
+		# A read without RSSI counts, but adds no signature entry.
+		self.assertNotIn("rssiSignature", second)
+		self.assertEqual(second["receivers"], [{"receiverId": "a1b2c3d4e5f6", "receiverIdType": 2, "antenna": 1}])
+		self.assertEqual((second_summary["item_code"], second_summary["decodings"]), ("TOOL", 1))
+
+	def test_windows_close_after_their_length(self):
+		aggregator = RaddecAggregator(1.0)
+		aggregator.add({"rfid": "E200A", "reader": "dock", "antenna_port": 1, "rssi": -60, "read_time": 1000}, now=10.0)
+		aggregator.add({"rfid": "E200A", "reader": "gate", "antenna_port": 1, "rssi": -70, "read_time": 1500}, now=10.5)
+
+		self.assertEqual(aggregator.flush(now=10.9), [])
+
+		# A read after the window closed starts the next raddec.
+		aggregator.add({"rfid": "E200A", "reader": "dock", "antenna_port": 1, "rssi": -55, "read_time": 2100}, now=11.1)
+		(raddec, summary), = aggregator.flush(now=11.2)
+		self.assertEqual(len(raddec["rssiSignature"]), 2)
+		self.assertEqual(summary["decodings"], 2)
+
+		(raddec, summary), = aggregator.flush()
+		self.assertEqual(raddec["timestamp"], 2100)
+		self.assertEqual(len(aggregator), 0)
+
+
+@patch("frappe.enqueue")
+@patch("rfid.rfid.services.raddec_window.get_settings", return_value=frappe._dict(raddec_window=0.2))
+class TestRaddecWindow(FrappeTestCase):
+	def setUp(self):
+		cache = frappe.cache()
+		cache.delete(
+			cache.make_key(REDIS_WINDOW_KEY),
+			processing_key(cache, REDIS_WINDOW_KEY),
+			heartbeat_key(cache, REDIS_WINDOW_KEY),
+		)
+
+	@patch("rfid.rfid.services.raddec_window.dispatch_raddec_events")
+	def test_flush_combines_queued_reads(self, dispatch, _settings, enqueue):
+		now = datetime.now()
+		queue_raddec_reads(
+			[
+				{"rfid": "E200WIN", "reader": "dock", "antenna_port": 1, "rssi": -60.0, "read_time": now},
+				{"rfid": "E200WIN", "reader": "gate", "antenna_port": 2, "rssi": -70.0, "read_time": now},
+			]
+		)
+		enqueue.assert_called()
+
+		self.assertEqual(flush_raddec_window(), 1)
+
+		(raddec, summary), = list(dispatch.call_args.args[0])
+		self.assertEqual(raddec["transmitterId"], "e200win")
+		self.assertEqual(len(raddec["rssiSignature"]), 2)
+		self.assertEqual(summary["source"], WINDOW_SOURCE)
+		pipe = frappe.cache().pipeline()
+		pipe.llen(frappe.cache().make_key(REDIS_WINDOW_KEY))
+		pipe.llen(processing_key(frappe.cache(), REDIS_WINDOW_KEY))
+		self.assertEqual(pipe.execute(), [0, 0])
+
+	@patch("rfid.rfid.services.raddec_window.dispatch_raddec_events")
+	def test_reads_taken_by_a_killed_job_are_put_back(self, dispatch, _settings, _enqueue):
+		queue_raddec_reads([{"rfid": "E200WIN", "reader": "dock", "antenna_port": 1, "rssi": -60.0, "read_time": datetime.now()}])
+		cache = frappe.cache()
+		# A flush job took the reads and died before their raddec was sent.
+		self.assertTrue(take(cache, REDIS_WINDOW_KEY, 10))
+		cache.delete(heartbeat_key(cache, REDIS_WINDOW_KEY))
+
+		sweep_raddec_window()
+
+		self.assertEqual(flush_raddec_window(), 1)
+		dispatch.assert_called_once()
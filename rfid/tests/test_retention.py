@@ -0,0 +1,86 @@
+# Copyright (c) 2025, RFID and Contributors
+# See license.txt
+
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from rfid.rfid.doctype.rfid_settings.rfid_settings import SETTINGS_DOCTYPE
+from rfid.rfid.services.retention import (
+	HOUR,
+	MAX_ROLLUP_HOURS,
+	ROLLUP_DOCTYPE,
+	ROLLUP_LOOKBACK_HOURS,
+	WATERMARK_FIELD,
+	archive_tag_events,
+	get_rollup_watermark,
+	rollup_tag_events,
+)
+
+START = datetime(2001, 1, 1)
+EPC = "E200RETENTION"
+# Further apart than one run catches up on.
+GAP = HOUR * (MAX_ROLLUP_HOURS + 100)
+NOW = START + GAP + timedelta(days=2)
+
+
+@patch("rfid.rfid.services.retention.time.sleep")
+@patch("rfid.rfid.services.retention.now_datetime", return_value=NOW)
+@patch(
+	"rfid.rfid.services.retention.get_settings",
+	return_value=frappe._dict(hot_window_days=1, archive_tag_events=0, retention_batch_size=10),
+)
+class TestRetention(FrappeTestCase):
+	def setUp(self):
+		self.watermark = frappe.db.get_single_value(SETTINGS_DOCTYPE, WATERMARK_FIELD, cache=False)
+		set_watermark(START)
+		for seconds, rssi in ((60, -50.0), (120, -70.0)):
+			insert_read(START + timedelta(seconds=seconds), rssi)
+		insert_read(START + GAP + timedelta(seconds=60), -60.0)
+
+	def tearDown(self):
+		frappe.db.delete("RFID Tag Event", {"rfid": EPC})
+		frappe.db.delete(ROLLUP_DOCTYPE, {"rfid": EPC})
+		set_watermark(self.watermark)
+		frappe.db.commit()
+
+	def test_rolls_up_across_a_long_quiet_spell(self, *_mocks):
+		rollup_tag_events()
+
+		self.assertEqual(get_rollup_watermark(), NOW)
+		rollups = frappe.get_all(
+			ROLLUP_DOCTYPE, filters={"rfid": EPC}, fields=["hour", "read_count", "peak_rssi", "mean_rssi"], order_by="hour"
+		)
+		self.assertEqual([row.hour for row in rollups], [START, START + GAP])
+		self.assertEqual((rollups[0].read_count, rollups[0].peak_rssi, rollups[0].mean_rssi), (2, -50.0, -60.0))
+
+		# Nothing new came in: the next run only summarises the recent hours again.
+		self.assertEqual(rollup_tag_events()["hours"], ROLLUP_LOOKBACK_HOURS)
+
+	def test_archives_only_rolled_up_hours(self, *_mocks):
+		archive_tag_events()
+		self.assertEqual(frappe.db.count("RFID Tag Event", {"rfid": EPC}), 3)
+
+		rollup_tag_events()
+		self.assertEqual(archive_tag_events()["events"], 3)
+		self.assertFalse(frappe.db.exists("RFID Tag Event", {"rfid": EPC}))
+		self.assertTrue(frappe.db.exists(ROLLUP_DOCTYPE, {"rfid": EPC}))
+
+
+def insert_read(read_time, rssi):
+	frappe.get_doc(
+		{
+			"doctype": "RFID Tag Event",
+			"rfid": EPC,
+			"reader": "retention",
+			"antenna_port": 1,
+			"read_time": read_time,
+			"rssi": rssi,
+		}
+	).insert(ignore_permissions=True)
+
+
+def set_watermark(value):
+	frappe.db.set_single_value(SETTINGS_DOCTYPE, WATERMARK_FIELD, value, update_modified=False)
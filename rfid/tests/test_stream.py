@@ -0,0 +1,87 @@
+# Copyright (c) 2025, RFID and Contributors
+# See license.txt
+
+import json
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from frappe.tests.utils import FrappeTestCase
+
+from rfid.rfid.services.batching import MicroBatcher
+from rfid.rfid.services.stream import StreamReader
+
+STREAM_EVENTS = [
+	{
+		"timestamp": "2025-11-20T12:00:00.000000Z",
+		"hostname": "impinj-14-1a-2b",
+		"eventType": "tagInventory",
+		"tagInventoryEvent": {"epc": "4wAAAAAAAAAAAAAB", "epcHex": "E20000000000000000000001", "antennaPort": 1},
+	},
+	{"timestamp": "2025-11-20T12:00:01.000000Z", "hostname": "impinj-14-1a-2b", "eventType": "keepalive"},
+]
+
+
+class FakeStreamHandler(BaseHTTPRequestHandler):
+	connections = 0
+
+	def do_GET(self):
+		type(self).connections += 1
+		self.send_response(200)
+		self.send_header("Content-Type", "application/x-ndjson")
+		self.end_headers()
+		for event in STREAM_EVENTS:
+			self.wfile.write(json.dumps(event).encode() + b"\n\n")
+		# Closing the connection forces the consumer to reconnect.
+
+	def log_message(self, *args):
+		pass
+
+
+class TestStreamReader(FrappeTestCase):
+	def setUp(self):
+		FakeStreamHandler.connections = 0
+		self.server = ThreadingHTTPServer(("127.0.0.1", 0), FakeStreamHandler)
+		threading.Thread(target=self.server.serve_forever, daemon=True).start()
+		self.url = f"http://127.0.0.1:{self.server.server_port}/api/v1/data/stream"
+
+	def tearDown(self):
+		self.server.shutdown()
+		self.server.server_close()
+
+	def test_reads_and_reconnects(self):
+		sink = queue.Queue()
+		stop = threading.Event()
+		reader = StreamReader("dock-door-1", self.url, sink, stop)
+		reader.start()
+
+		events = [sink.get(timeout=10) for _ in range(4)]
+		stop.set()
+		reader.join(timeout=10)
+
+		self.assertGreaterEqual(FakeStreamHandler.connections, 2)
+		tag_event = events[0]
+		self.assertEqual(tag_event["epc"], "E20000000000000000000001")
+		self.assertEqual(tag_event["reader"], "impinj-14-1a-2b")
+		self.assertEqual(tag_event["timestamp"], "2025-11-20T12:00:00.000000Z")
+		self.assertEqual(events[1]["reader"], "impinj-14-1a-2b")
+
+
+class TestMicroBatcher(FrappeTestCase):
+	def test_flushes_by_count_and_on_stop(self):
+		source = queue.Queue()
+		flushed = []
+		for i in range(5):
+			source.put(i)
+
+		stop = threading.Event()
+		batcher = MicroBatcher(source, flushed.append, max_items=2, max_latency=60)
+		worker = threading.Thread(target=batcher.run, args=(stop,))
+		worker.start()
+		while source.qsize():
+			time.sleep(0.01)
+		stop.set()
+		worker.join(timeout=5)
+
+		self.assertEqual(flushed, [[0, 1], [2, 3], [4]])
@@ -0,0 +1,40 @@
+# Copyright (c) 2025, RFID and Contributors
+# See license.txt
+
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from frappe.tests.utils import FrappeTestCase
+
+from rfid.rfid.services.timestamps import epoch_ms, normalise_timestamp
+
+ZONE = ZoneInfo("Asia/Tashkent")
+# 2025-11-20T12:00:00.123456Z is 17:00:00.123456 in Tashkent (UTC+5).
+EXPECTED = datetime(2025, 11, 20, 17, 0, 0, 123456)
+EPOCH_US = 1763640000123456
+
+
+class TestNormaliseTimestamp(FrappeTestCase):
+	def test_formats(self):
+		cases = {
+			"2025-11-20T12:00:00.123456Z": EXPECTED,
+			"2025-11-20T12:00:00.123456789Z": EXPECTED,
+			"2025-11-20T14:00:00.123456+02:00": EXPECTED,
+			"2025-11-20 17:00:00.123456": EXPECTED,
+			EPOCH_US // 1000000: EXPECTED.replace(microsecond=0),
+			EPOCH_US / 1000000: EXPECTED,
+			EPOCH_US // 1000: EXPECTED.replace(microsecond=123000),
+			EPOCH_US: EXPECTED,
+			str(EPOCH_US): EXPECTED,
+		}
+		for value, expected in cases.items():
+			with self.subTest(value=value):
+				self.assertEqual(normalise_timestamp(value, ZONE), expected)
+
+	def test_rejects_non_timestamps(self):
+		for value in (None, "", "  ", "not a date", True, {}):
+			with self.subTest(value=value):
+				self.assertIsNone(normalise_timestamp(value, ZONE))
+
+	def test_epoch_ms_round_trip(self):
+		self.assertEqual(epoch_ms(normalise_timestamp(EPOCH_US, ZONE), ZONE), EPOCH_US // 1000)
@@ -0,0 +1,135 @@
+# Copyright (c) 2025, RFID and Contributors
+# See license.txt
+
+import gzip
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from rfid.rfid.services.parser import dumps
+from rfid.rfid.services.subscriptions import SubscriptionIndex
+from rfid.rfid.services.webhook import (
+	MAX_RETRY_DELAY,
+	_breaker_key,
+	_breaker_open_until,
+	_post_rows,
+	_record_attempts,
+	retry_delay,
+)
+from rfid.rfid.services.encodings import BATCH_EVENT, GZIP, JSON, NDJSON, encode_body, load_body
+
+
+class TestEncodeBody(FrappeTestCase):
+	def setUp(self):
+		self.items = [
+			{"event": "rfid.raddec", "data": {"transmitterId": "E200A"}, "meta": {"reader": "dock-1"}},
+			{"event": "rfid.presence.exit", "data": {"transmitterId": "E200B"}, "meta": {"transition": "exit"}},
+		]
+		self.encoded = [dumps(item) for item in self.items]
+
+	def test_splices_batch_items_into_one_body(self):
+		payload, content_type, content_encoding = encode_body(self.encoded, batch=True)
+
+		self.assertEqual((content_type, content_encoding), ("application/json", None))
+		self.assertEqual(json.loads(payload), {"event": BATCH_EVENT, "count": 2, "data": self.items})
+
+	def test_ndjson_batch_has_one_event_per_line(self):
+		payload, content_type, _ = encode_body(self.encoded, NDJSON, batch=True)
+
+		self.assertEqual(content_type, "application/x-ndjson")
+		self.assertEqual([json.loads(line) for line in payload.splitlines()], self.items)
+
+	def test_compressed_bodies_are_stored_as_base64(self):
+		payload, content_type, content_encoding = encode_body(self.encoded, JSON, GZIP)
+
+		self.assertEqual(content_encoding, GZIP)
+		body = load_body(payload, content_type, content_encoding)
+		self.assertEqual(json.loads(gzip.decompress(body)), self.items[0])
+
+
+class TestRetryDelay(FrappeTestCase):
+	def test_doubles_per_attempt_up_to_the_cap(self):
+		for attempts, expected in ((1, 10), (2, 20), (4, 80), (20, MAX_RETRY_DELAY)):
+			with self.subTest(attempts=attempts):
+				delay = retry_delay(attempts, 10)
+				self.assertGreaterEqual(delay, expected * 0.8)
+				self.assertLessEqual(delay, expected * 1.2)
+
+
+class TestSubscriptionIndex(FrappeTestCase):
+	def setUp(self):
+		self.index = SubscriptionIndex(
+			[
+				{"name": "all"},
+				{"name": "dock", "filter_readers": "dock-1\ndock-2", "filter_antennas": "1, 2"},
+				{"name": "company", "filter_epcs": "3034\n30??0123*"},
+				{"name": "strong", "filter_readers": "dock-1", "min_rssi": -60},
+				{"name": "tools", "filter_item_groups": "Tools"},
+			],
+			item_groups=lambda group: [group, f"{group} - Hand"],
+		)
+
+	def test_matches_each_filter(self):
+		cases = [
+			({"reader": "gate", "epc": "E200"}, {"all"}),
+			({"reader": "dock-2", "antenna": 2, "epc": "E200"}, {"all", "dock"}),
+			({"reader": "dock-2", "antenna": 3, "epc": "3034AB"}, {"all", "company"}),
+			({"reader": "gate", "epc": "30FF0123AA"}, {"all", "company"}),
+			({"reader": "gate", "epc": "30FF0124AA"}, {"all"}),
+			({"reader": "dock-1", "antenna": 1, "epc": "E200", "rssi": -55}, {"all", "dock", "strong"}),
+			({"reader": "dock-1", "antenna": 1, "epc": "E200", "rssi": -70}, {"all", "dock"}),
+			({"reader": "gate", "epc": "E200", "item_group": lambda: "Tools - Hand"}, {"all", "tools"}),
+		]
+		for subject, expected in cases:
+			with self.subTest(subject=subject):
+				self.assertEqual(self.index.match(**subject), expected)
+
+	def test_unfiltered_endpoints_skip_matching(self):
+		index = SubscriptionIndex([{"name": "a"}, {"name": "b", "min_rssi": 0}])
+		self.assertFalse(index.filtered)
+		self.assertEqual(index.match(reader="gate"), {"a", "b"})
+
+
+class TestPostRows(FrappeTestCase):
+	@patch("rfid.rfid.services.webhook._post", side_effect=[(200, None), (503, "down"), (200, None)])
+	def test_stops_at_first_failure_and_stamps_epoch_time(self, _post):
+		hook = frappe._dict(name="hook", webhook_url="http://127.0.0.1/hook")
+		rows = [frappe._dict(name=name, payload="{}", event="rfid.raddec", content_type=None, content_encoding=None) for name in "abc"]
+		started = time.time()
+
+		# Delivery threads have no frappe.local.
+		with ThreadPoolExecutor(max_workers=1) as pool:
+			attempts = pool.submit(_post_rows, hook, rows).result()
+
+		self.assertEqual([(name, code, error) for name, code, error, _at in attempts], [("a", 200, None), ("b", 503, "down")])
+		self.assertTrue(all(started <= attempted <= time.time() for *_rest, attempted in attempts))
+
+
+class TestWebhookBreaker(FrappeTestCase):
+	hook = frappe._dict(name="test-breaker-hook")
+	settings = frappe._dict(webhook_breaker_threshold=2, webhook_breaker_cooldown=60)
+
+	def setUp(self):
+		cache = frappe.cache()
+		cache.delete(_breaker_key(cache, self.hook.name))
+
+	def tearDown(self):
+		self.setUp()
+
+	def test_opens_after_failures_and_closes_on_success(self):
+		cache = frappe.cache()
+		rows = [frappe._dict(name="missing-delivery", attempts=0)]
+		failure = [("missing-delivery", 503, "down", time.time())]
+
+		_record_attempts(cache, self.settings, self.hook, rows, failure)
+		self.assertIsNone(_breaker_open_until(cache, self.hook.name))
+
+		_record_attempts(cache, self.settings, self.hook, rows, failure)
+		self.assertGreater(_breaker_open_until(cache, self.hook.name), time.time())
+
+		_record_attempts(cache, self.settings, self.hook, rows, [("missing-delivery", 200, None, time.time())])
+		self.assertIsNone(_breaker_open_until(cache, self.hook.name))